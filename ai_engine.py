@@ -1,16 +1,38 @@
 # sam-gameapi/ai_engine.py
+import asyncio
+import json
 import os
-from datetime import datetime
-from openai import OpenAI
-from utils import storage
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from utils.tracing import span
+from utils.usage_tracker import tracker as usage_tracker
+from core.model_router import ModelRouter
+from core.resilience import (
+    RETRY_MAX_ATTEMPTS, BreakerRegistry, CircuitOpenError, DeadlineExceeded, RetryBudget, backoff_delay,
+    is_retryable, remaining,
+)
 
 # ================================================================
 # ⚙️ CONFIGURACIÓN DE CLIENTE Y MODELOS
 # ================================================================
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))   # completions simultáneas
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))               # peticiones en espera
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", str(LLM_MAX_CONCURRENCY * 2)))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None                    # endpoint compatible con OpenAI
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))   # segundos que vive una conexión ociosa
+LLM_PREWARM_CONNECTIONS = int(os.getenv("LLM_PREWARM_CONNECTIONS", "2"))  # conexiones abiertas al arrancar
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "600"))   # tokens para turnos recientes
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "12"))          # turnos candidatos a empaquetar
+
 PRIMARY_MODEL = os.getenv("PRIMARY_MODEL", "gpt-4o-mini")   # modelo económico
 FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "gpt-5")       # modelo avanzado
-USAGE_FILE = "usage.json"                                   # contador persistente
+router = ModelRouter([PRIMARY_MODEL, FALLBACK_MODEL])
+breakers = BreakerRegistry()
+retry_budget = RetryBudget()
 
 # ================================================================
 # 🎭 PROMPT DEL SISTEMA (S.A.M. v3 con memoria corta)
@@ -48,115 +70,577 @@ Tu rol es narrar y dirigir la aventura aplicando las reglas del SRD 5.2.1 de for
 Recuerda: S.A.M. no solo describe lo que sucede, sino que **dirige una historia viva**, aplicando las reglas del SRD 5.2.1 a través de una narrativa fluida y envolvente.
 """
 
+# ================================================================
+# 🔌 CLIENTE LLM (inicialización perezosa)
+# ================================================================
+_client = None
+_http_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Cliente de OpenAI compartido, con su pool de conexiones.
+    Se crea en el primer uso o en el precalentamiento de arranque (core/warmup):
+    importar el SDK cuesta cientos de milisegundos que no deben pagarse al importar el módulo.
+    """
+    global _client, _http_client
+    with _client_lock:
+        if _client is None:
+            import httpx
+            from openai import AsyncOpenAI
+
+            _http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_CONCURRENCY,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+            )
+            # Los reintentos los gestiona S.A.M. (presupuesto y breaker), no el SDK.
+            _client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), base_url=LLM_BASE_URL, http_client=_http_client,
+                max_retries=0,
+            )
+        return _client
+
+
+async def prewarm_connections(count: int = LLM_PREWARM_CONNECTIONS) -> int:
+    """
+    Abre `count` conexiones con el proveedor (DNS, TCP y TLS) y las deja en el pool,
+    para que la primera narración tras un arranque en frío no pague el handshake.
+    Basta cualquier respuesta HTTP; devuelve cuántas conexiones se abrieron.
+    """
+    client = await asyncio.to_thread(get_client)
+    url = str(client.base_url)
+    # Peticiones simultáneas: cada una abre su propia conexión
+    results = await asyncio.gather(
+        *(_http_client.head(url, timeout=10.0) for _ in range(count)), return_exceptions=True,
+    )
+    return sum(1 for r in results if not isinstance(r, BaseException))
+
+# ================================================================
+# 🚦 CONTROL DE CONCURRENCIA
+# ================================================================
+class LLMOverloadedError(RuntimeError):
+    """La cola de completions está llena; el llamador debe reintentar más tarde."""
+
+
+class CompletionLimiter:
+    """
+    Limita las completions en vuelo y la profundidad de la cola de espera.
+    Evita que un pico de acciones abra cientos de conexiones al proveedor.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Reserva un hueco durante todo el bloque (p. ej. un stream completo)."""
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError("Demasiadas narraciones en cola.")
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def run(self, coro_factory):
+        """Ejecuta `coro_factory()` cuando hay un hueco libre."""
+        async with self.slot():
+            return await coro_factory()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+limiter = CompletionLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE)
+
+
+def _call_timeout() -> float:
+    """Timeout de una llamada: LLM_TIMEOUT acotado por lo que queda del plazo de la petición."""
+    left = remaining()
+    if left is None:
+        return LLM_TIMEOUT
+    if left <= 0:
+        raise DeadlineExceeded("Plazo de la petición agotado.")
+    return min(LLM_TIMEOUT, left)
+
+
+async def _create_completion(**kwargs):
+    """Llama al endpoint de chat respetando el límite de concurrencia y el plazo de la petición."""
+    timeout = _call_timeout()
+    try:
+        return await asyncio.wait_for(
+            limiter.run(lambda: get_client().chat.completions.create(timeout=timeout, **kwargs)),
+            timeout,
+        )
+    except TimeoutError:
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("Plazo de la petición agotado.") from None
+        raise
+
+
+async def aclose():
+    """Cierra el pool de conexiones HTTP del cliente (si llegó a crearse)."""
+    if _client is not None:
+        await _client.close()
+
 # ================================================================
 # 🧠 MEMORIA CORTA
 # ================================================================
-def build_context_with_memory(context: dict | None = None, memory_limit: int = 3) -> str:
-    """Construye texto contextual con las últimas acciones."""
+def estimate_tokens(text: str) -> int:
+    """Estimación barata de tokens (~4 caracteres por token en español)."""
+    return (len(text) + 3) // 4
+
+
+def entry_tokens(entry: dict) -> int:
+    """Tokens de una entrada del historial; usa el conteo cacheado al guardarla si existe."""
+    tokens = entry.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(f"{entry.get('player', '')}{entry.get('action', '')}{entry.get('response', '')}")
+    return tokens
+
+
+def build_context_with_memory(context: dict | None = None, memory: list[dict] | None = None,
+                              token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
+    """
+    Construye texto contextual a partir del estado ya cargado:
+    escena, resumen acumulado de la campaña y los turnos más recientes
+    que quepan en `token_budget` (empaquetados del más nuevo al más viejo).
+    """
     memory_text = ""
-    try:
-        state = storage.read_json("game_state.json")
-        history = state.get("history", [])
-        if history:
-            recent = history[-memory_limit:]
-            memory_text = "\nÚltimos eventos recientes:\n"
-            for item in recent:
-                memory_text += f"- {item.get('player', '???')}: {item.get('action')}\n"
-                memory_text += f"  → {item.get('response')}\n"
-    except Exception:
-        memory_text = ""
+    history = memory or []
+    if history:
+        packed = []
+        used = 0
+        for item in reversed(history):
+            tokens = entry_tokens(item)
+            if packed and used + tokens > token_budget:
+                break
+            packed.append(item)
+            used += tokens
+        packed.reverse()
+
+        memory_text = "\nÚltimos eventos recientes:\n"
+        for item in packed:
+            response = item.get("response") or ""
+            if entry_tokens(item) > token_budget:
+                response = response[: token_budget * 4] + "…"
+            memory_text += f"- {item.get('player', '???')}: {item.get('action')}\n"
+            memory_text += f"  → {response}\n"
 
     scene_text = ""
+    summary_text = ""
     if context:
         scene_text = (
             f"Escena actual: {context.get('scene', 'desconocida')}\n"
             f"Descripción: {context.get('description', 'sin detalles')}\n"
         )
-    return scene_text + memory_text
+        if context.get("summary"):
+            summary_text = f"\nResumen de la campaña hasta ahora:\n{context['summary']}\n"
+    return scene_text + summary_text + memory_text
 
 # ================================================================
 # 📊 REGISTRO DE TOKENS
 # ================================================================
-def log_usage(model: str, tokens: int):
-    """Guarda el conteo de tokens por modelo en /data/usage.json."""
-    data = storage.read_json(USAGE_FILE)
-    date_key = datetime.utcnow().strftime("%Y-%m")
-    if date_key not in data:
-        data[date_key] = {"total": 0, "models": {}}
+def log_usage(model: str, usage, session_id: str | None = None):
+    """Suma los tokens de una completion a los contadores en memoria (se vuelcan a /data/usage.json)."""
+    if not usage:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    if not prompt_tokens and not completion_tokens:
+        completion_tokens = getattr(usage, "total_tokens", 0) or 0
+    usage_tracker.record(model, prompt_tokens, completion_tokens, session_id)
 
-    month_data = data[date_key]
-    month_data["total"] += tokens
-    month_data["models"][model] = month_data["models"].get(model, 0) + tokens
+# ================================================================
+# 🧾 PROMPT Y SELECCIÓN DE MODELO
+# ================================================================
+DIALOGUE_KEYWORDS = ["hablo", "negocio", "discuto", "converso", "pregunto"]
+
+
+def _build_messages(player: str, action: str, mode: str, context: dict | None,
+                    memory: list[dict] | None = None) -> list[dict]:
+    """Arma los mensajes de sistema y usuario para una acción."""
+    with span("prompt"):
+        memory_context = build_context_with_memory(context, memory)
+
+    user_prompt = f"""
+Jugador: {player}
+Tipo: {mode}
+Acción: {action}
+
+{memory_context}
+
+Responde narrativamente como Dungeon Master, siguiendo las instrucciones del sistema.
+"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
 
-    storage.write_json(USAGE_FILE, data)
+
+def _prefers_quality(action: str, mode: str) -> bool:
+    """Los diálogos piden el modelo avanzado; el resto, el económico."""
+    return mode == "dialogue" or any(x in action.lower() for x in DIALOGUE_KEYWORDS)
+
+
+def _select_models(action: str, mode: str) -> list[str]:
+    """Modelos en orden de preferencia según el router (latencia, errores y coste)."""
+    return router.route(_prefers_quality(action, mode))
+
+ERROR_NARRATION_PREFIXES = (
+    "S.A.M. se queda pensativo...", "S.A.M. hace una pausa incómoda...", "S.A.M. consulta sus notas...",
+)
+
+# Narraciones locales para cuando ningún modelo está disponible o se agota el plazo.
+CANNED_NARRATIONS = [
+    "S.A.M. consulta sus notas... Por un instante el mundo contiene el aliento: el viento se detiene "
+    "y las sombras parecen esperar. Tu acción queda en el aire. ¿Qué haces a continuación?",
+    "S.A.M. consulta sus notas... Una niebla repentina difumina la escena y nadie está seguro de lo que "
+    "acaba de ocurrir. Quizá convenga intentarlo de nuevo en un momento.",
+    "S.A.M. consulta sus notas... Los dioses del azar deliberan en voz baja; el destino de tu acción "
+    "se decidirá en breve. Mientras tanto, el grupo mira a su alrededor, expectante.",
+]
+
+
+def is_error_narration(text: str) -> bool:
+    """Indica si el texto es el mensaje de error del narrador y no una narración real."""
+    return text.startswith(ERROR_NARRATION_PREFIXES)
+
+
+def canned_narration() -> str:
+    """Narración local de emergencia: responde en milisegundos sin llamar a ningún modelo."""
+    return random.choice(CANNED_NARRATIONS)
+
+
+def _failure_narration(error: BaseException, critical: bool = False) -> str:
+    """Texto del narrador cuando la completion no se pudo obtener."""
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded)):
+        return canned_narration()
+    if critical:
+        return f"S.A.M. hace una pausa incómoda... (Error crítico del narrador: {error})"
+    return f"S.A.M. se queda pensativo... (Error: {error})"
 
 # ================================================================
 # 🎮 FUNCIÓN PRINCIPAL
 # ================================================================
-async def interpret_action(player: str, action: str, mode: str, context: dict | None = None) -> str:
+async def interpret_action(player: str, action: str, mode: str, context: dict | None = None,
+                           memory: list[dict] | None = None, session_id: str | None = None) -> str:
     """
     Envía la acción o diálogo del jugador a GPT y devuelve la respuesta narrativa.
     Usa GPT-4o-mini por defecto y GPT-5 como fallback o para escenas clave.
     Registra tokens usados por cada modelo.
     """
-    memory_context = build_context_with_memory(context)
+    messages = _build_messages(player, action, mode, context, memory)
+    models = _select_models(action, mode)
+    return await _complete_with_fallback(models, messages, session_id, temperature=0.85, max_completion_tokens=400)
+
+
+async def _timed_completion(model: str, messages: list[dict], session_id: str | None = None, **params) -> str:
+    """Completion que alimenta las estadísticas del router y registra tokens."""
+    start = time.perf_counter()
+    try:
+        with span("llm"):
+            response = await _create_completion(model=model, messages=messages, **params)
+    except (LLMOverloadedError, DeadlineExceeded, asyncio.CancelledError):
+        raise
+    except Exception:
+        router.record(model, time.perf_counter() - start, ok=False)
+        raise
+    router.record(model, time.perf_counter() - start, ok=True)
+
+    # Registrar tokens
+    log_usage(model, getattr(response, "usage", None), session_id)
+
+    return response.choices[0].message.content.strip()
+
+
+async def _call_model(model: str, messages: list[dict], session_id: str | None = None, **params) -> str:
+    """
+    Completion contra un modelo concreto respetando su circuit breaker.
+    Los errores transitorios cuentan para el breaker y se reintentan con backoff y jitter
+    mientras quede presupuesto de reintentos y plazo de la petición; el resto (4xx) se
+    propaga sin reintentar ni contar como fallo del modelo.
+    """
+    breaker = breakers.get(model)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuito abierto para {model}.")
+        probing = breaker.state == "half_open"
+        try:
+            text = await _timed_completion(model, messages, session_id, **params)
+        except (LLMOverloadedError, DeadlineExceeded, asyncio.CancelledError):
+            if probing:
+                breaker.release()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                # Petición inválida, credenciales, contexto excesivo…: el modelo respondió,
+                # así que no cuenta para abrir su circuito.
+                if probing:
+                    breaker.release()
+                raise
+            breaker.record_failure()
+            attempt += 1
+            delay = backoff_delay(attempt)
+            left = remaining()
+            if (attempt >= RETRY_MAX_ATTEMPTS
+                    or (left is not None and left <= delay) or not retry_budget.try_spend()):
+                raise
+            await asyncio.sleep(delay)
+            continue
+        breaker.record_success()
+        return text
+
+
+async def _complete_with_fallback(models: list[str], messages: list[dict], session_id: str | None = None,
+                                  **params) -> str:
+    """
+    Completion con respaldo y cobertura (hedging).
+    Si el primer modelo falla se pasa al siguiente; si no respondió en su p95,
+    se lanza el segundo en paralelo y gana el primero que conteste (el otro se cancela).
+    Los modelos con el circuito abierto se saltan; si no queda ninguno se responde
+    con una narración local.
+    """
+    retry_budget.deposit()
+    models = [m for m in models if breakers.get(m).available()]
+    if not models:
+        return canned_narration()
+
+    primary = models[0]
+    backup = models[1] if len(models) > 1 else None
+    started = time.perf_counter()
+    first = asyncio.create_task(_call_model(primary, messages, session_id, **params))
+    second = None
+    try:
+        await asyncio.wait({first}, timeout=router.hedge_delay(primary) if backup else None)
+
+        if first.done():
+            try:
+                return first.result()
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                # Fallback automático
+                if not backup or isinstance(e, DeadlineExceeded):
+                    return _failure_narration(e)
+                try:
+                    return await _call_model(backup, messages, session_id, **params)
+                except LLMOverloadedError:
+                    raise
+                except Exception as e2:
+                    return _failure_narration(e2, critical=True)
 
+        # El primario va lento: cobertura con el segundo modelo
+        second = asyncio.create_task(_call_model(backup, messages, session_id, **params))
+        pending = {first, second}
+        last_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        router.record_hedge_win(backup)
+                        if not first.done():
+                            # El primario se cancela sin responder: su latencia real es al menos
+                            # la transcurrida. Sin esta muestra (censurada) el router solo vería
+                            # sus respuestas rápidas y nunca lo descartaría por lento.
+                            router.record(primary, time.perf_counter() - started, ok=True)
+                    return task.result()
+                last_error = task.exception()
+        if isinstance(last_error, LLMOverloadedError):
+            raise last_error
+        return _failure_narration(last_error, critical=True)
+    finally:
+        for task in (first, second):
+            if task and not task.done():
+                task.cancel()
+
+# ================================================================
+# 👥 RONDAS DE GRUPO
+# ================================================================
+ROUND_INSTRUCTIONS = """
+Narra la ronda completa como Dungeon Master, resolviendo las acciones en un orden coherente
+y dejando que se influyan entre sí. Responde SOLO con un objeto JSON con esta forma:
+{"narration": "<narración conjunta de la ronda>", "players": {"<jugador>": "<resultado para ese jugador>"}}
+Incluye una entrada en "players" por cada jugador de la ronda, usando exactamente su nombre.
+"""
+
+
+async def interpret_round(actions: list[dict], context: dict | None = None,
+                          memory: list[dict] | None = None, session_id: str | None = None) -> dict:
+    """
+    Narra en una sola completion las acciones de varios jugadores.
+    `actions` es una lista de {"player", "action", "mode"}; devuelve
+    {"narration": str, "players": {jugador: resultado}}.
+    """
+    with span("prompt"):
+        memory_context = build_context_with_memory(context, memory)
+    lines = "\n".join(f"- {a['player']} ({a.get('mode', 'action')}): {a['action']}" for a in actions)
     user_prompt = f"""
-Jugador: {player}
-Tipo: {mode}
-Acción: {action}
+Ronda de acciones del grupo:
+{lines}
 
 {memory_context}
-
-Responde narrativamente como Dungeon Master, siguiendo las instrucciones del sistema.
+{ROUND_INSTRUCTIONS}
 """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+    models = router.route(any(_prefers_quality(a["action"], a.get("mode", "action")) for a in actions))
+
+    text = await _complete_with_fallback(
+        models, messages, session_id,
+        temperature=0.85,
+        max_completion_tokens=min(250 * len(actions) + 200, 1600),
+        response_format={"type": "json_object"},
+    )
+    return _parse_round(text, actions)
 
-    # Determinar modelo adecuado
-    model = PRIMARY_MODEL
-    if mode == "dialogue" or any(x in action.lower() for x in ["hablo", "negocio", "discuto", "converso", "pregunto"]):
-        model = FALLBACK_MODEL
 
+def _parse_round(text: str, actions: list[dict]) -> dict:
+    """Valida la respuesta JSON de una ronda; si no es válida, todos reciben la narración completa."""
     try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.85,
-            max_completion_tokens=400,
-        )
+        data = json.loads(text)
+        narration = str(data.get("narration", "")).strip()
+        players = {str(k): str(v).strip() for k, v in (data.get("players") or {}).items()}
+    except (ValueError, AttributeError):
+        narration, players = text, {}
+    return {
+        "narration": narration,
+        "players": {a["player"]: players.get(a["player"]) or narration for a in actions},
+    }
 
-        # Registrar tokens
-        usage = getattr(response, "usage", None)
-        if usage:
-            total = getattr(usage, "total_tokens", 0)
-            log_usage(model, total)
+# ================================================================
+# 📚 RESUMEN DE CAMPAÑA
+# ================================================================
+SUMMARY_PROMPT = """
+Eres el cronista de S.A.M. Mantén un resumen breve (máximo 150 palabras) de la campaña
+para que el Dungeon Master recuerde lo importante: lugares, NPCs, objetivos, deudas y consecuencias.
+Integra los nuevos sucesos en el resumen previo y descarta detalles irrelevantes.
+Responde solo con el resumen actualizado.
+"""
 
-        return response.choices[0].message.content.strip()
 
-    except Exception as e:
-        # Fallback automático
-        if model != FALLBACK_MODEL:
-            try:
-                response = client.chat.completions.create(
-                    model=FALLBACK_MODEL,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    temperature=0.85,
-                    max_completion_tokens=400,
-                )
-
-                usage = getattr(response, "usage", None)
+async def summarize_history(previous_summary: str, entries: list[dict], session_id: str | None = None) -> str | None:
+    """
+    Actualiza de forma incremental el resumen de campaña con nuevas entradas del historial.
+    Devuelve None si no se pudo generar (fallo, plazo o circuito abierto): las entradas
+    siguen pendientes de resumir y el llamador debe reintentarlo más adelante.
+    """
+    lines = "\n".join(f"- {e.get('player', '???')}: {e.get('action')} → {e.get('response')}" for e in entries)
+    user_prompt = f"Resumen previo:\n{previous_summary or '(vacío)'}\n\nNuevos sucesos:\n{lines}"
+    if not breakers.get(PRIMARY_MODEL).available():
+        return None
+    try:
+        with span("llm_summary"):
+            response = await _create_completion(
+                model=PRIMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.3,
+                max_completion_tokens=250,
+            )
+        log_usage(PRIMARY_MODEL, getattr(response, "usage", None), session_id)
+        return response.choices[0].message.content.strip() or None
+    except Exception:
+        return None
+
+# ================================================================
+# 📡 NARRACIÓN EN STREAMING
+# ================================================================
+async def _stream_completion(model: str, messages: list[dict], session_id: str | None = None) -> AsyncIterator[str]:
+    """Emite los fragmentos de texto de una completion según llegan."""
+    with span("llm_stream"):
+        async with limiter.slot():
+            stream = await get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.85,
+                max_completion_tokens=400,
+                stream=True,
+                timeout=_call_timeout(),
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+                usage = getattr(chunk, "usage", None)
                 if usage:
-                    total = getattr(usage, "total_tokens", 0)
-                    log_usage(FALLBACK_MODEL, total)
+                    log_usage(model, usage, session_id)
 
-                return response.choices[0].message.content.strip()
 
-            except Exception as e2:
-                return f"S.A.M. hace una pausa incómoda... (Error crítico del narrador: {e2})"
+async def stream_action(player: str, action: str, mode: str, context: dict | None = None,
+                        memory: list[dict] | None = None, session_id: str | None = None) -> AsyncIterator[str]:
+    """
+    Variante en streaming de `interpret_action`.
+    Si el modelo principal falla antes del primer token se reintenta con el fallback;
+    un fallo a mitad de narración se cierra con un mensaje del narrador.
+    Los modelos con el circuito abierto se saltan.
+    """
+    messages = _build_messages(player, action, mode, context, memory)
+    candidates = [m for m in _select_models(action, mode) if breakers.get(m).available()]
+
+    last_error: BaseException | None = None
+    for candidate in candidates:
+        breaker = breakers.get(candidate)
+        if not breaker.allow():
+            continue
+        probing = breaker.state == "half_open"
+        started = False
+        settled = False
+        try:
+            async for delta in _stream_completion(candidate, messages, session_id):
+                started = True
+                yield delta
+            breaker.record_success()
+            settled = True
+            return
+        except LLMOverloadedError:
+            raise
+        except Exception as e:
+            if not isinstance(e, DeadlineExceeded):
+                breaker.record_failure()
+                settled = True
+            if started:
+                yield f" ... (S.A.M. pierde el hilo: {e})"
+                return
+            last_error = e
+            if isinstance(e, DeadlineExceeded):
+                break
+        finally:
+            if probing and not settled:
+                breaker.release()
 
-        return f"S.A.M. se queda pensativo... (Error: {e})"
+    yield _failure_narration(last_error) if last_error else canned_narration()
@@ -0,0 +1,73 @@
+# sam-gameapi/bench/bench_encounters.py
+"""
+Micro-benchmark del motor de encuentros.
+Compara el coste por evento con tablas de distinto tamaño; con tablas de alias
+el tiempo por muestra debe mantenerse plano aunque crezca el número de entradas.
+
+Uso:  python -m bench.bench_encounters [--samples 200000] [--sizes 12,1000,10000,100000]
+"""
+import argparse
+import random
+import time
+
+from core.encounter_engine import EncounterIndex
+
+TYPES = {"exploration": 50, "social": 25, "weather": 15, "combat": 10}
+TAGS = ["bosque", "camino", "montaña", "ciudad", "cueva", "costa"]
+
+
+def synthetic_tables(size: int, rng: random.Random) -> dict:
+    """Tablas sintéticas con pesos, tags y rangos de nivel aleatorios."""
+    events = []
+    for i in range(size):
+        low = rng.randint(1, 15)
+        events.append({
+            "type": rng.choice(list(TYPES)),
+            "title": f"Evento {i}",
+            "description": "…",
+            "weight": rng.uniform(0.1, 5.0),
+            "tags": rng.sample(TAGS, rng.randint(0, 2)),
+            "min_level": low,
+            "max_level": rng.randint(low, 20),
+        })
+    return {"types": TYPES, "scene_keywords": {t: [t] for t in TAGS}, "events": events}
+
+
+def run(size: int, samples: int) -> None:
+    rng = random.Random(1234)
+    tables = synthetic_tables(size, rng)
+
+    start = time.perf_counter()
+    index = EncounterIndex(tables)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    contexts = [
+        {"scene": "Un camino en el bosque", "party_levels": [3, 4, 3]},
+        {"scene": "La ciudad portuaria", "party_levels": [9, 10]},
+        {"scene": "Llanura abierta", "party_levels": [1]},
+    ]
+    # Precalcular tags/nivel aísla el coste del muestreo del análisis de la escena
+    prepared = [(index.scene_tags(c), index.party_level(c)) for c in contexts]
+    for tags, level in prepared:
+        index.sample(rng, tags=tags, level=level)
+
+    start = time.perf_counter()
+    for i in range(samples):
+        tags, level = prepared[i % len(prepared)]
+        index.sample(rng, tags=tags, level=level)
+    elapsed = time.perf_counter() - start
+
+    print(f"{size:>8} entradas | índice {build_ms:8.1f} ms | {elapsed / samples * 1e9:7.0f} ns/evento")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--sizes", default="12,1000,10000,100000")
+    args = parser.parse_args()
+    for size in (int(s) for s in args.sizes.split(",")):
+        run(size, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# sam-gameapi/bench/fake_openai.py
+"""
+Servidor falso compatible con /v1/chat/completions para pruebas de carga sin gastar tokens.
+Latencia, tasa de errores y tokens devueltos son configurables (globales o por modelo).
+
+Formatos de latencia (milisegundos):
+  fixed:800            siempre 800 ms
+  uniform:200:1500     uniforme entre 200 y 1500 ms
+  lognormal:800:0.6    lognormal con mediana 800 ms y sigma 0.6 (cola larga realista)
+
+Uso:
+  python -m bench.fake_openai --port 8100 --latency lognormal:800:0.6 --error-rate 0.02
+  python -m bench.fake_openai --model-latency gpt-5=lognormal:2500:0.5 --model-error-rate gpt-4o-mini=0.5
+Luego arranca la API con LLM_BASE_URL=http://127.0.0.1:8100/v1 y OPENAI_API_KEY=fake.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "la antorcha chisporrotea mientras el grupo avanza entre sombras y ecos lejanos "
+    "un viento frío arrastra hojas secas y el olor a tierra mojada anuncia peligro "
+    "haz una tirada de Percepción Sabiduría CD 13 para descubrir qué acecha más adelante"
+).split()
+
+
+# ================================================================
+# 🎛️ PERFILES DE RESPUESTA
+# ================================================================
+def parse_latency(spec: str):
+    """Convierte `tipo:param[:param]` en una función que devuelve segundos."""
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda rng: rng.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+def _parse_overrides(items: list[str], parse) -> dict:
+    overrides = {}
+    for item in items or []:
+        model, _, value = item.partition("=")
+        overrides[model] = parse(value)
+    return overrides
+
+
+class Behaviour:
+    """Latencia, errores y tokens del servidor, con ajustes por modelo."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.rng = random.Random(args.seed)
+        self.latency = parse_latency(args.latency)
+        self.error_rate = args.error_rate
+        self.error_status = args.error_status
+        self.tokens = args.tokens
+        self.chunk_delay = args.chunk_delay_ms / 1000
+        self.model_latency = _parse_overrides(args.model_latency, parse_latency)
+        self.model_error_rate = _parse_overrides(args.model_error_rate, float)
+        self.stats = {"requests": 0, "errors": 0, "streams": 0, "completion_tokens": 0}
+
+    def delay(self, model: str) -> float:
+        return self.model_latency.get(model, self.latency)(self.rng)
+
+    def fails(self, model: str) -> bool:
+        return self.rng.random() < self.model_error_rate.get(model, self.error_rate)
+
+    def completion_tokens(self, limit: int | None) -> int:
+        tokens = max(int(self.rng.gauss(self.tokens, self.tokens * 0.25)), 1)
+        return min(tokens, limit) if limit else tokens
+
+    def text(self, tokens: int) -> str:
+        # ~1.3 tokens por palabra en castellano
+        count = max(int(tokens / 1.3), 1)
+        return " ".join(WORDS[i % len(WORDS)] for i in range(count)).capitalize() + "."
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+
+
+def _content(body: dict, text: str) -> str:
+    """Las rondas piden JSON; el resto, texto libre."""
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return json.dumps({"narration": text, "players": {}}, ensure_ascii=False)
+    return text
+
+# ================================================================
+# 🌐 SERVIDOR
+# ================================================================
+def create_app(behaviour: Behaviour) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.get("/stats")
+    def stats():
+        return behaviour.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "fake")
+        behaviour.stats["requests"] += 1
+        await asyncio.sleep(behaviour.delay(model))
+
+        if behaviour.fails(model):
+            behaviour.stats["errors"] += 1
+            return JSONResponse(
+                status_code=behaviour.error_status,
+                content={"error": {"message": "Fallo simulado", "type": "server_error", "code": None}},
+            )
+
+        prompt_tokens = _prompt_tokens(body.get("messages", []))
+        completion_tokens = behaviour.completion_tokens(body.get("max_completion_tokens") or body.get("max_tokens"))
+        behaviour.stats["completion_tokens"] += completion_tokens
+        content = _content(body, behaviour.text(completion_tokens))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": model}
+
+        if body.get("stream"):
+            behaviour.stats["streams"] += 1
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(
+                _stream(base, content, usage if include_usage else None, behaviour.chunk_delay),
+                media_type="text/event-stream",
+            )
+
+        return {
+            **base,
+            "object": "chat.completion",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    return app
+
+
+async def _stream(base: dict, content: str, usage: dict | None, chunk_delay: float):
+    """Emite la respuesta palabra a palabra en formato SSE de OpenAI."""
+    def chunk(delta: dict, finish: str | None = None, **extra) -> str:
+        payload = {**base, "object": "chat.completion.chunk",
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for i, word in enumerate(content.split(" ")):
+        yield chunk({"content": word if i == 0 else f" {word}"})
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
+    yield chunk({}, "stop")
+    if usage:
+        yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", default="lognormal:800:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--tokens", type=int, default=180, help="tokens de completion medios")
+    parser.add_argument("--chunk-delay-ms", type=float, default=10.0, help="pausa entre fragmentos en streaming")
+    parser.add_argument("--model-latency", action="append", metavar="MODELO=SPEC")
+    parser.add_argument("--model-error-rate", action="append", metavar="MODELO=TASA")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main() -> None:
+    import uvicorn
+
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(Behaviour(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
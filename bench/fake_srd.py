@@ -0,0 +1,158 @@
+# sam-gameapi/bench/fake_srd.py
+"""
+Servidor falso del SRDService para probar core/srd_client.py sin depender del real.
+Sirve el contrato que espera el cliente (GET /{kind}, GET /{kind}/{index} y
+POST /{kind}/batch) con datos sintéticos o con una copia local (--data), y simula
+latencia, errores y el arranque en frío de un servicio que se duerme al estar inactivo.
+
+Uso:
+  python -m bench.fake_srd --port 8200 --latency lognormal:120:0.5 --cold-start 8 --idle 60
+  python -m bench.fake_srd --data data/srd          # servir una copia local existente
+Luego arranca la API con SRD_SERVICE_URL=http://127.0.0.1:8200 (y SRD_BATCH_PATH=/{kind}/batch).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from bench.fake_openai import parse_latency
+from core.srd_client import KINDS, _by_index
+
+
+# ================================================================
+# 📚 DATOS
+# ================================================================
+def synthetic_data(per_kind: int) -> dict[str, dict[str, dict]]:
+    """`per_kind` documentos mínimos por tipo (`spell-0001`, `monster-0001`, ...)."""
+    data = {}
+    for kind in KINDS:
+        prefix = kind.rstrip("s")
+        data[kind] = {
+            f"{prefix}-{i:04d}": {"index": f"{prefix}-{i:04d}", "name": f"{prefix.title()} {i}", "level": i % 10}
+            for i in range(1, per_kind + 1)
+        }
+    return data
+
+
+def load_data(path: str) -> dict[str, dict[str, dict]]:
+    """Copia local con el formato de SRD_MIRROR_PATH (<kind>.json)."""
+    data = {}
+    for kind in KINDS:
+        file_path = os.path.join(path, f"{kind}.json")
+        if os.path.exists(file_path):
+            with open(file_path, "r", encoding="utf-8") as f:
+                data[kind] = _by_index(json.load(f))
+    return data
+
+
+class Behaviour:
+    """Latencia, errores y sueño del servicio."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.rng = random.Random(args.seed)
+        self.latency = parse_latency(args.latency)
+        self.error_rate = args.error_rate
+        self.cold_start = args.cold_start
+        self.idle = args.idle
+        self.last_request: float | None = None
+        self._waking: asyncio.Task | None = None
+        self.stats = {"requests": 0, "batches": 0, "documents": 0, "errors": 0, "cold_starts": 0}
+
+    async def respond_delay(self) -> None:
+        """Si lleva `idle` segundos sin peticiones, la siguiente (y las que lleguen a la vez) esperan el arranque."""
+        now = time.monotonic()
+        asleep = self.cold_start > 0 and (self.last_request is None or now - self.last_request > self.idle)
+        self.last_request = now
+        self.stats["requests"] += 1
+        if asleep and (self._waking is None or self._waking.done()):
+            self.stats["cold_starts"] += 1
+            self._waking = asyncio.create_task(asyncio.sleep(self.cold_start))
+        if self._waking is not None and not self._waking.done():
+            await asyncio.shield(self._waking)
+        await asyncio.sleep(self.latency(self.rng))
+
+    def fails(self) -> bool:
+        return self.rng.random() < self.error_rate
+
+
+# ================================================================
+# 🌐 SERVIDOR
+# ================================================================
+def create_app(data: dict[str, dict[str, dict]], behaviour: Behaviour) -> FastAPI:
+    app = FastAPI(title="Fake SRDService")
+
+    def error() -> JSONResponse:
+        behaviour.stats["errors"] += 1
+        return JSONResponse(status_code=503, content={"detail": "Fallo simulado"})
+
+    @app.get("/")
+    async def root():
+        await behaviour.respond_delay()
+        return {"service": "fake-srd", "kinds": {kind: len(docs) for kind, docs in data.items()}}
+
+    @app.get("/stats")
+    def stats():
+        return behaviour.stats
+
+    @app.get("/{kind}")
+    async def list_kind(kind: str):
+        await behaviour.respond_delay()
+        if kind not in data:
+            return JSONResponse(status_code=404, content={"detail": "Tipo desconocido"})
+        return {"count": len(data[kind]), "results": [{"index": index} for index in data[kind]]}
+
+    @app.get("/{kind}/{index}")
+    async def get_document(kind: str, index: str):
+        await behaviour.respond_delay()
+        if behaviour.fails():
+            return error()
+        doc = data.get(kind, {}).get(index)
+        if doc is None:
+            return JSONResponse(status_code=404, content={"detail": "No encontrado"})
+        behaviour.stats["documents"] += 1
+        return doc
+
+    @app.post("/{kind}/batch")
+    async def get_batch(kind: str, request: Request):
+        body = await request.json()
+        await behaviour.respond_delay()
+        if behaviour.fails():
+            return error()
+        behaviour.stats["batches"] += 1
+        docs = [data.get(kind, {}).get(index) for index in body.get("indexes", [])]
+        docs = [doc for doc in docs if doc is not None]
+        behaviour.stats["documents"] += len(docs)
+        return docs
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--data", default=None, help="carpeta con <kind>.json (por defecto, datos sintéticos)")
+    parser.add_argument("--per-kind", type=int, default=300, help="documentos sintéticos por tipo")
+    parser.add_argument("--latency", default="lognormal:120:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cold-start", type=float, default=0.0, help="segundos que tarda en despertar")
+    parser.add_argument("--idle", type=float, default=900.0, help="segundos sin peticiones antes de dormirse")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+def main() -> None:
+    import uvicorn
+
+    args = build_parser().parse_args()
+    data = load_data(args.data) if args.data else synthetic_data(args.per_kind)
+    uvicorn.run(create_app(data, Behaviour(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
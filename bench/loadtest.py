@@ -0,0 +1,259 @@
+# sam-gameapi/bench/loadtest.py
+"""
+Prueba de carga de la API: N jugadores virtuales juegan en paralelo contra /game/start,
+/game/action y /party/* y se informa de p50/p95/p99, throughput y E/S de storage.
+
+Una sonda consulta /health a intervalos fijos durante toda la prueba: si su latencia se
+dispara, algo está bloqueando el event loop (E/S síncrona, reescrituras de JSON...).
+
+Uso contra una API ya arrancada:
+  python -m bench.loadtest --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+
+Arrancando todo localmente (servidor OpenAI falso + API con datos temporales):
+  python -m bench.loadtest --spawn --concurrency 32 --duration 30 --fake-args "--latency lognormal:600:0.5"
+
+`--json resultados.json` guarda el informe para comparar entre versiones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+ACTIONS = [
+    "Examino las huellas del camino",
+    "Avanzo con cautela hacia la cueva",
+    "Hablo con el tabernero sobre los rumores",
+    "Trepo al árbol para ver más lejos",
+    "Busco trampas en la puerta",
+    "Pregunto al guardia por el camino al norte",
+]
+STORAGE_COUNTERS = ("reads", "cache_hits", "disk_reads", "writes", "disk_writes", "flushes", "flush_errors")
+
+
+# ================================================================
+# 📏 MEDICIÓN
+# ================================================================
+def percentile(values: list[float], q: float) -> float:
+    """Percentil por rango más cercano (0 si no hay muestras)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Recorder:
+    """Latencias y códigos de estado por endpoint."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][response.status_code] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            statuses = self.statuses[name]
+            endpoints[name] = {
+                "requests": len(values),
+                "ok": sum(n for code, n in statuses.items() if code < 400),
+                "statuses": {str(code): n for code, n in sorted(statuses.items())},
+                "transport_errors": self.errors.get(name, 0),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+                "rps": round(len(values) / elapsed, 2),
+            }
+        return endpoints
+
+# ================================================================
+# 🧙 JUGADORES VIRTUALES
+# ================================================================
+async def player_loop(client: httpx.AsyncClient, recorder: Recorder, session_id: str, player: str,
+                      leader: bool, stop_at: float, rng: random.Random) -> None:
+    """Un jugador: entra al grupo y alterna acciones con consultas y cambios de party."""
+    if leader:
+        await recorder.call(client, "/game/start", "POST", "/game/start",
+                            json={"session_id": session_id, "party_levels": [rng.randint(1, 10)]})
+    await recorder.call(client, "/party/join", "POST", "/party/join",
+                        json={"session_id": session_id, "player": player})
+
+    while time.monotonic() < stop_at:
+        roll = rng.random()
+        if roll < 0.8:
+            # Clave única por acción, como la que enviaría un cliente que reintenta
+            await recorder.call(client, "/game/action", "POST", "/game/action",
+                                json={"session_id": session_id, "player": player, "action": rng.choice(ACTIONS)},
+                                headers={"Idempotency-Key": uuid.uuid4().hex})
+        elif roll < 0.9:
+            await recorder.call(client, "/party", "GET", "/party", params={"session_id": session_id})
+        else:
+            body = {"session_id": session_id, "player": player}
+            await recorder.call(client, "/party/leave", "POST", "/party/leave", json=body)
+            await recorder.call(client, "/party/join", "POST", "/party/join", json=body)
+
+
+async def health_probe(client: httpx.AsyncClient, recorder: Recorder, stop_at: float, interval: float) -> None:
+    """Sonda de latencia del event loop: /health no hace E/S ni llama al modelo."""
+    while time.monotonic() < stop_at:
+        await recorder.call(client, "health_probe", "GET", "/health")
+        await asyncio.sleep(interval)
+
+
+async def fetch_json(client: httpx.AsyncClient, path: str) -> dict:
+    try:
+        response = await client.get(path)
+        return response.json() if response.status_code == 200 else {}
+    except (httpx.HTTPError, ValueError):
+        return {}
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    run_id = uuid.uuid4().hex[:6]
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        before = await fetch_json(client, "/storage/stats")
+        recorder = Recorder()
+        start = time.monotonic()
+        stop_at = start + args.duration
+
+        sessions = max(1, min(args.sessions, args.concurrency))
+        tasks = [asyncio.create_task(health_probe(client, recorder, stop_at, args.probe_interval))]
+        for i in range(args.concurrency):
+            session_id = f"load-{run_id}-{i % sessions}"
+            tasks.append(asyncio.create_task(player_loop(
+                client, recorder, session_id, f"jugador{i}", i < sessions, stop_at, random.Random(rng.random()),
+            )))
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+
+        after = await fetch_json(client, "/storage/stats")
+
+    endpoints = recorder.summary(elapsed)
+    game_requests = sum(e["requests"] for name, e in endpoints.items() if name != "health_probe")
+    actions = endpoints.get("/game/action", {}).get("requests", 0)
+    storage_io = {key: after.get(key, 0) - before.get(key, 0) for key in STORAGE_COUNTERS if key in after}
+    if actions:
+        storage_io["disk_writes_per_action"] = round(storage_io.get("disk_writes", 0) / actions, 3)
+    return {
+        "config": {"url": args.url, "concurrency": args.concurrency, "sessions": sessions,
+                   "duration": args.duration},
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(game_requests / elapsed, 2),
+        "actions_per_s": round(actions / elapsed, 2),
+        "endpoints": endpoints,
+        "storage": storage_io,
+    }
+
+# ================================================================
+# 🚀 ARRANQUE LOCAL
+# ================================================================
+def spawn_stack(args: argparse.Namespace) -> tuple[list[subprocess.Popen], str, str]:
+    """Arranca el servidor falso y la API (con DATA_PATH temporal) como subprocesos."""
+    data_path = tempfile.mkdtemp(prefix="sam-load-")
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "bench.fake_openai", "--port", str(args.fake_port), *shlex.split(args.fake_args)],
+    )
+    env = {
+        **os.environ,
+        "LLM_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+        "OPENAI_API_KEY": "fake",
+        "DATA_PATH": data_path,
+        "NARRATION_PREWARM_INTERVAL": "0",
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port), "--log-level", "warning"],
+        env=env,
+    )
+    return [fake, api], f"http://127.0.0.1:{args.api_port}", data_path
+
+
+async def wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.3)
+    raise RuntimeError(f"La API no respondió en {url} tras {timeout:.0f}s")
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['config']['concurrency']} jugadores, {report['config']['sessions']} sesiones, "
+          f"{report['elapsed_s']} s")
+    print(f"{'endpoint':<16} {'n':>7} {'ok':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'req/s':>8}")
+    for name, e in report["endpoints"].items():
+        print(f"{name:<16} {e['requests']:>7} {e['ok']:>7} {e['p50_ms']:>8} {e['p95_ms']:>8} "
+              f"{e['p99_ms']:>8} {e['max_ms']:>8} {e['rps']:>8}")
+        other = {code: n for code, n in e["statuses"].items() if int(code) >= 400}
+        if other or e["transport_errors"]:
+            print(f"{'':<16} errores: {other} transporte: {e['transport_errors']}")
+    print(f"\nthroughput: {report['throughput_rps']} req/s | acciones: {report['actions_per_s']} /s")
+    if report["storage"]:
+        print("storage:", ", ".join(f"{k}={v}" for k, v in report["storage"].items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sessions", type=int, default=4, help="sesiones entre las que se reparten los jugadores")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--probe-interval", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="guardar el informe en este archivo")
+    parser.add_argument("--spawn", action="store_true", help="arrancar servidor falso y API locales")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--fake-port", type=int, default=8100)
+    parser.add_argument("--fake-args", default="", help="argumentos para bench.fake_openai")
+    args = parser.parse_args()
+
+    processes, data_path = [], None
+    try:
+        if args.spawn:
+            processes, args.url, data_path = spawn_stack(args)
+            asyncio.run(wait_ready(args.url))
+        report = asyncio.run(run_load(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+        if data_path:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# sam-gameapi/core/encounter_engine.py
+import os
+import random
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from core.encounter_tables import MAX_LEVEL, MIN_LEVEL, load_encounter_tables
+from utils.tracing import logger
+
+EVENT_SEED = os.getenv("EVENT_SEED")   # semilla opcional para partidas reproducibles
+COMBO_CACHE_SIZE = 256                 # combinaciones de tags de escena precompiladas
+
+
+# ================================================================
+# 🎯 MUESTREO PONDERADO O(1)
+# ================================================================
+class AliasTable:
+    """
+    Tabla de alias de Vose: se construye en O(n) y muestrea en O(1)
+    con cualquier distribución de pesos.
+    """
+
+    def __init__(self, items: list, weights: list[float]):
+        if not items:
+            raise ValueError("AliasTable necesita al menos un elemento.")
+        n = len(items)
+        total = float(sum(weights))
+        scaled = [w * n / total for w in weights]
+        self.items = items
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def sample(self, rng: random.Random):
+        i = int(rng.random() * len(self.items))
+        return self.items[i] if rng.random() < self._prob[i] else self.items[self._alias[i]]
+
+
+# ================================================================
+# 🗂️ ÍNDICE DE ENCUENTROS
+# ================================================================
+def _fold(text: str) -> str:
+    """Minúsculas y sin tildes, para comparar palabras clave."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class EncounterIndex:
+    """
+    Índice precompilado de las tablas de encuentros.
+    Para cada (tipo, nivel) y (tipo, nivel, tag) guarda una AliasTable, de modo que
+    elegir un evento cuesta O(1) sin importar cuántas entradas tengan las tablas.
+    Las combinaciones de varios tags de escena se compilan la primera vez y se cachean.
+    Si ningún evento encaja, se relajan los tags y luego el tipo, pero nunca el nivel.
+    """
+
+    def __init__(self, tables: dict):
+        self.events = tables["events"]
+        present = {e["type"] for e in self.events}
+        self.type_weights = {t: float(w) for t, w in tables["types"].items() if w > 0 and t in present}
+        self.scene_keywords = {
+            tag: [_fold(w) for w in words] for tag, words in tables.get("scene_keywords", {}).items()
+        }
+        self._type_table = AliasTable(list(self.type_weights), list(self.type_weights.values()))
+        self._generic: dict[tuple[str, int], list[dict]] = {}
+        self._tagged: dict[tuple[str, int, str], list[dict]] = {}
+        self._tables: dict[tuple, AliasTable] = {}
+        self._any_tag: dict[tuple[str, int], AliasTable] = {}     # (tipo, nivel) → eventos con cualquier tag
+        self._level_types: dict[int, AliasTable] = {}             # nivel → tipos con algún evento a ese nivel
+        self._combos: OrderedDict[tuple, AliasTable | None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._compile()
+
+    def _compile(self) -> None:
+        for event in self.events:
+            for level in range(max(event["min_level"], MIN_LEVEL), min(event["max_level"], MAX_LEVEL) + 1):
+                if event["tags"]:
+                    for tag in event["tags"]:
+                        self._tagged.setdefault((event["type"], level, tag), []).append(event)
+                else:
+                    self._generic.setdefault((event["type"], level), []).append(event)
+
+        by_type: dict[str, list[dict]] = {}
+        for event in self.events:
+            by_type.setdefault(event["type"], []).append(event)
+
+        groups = [*self._generic.items(), *self._tagged.items(), *(((t,), e) for t, e in by_type.items())]
+        for key, events in groups:
+            self._tables[key] = AliasTable(events, [e["weight"] for e in events])
+
+        by_level: dict[tuple[str, int], list[dict]] = {}
+        for event in self.events:
+            for level in range(max(event["min_level"], MIN_LEVEL), min(event["max_level"], MAX_LEVEL) + 1):
+                by_level.setdefault((event["type"], level), []).append(event)
+        for key, events in by_level.items():
+            self._any_tag[key] = AliasTable(events, [e["weight"] for e in events])
+        for level in range(MIN_LEVEL, MAX_LEVEL + 1):
+            types = [t for t in self.type_weights if (t, level) in self._any_tag]
+            if types:
+                self._level_types[level] = AliasTable(types, [self.type_weights[t] for t in types])
+
+    # ------------------------------------------------------------
+    def scene_tags(self, context: dict | None) -> frozenset[str]:
+        """Tags de la escena: los explícitos del estado más los deducidos por palabras clave."""
+        if not context:
+            return frozenset()
+        tags = {t.lower() for t in context.get("tags") or []}
+        text = _fold(f"{context.get('scene', '')} {context.get('description', '')}")
+        for tag, words in self.scene_keywords.items():
+            if any(w in text for w in words):
+                tags.add(tag)
+        return frozenset(tags)
+
+    @staticmethod
+    def party_level(context: dict | None) -> int:
+        levels = (context or {}).get("party_levels") or [MIN_LEVEL]
+        level = round(sum(levels) / len(levels))
+        return min(max(level, MIN_LEVEL), MAX_LEVEL)
+
+    def _table_for(self, event_type: str, level: int, tags: frozenset[str]) -> AliasTable | None:
+        """Tabla de alias para eventos genéricos + los de cualquiera de los tags de la escena."""
+        if not tags:
+            return self._tables.get((event_type, level))
+        if len(tags) == 1:
+            (tag,) = tags
+            generic = self._generic.get((event_type, level), [])
+            tagged = self._tagged.get((event_type, level, tag), [])
+            if not tagged:
+                return self._tables.get((event_type, level))
+            if not generic:
+                return self._tables[(event_type, level, tag)]
+
+        key = (event_type, level, tags)
+        with self._lock:
+            if key in self._combos:
+                self._combos.move_to_end(key)
+                return self._combos[key]
+
+        seen: dict[int, dict] = {id(e): e for e in self._generic.get((event_type, level), [])}
+        for tag in tags:
+            for event in self._tagged.get((event_type, level, tag), []):
+                seen.setdefault(id(event), event)
+        events = list(seen.values())
+        table = AliasTable(events, [e["weight"] for e in events]) if events else None
+
+        with self._lock:
+            self._combos[key] = table
+            while len(self._combos) > COMBO_CACHE_SIZE:
+                self._combos.popitem(last=False)
+        return table
+
+    def sample(self, rng: random.Random, context: dict | None = None,
+               tags: frozenset[str] | None = None, level: int | None = None) -> dict:
+        """
+        Elige tipo y evento según los pesos, filtrando por tags de escena y nivel del grupo.
+        Sin eventos para la escena se prueba con cualquier tag del mismo tipo y nivel; sin
+        eventos de ese tipo al nivel, se sortea otro tipo que sí los tenga. Solo si el nivel
+        no tiene ningún evento se ignora el rango de niveles (y se avisa en el log).
+        """
+        tags = self.scene_tags(context) if tags is None else tags
+        level = self.party_level(context) if level is None else level
+        event_type = self._type_table.sample(rng)
+
+        table = self._table_for(event_type, level, tags) or self._any_tag.get((event_type, level))
+        if table is None and level in self._level_types:
+            event_type = self._level_types[level].sample(rng)
+            table = self._table_for(event_type, level, tags) or self._any_tag[(event_type, level)]
+        if table is None:
+            logger.warning("encounter_level_fallback", extra={"trace": {"type": event_type, "level": level}})
+            table = self._tables[(event_type,)]
+        return table.sample(rng)
+
+
+_index: EncounterIndex | None = None
+_index_lock = threading.Lock()
+_rng = random.Random(EVENT_SEED)
+
+
+def get_encounter_index() -> EncounterIndex:
+    """Índice compartido; las tablas se leen y compilan una sola vez por proceso."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = EncounterIndex(load_encounter_tables())
+        return _index
+
+
+def get_rng() -> random.Random:
+    """RNG compartido de eventos (determinista si se define EVENT_SEED)."""
+    return _rng
@@ -1,73 +1,58 @@
 # sam-gameapi/core/encounter_tables.py
+import json
+import os
 
-# ================================================================
-# 🌲 EVENTOS DE EXPLORACIÓN
-# ================================================================
-EXPLORATION_EVENTS = [
-    {
-        "title": "Restos de un campamento abandonado",
-        "description": "Entre la maleza se hallan utensilios oxidados, un fuego apagado y un mapa quemado a medias."
-    },
-    {
-        "title": "Un sendero oculto",
-        "description": "Un rastro apenas visible lleva a una pequeña cueva cubierta por musgo."
-    },
-    {
-        "title": "Ecos en la distancia",
-        "description": "Un sonido profundo reverbera a lo lejos. Podría ser el viento... o algo más grande."
-    }
-]
+# Las tablas de encuentros viven en archivos JSON (core/tables/*.json por defecto).
+# Cada archivo puede aportar pesos por tipo, palabras clave de escena y eventos;
+# si hay varios, se fusionan en orden alfabético.
+ENCOUNTER_TABLES_PATH = os.getenv(
+    "ENCOUNTER_TABLES_PATH", os.path.join(os.path.dirname(__file__), "tables")
+)
 
-# ================================================================
-# ⚔️ EVENTOS DE COMBATE
-# ================================================================
-COMBAT_EVENTS = [
-    {
-        "title": "Emboscada goblin",
-        "description": "Desde los arbustos, una banda de goblins lanza flechas con chillidos salvajes."
-    },
-    {
-        "title": "Bestia errante",
-        "description": "Una criatura cubierta de cicatrices se aproxima, atraída por el olor del campamento."
-    },
-    {
-        "title": "Duelo inesperado",
-        "description": "Un cazador local confunde al grupo con bandidos y desenvaina su espada."
-    }
-]
+MIN_LEVEL = 1
+MAX_LEVEL = 20
 
-# ================================================================
-# 🗣️ EVENTOS SOCIALES
-# ================================================================
-SOCIAL_EVENTS = [
-    {
-        "title": "Encuentro con un mercader",
-        "description": "Un viajero cansado ofrece mercancías exóticas y rumores sobre ruinas cercanas."
-    },
-    {
-        "title": "Rumores en el camino",
-        "description": "Un bardo itinerante comparte historias de héroes caídos y tesoros malditos."
-    },
-    {
-        "title": "Pedido de ayuda",
-        "description": "Una campesina desesperada pide auxilio: su hijo fue visto por última vez siguiendo luces en el bosque."
-    }
-]
 
 # ================================================================
-# 🌦️ EVENTOS CLIMÁTICOS
-# ================================================================
-WEATHER_EVENTS = [
-    {
-        "title": "Tormenta repentina",
-        "description": "El cielo se oscurece sin aviso y relámpagos iluminan el horizonte."
-    },
-    {
-        "title": "Niebla espesa",
-        "description": "Una niebla sobrenatural reduce la visibilidad y altera los sonidos del bosque."
-    },
-    {
-        "title": "Día de calma inquietante",
-        "description": "Todo se vuelve demasiado silencioso; ni el viento ni los animales hacen ruido alguno."
+# 📥 CARGA DE TABLAS
+# ================================================================
+def load_encounter_tables(path: str | None = None) -> dict:
+    """
+    Carga y normaliza las tablas de encuentros desde un archivo o carpeta de JSON.
+    Devuelve {"types": {tipo: peso}, "scene_keywords": {tag: [palabras]}, "events": [...]}.
+    """
+    path = path or ENCOUNTER_TABLES_PATH
+    if os.path.isdir(path):
+        files = [os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(".json")]
+    else:
+        files = [path]
+
+    tables = {"types": {}, "scene_keywords": {}, "events": []}
+    for file in files:
+        with open(file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        tables["types"].update(data.get("types", {}))
+        for tag, words in data.get("scene_keywords", {}).items():
+            tables["scene_keywords"].setdefault(tag, []).extend(w.lower() for w in words)
+        tables["events"].extend(_normalize_event(e, file) for e in data.get("events", []))
+
+    for event in tables["events"]:
+        tables["types"].setdefault(event["type"], 1)
+    return tables
+
+
+def _normalize_event(event: dict, source: str) -> dict:
+    """Completa los campos opcionales de un evento y valida los obligatorios."""
+    missing = [k for k in ("type", "title", "description") if not event.get(k)]
+    if missing:
+        raise ValueError(f"Evento sin {', '.join(missing)} en {source}: {event!r}")
+    weight = float(event.get("weight", 1))
+    if weight <= 0:
+        raise ValueError(f"Peso no positivo en {source}: {event['title']!r}")
+    return {
+        **event,
+        "weight": weight,
+        "tags": [t.lower() for t in event.get("tags", [])],
+        "min_level": int(event.get("min_level", MIN_LEVEL)),
+        "max_level": int(event.get("max_level", MAX_LEVEL)),
     }
-]
@@ -1,8 +1,9 @@
 # sam-gameapi/core/event_system.py
 import random
 from datetime import datetime
-from utils import storage
-from core.encounter_tables import EXPLORATION_EVENTS, COMBAT_EVENTS, SOCIAL_EVENTS, WEATHER_EVENTS
+from utils.event_log import get_event_log
+from utils.tracing import span
+from core.encounter_engine import EncounterIndex, get_encounter_index, get_rng
 
 
 class EventSystem:
@@ -11,27 +12,31 @@ class EventSystem:
     Selecciona y crea eventos según tipo, contexto o probabilidad.
     """
 
-    def __init__(self):
-        self.event_log_file = "event_log.json"
+    def __init__(self, index: EncounterIndex | None = None, rng: random.Random | None = None):
+        self.event_log = get_event_log()
+        self.index = index or get_encounter_index()
+        self.rng = rng or get_rng()
 
     # ============================================================
     # 🎲 FUNCIÓN PRINCIPAL
     # ============================================================
-    def generate_event(self, context: dict | None = None) -> dict:
+    def generate_event(self, context: dict | None = None, session_id: str | None = None) -> dict:
         """
         Genera un evento aleatorio según el contexto actual.
+        El tipo y el evento se eligen por peso entre los aptos para la escena y el nivel del grupo.
         Devuelve un dict con el evento elegido.
         """
-        event_type = self._select_event_type()
-        event_table = self._get_table(event_type)
-        event = random.choice(event_table)
+        with span("event_select"):
+            event = self.index.sample(self.rng, context)
 
         event_entry = {
             "timestamp": datetime.utcnow().isoformat(),
-            "type": event_type,
+            "type": event["type"],
             "title": event["title"],
             "description": event["description"],
         }
+        if session_id:
+            event_entry["session_id"] = session_id
 
         # Registrar evento en log local
         self._log_event(event_entry)
@@ -39,49 +44,29 @@ class EventSystem:
         return event_entry
 
     # ============================================================
-    # 🔮 SELECCIÓN DE TIPO DE EVENTO
+    # 📜 TABLAS DE EVENTOS
     # ============================================================
-    def _select_event_type(self) -> str:
+    def all_events(self) -> list[dict]:
         """
-        Define el tipo de evento a generar según probabilidad.
+        Todos los eventos de todas las tablas, con su tipo (para precalentar narraciones).
         """
-        roll = random.random()
-        if roll < 0.5:
-            return "exploration"
-        elif roll < 0.75:
-            return "social"
-        elif roll < 0.9:
-            return "weather"
-        else:
-            return "combat"
+        return list(self.index.events)
 
     # ============================================================
-    # 📜 TABLAS DE EVENTOS
+    # 🧾 REGISTRO EN LOG LOCAL
     # ============================================================
-    def _get_table(self, event_type: str) -> list[dict]:
+    def _log_event(self, event: dict):
         """
-        Devuelve la tabla correspondiente al tipo de evento.
+        Añade el evento generado al log rotativo (ring buffer + segmentos JSONL).
         """
-        if event_type == "exploration":
-            return EXPLORATION_EVENTS
-        elif event_type == "combat":
-            return COMBAT_EVENTS
-        elif event_type == "social":
-            return SOCIAL_EVENTS
-        elif event_type == "weather":
-            return WEATHER_EVENTS
-        else:
-            return []
+        self.event_log.append(event)
 
     # ============================================================
-    # 🧾 REGISTRO EN LOG LOCAL
+    # 🔎 CONSULTA DE EVENTOS
     # ============================================================
-    def _log_event(self, event: dict):
+    def recent_events(self, event_type: str | None = None, since: str | None = None,
+                      until: str | None = None, session_id: str | None = None, limit: int = 50) -> list[dict]:
         """
-        Guarda el evento generado en un archivo JSON local.
+        Devuelve los eventos más recientes filtrados por tipo, sesión y rango de tiempo (ISO 8601).
         """
-        data = storage.read_json(self.event_log_file)
-        events = data.get("events", [])
-        events.append(event)
-        data["events"] = events
-        storage.write_json(self.event_log_file, data)
+        return self.event_log.query(event_type, since, until, session_id, limit)
@@ -0,0 +1,189 @@
+# sam-gameapi/core/idempotency.py
+import asyncio
+import copy
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from utils import storage
+
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "300"))                  # segundos, con Idempotency-Key
+IDEMPOTENCY_DERIVED_TTL = float(os.getenv("IDEMPOTENCY_DERIVED_TTL", "0"))    # segundos, clave derivada
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "4096"))
+IDEMPOTENCY_LEASE = float(os.getenv("IDEMPOTENCY_LEASE", "60"))              # segundos que dura "en curso" entre workers
+IDEMPOTENCY_POLL = 0.1                                                       # segundos entre consultas al worker que la ejecuta
+
+
+class IdempotencyKeyReused(ValueError):
+    """La misma Idempotency-Key llegó con otra acción."""
+
+
+def fingerprint(session_id: str, player: str, action: str) -> str:
+    """Huella de una acción: mismo jugador, sesión y texto (sin distinguir mayúsculas ni espacios)."""
+    normalized = " ".join(action.split()).casefold()
+    return hashlib.sha256(f"{session_id}\x1f{player}\x1f{normalized}".encode("utf-8")).hexdigest()
+
+
+def action_key(session_id: str, player: str, action: str, explicit_key: str | None = None) -> tuple[str, str, float]:
+    """
+    (clave, huella, ttl) de una acción. Con Idempotency-Key la clave es la del cliente
+    (por sesión) y se recuerda IDEMPOTENCY_TTL; sin ella se deriva de la propia acción
+    y se recuerda IDEMPOTENCY_DERIVED_TTL, por defecto 0: solo se unen los duplicados
+    simultáneos y repetir una acción a propósito vuelve a narrarse.
+    """
+    digest = fingerprint(session_id, player, action)
+    if explicit_key:
+        return f"{session_id}:{explicit_key}", digest, IDEMPOTENCY_TTL
+    return digest, digest, IDEMPOTENCY_DERIVED_TTL
+
+
+class IdempotencyCache:
+    """
+    Deduplica peticiones repetidas. La primera ejecuta la operación en una tarea propia;
+    los duplicados concurrentes esperan esa misma tarea y los posteriores reciben el
+    resultado guardado mientras no caduque. Si el cliente original se desconecta la tarea
+    sigue y su resultado queda para el reintento. Los errores no se guardan.
+    Solo se usa desde el event loop, así que no necesita locks.
+
+    Con varios workers (storage.SHARED) y un `shared_file`, las claves también se anotan
+    en ese documento de storage: un reintento que llega a otro worker espera a que el
+    primero termine ("en curso" dura IDEMPOTENCY_LEASE) o recibe el resultado guardado.
+    """
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._results: OrderedDict[str, tuple[str, Any, float]] = OrderedDict()   # clave → (huella, resultado, caduca)
+        self._inflight: dict[str, tuple[str, asyncio.Task]] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.replayed = 0
+
+    async def run(self, key: str, digest: str, ttl: float, operation: Callable[[], Awaitable[Any]],
+                  shared_file: str | None = None) -> tuple[Any, str]:
+        """Devuelve (resultado, origen), con origen "executed", "coalesced" o "replayed"."""
+        stored = self._fresh(key)
+        if stored is not None:
+            self._check(stored[0], digest)
+            self.replayed += 1
+            return copy.deepcopy(stored[1]), "replayed"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._check(inflight[0], digest)
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(inflight[1])), "coalesced"
+
+        if shared_file and storage.SHARED and ttl > 0:
+            waited = False
+            while True:
+                record = await asyncio.to_thread(_claim, shared_file, key, digest)
+                if record is None:
+                    break
+                # Otra petición (de otro worker, o de este en una carrera) tiene la clave
+                self._check(record["digest"], digest)
+                if record["status"] == "done":
+                    if waited:
+                        self.coalesced += 1
+                        return copy.deepcopy(record["result"]), "coalesced"
+                    self.replayed += 1
+                    return copy.deepcopy(record["result"]), "replayed"
+                waited = True
+                await asyncio.sleep(IDEMPOTENCY_POLL)
+            operation = _publishing(operation, shared_file, key, digest, ttl)
+
+        task = asyncio.create_task(operation())
+        self._inflight[key] = (digest, task)
+        task.add_done_callback(lambda t: self._settle(key, digest, ttl, t))
+        self.executed += 1
+        return copy.deepcopy(await asyncio.shield(task)), "executed"
+
+    @staticmethod
+    def _check(stored_digest: str, digest: str) -> None:
+        if stored_digest != digest:
+            raise IdempotencyKeyReused("Idempotency-Key ya usada con otra acción.")
+
+    def _fresh(self, key: str) -> tuple[str, Any, float] | None:
+        stored = self._results.get(key)
+        if stored is None:
+            return None
+        if stored[2] <= time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return stored
+
+    def _settle(self, key: str, digest: str, ttl: float, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Leer la excepción evita el aviso de "never retrieved" si todos los clientes se fueron
+        if task.cancelled() or task.exception() is not None or ttl <= 0:
+            return
+        self._results[key] = (digest, task.result(), time.monotonic() + ttl)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_keys:
+            self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._results),
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "shared": storage.SHARED,
+        }
+
+
+# ================================================================
+# 🧵 CLAVES COMPARTIDAS ENTRE WORKERS
+# ================================================================
+def _claim(shared_file: str, key: str, digest: str) -> Dict[str, Any] | None:
+    """
+    Marca la clave como "en curso" si nadie la tiene y devuelve None; si ya la tiene
+    alguien (en curso o terminada, sin caducar), devuelve ese registro. Poda las caducadas.
+    """
+    record = storage.read_json(shared_file).get(key)
+    if record is not None and record.get("expires", 0) > time.time():
+        return record   # sin escribir: mientras se espera al otro worker solo se lee
+
+    def claim(data: dict) -> Dict[str, Any] | None:
+        now = time.time()
+        for expired in [k for k, record in data.items() if record.get("expires", 0) <= now]:
+            del data[expired]
+        record = data.get(key)
+        if record is not None:
+            return record
+        data[key] = {"digest": digest, "status": "pending", "expires": now + IDEMPOTENCY_LEASE}
+        return None
+
+    return storage.update_json(shared_file, claim)
+
+
+def _finish(shared_file: str, key: str, digest: str, result: Any, ttl: float | None) -> None:
+    """Guarda el resultado de la clave (o, con `ttl` None, la libera tras un error)."""
+    def finish(data: dict) -> None:
+        if ttl is None:
+            data.pop(key, None)
+        else:
+            data[key] = {"digest": digest, "status": "done", "result": result, "expires": time.time() + ttl}
+
+    storage.update_json(shared_file, finish)
+
+
+def _publishing(operation: Callable[[], Awaitable[Any]], shared_file: str, key: str, digest: str,
+                ttl: float) -> Callable[[], Awaitable[Any]]:
+    """Envuelve la operación para publicar su resultado (o liberar la clave) en el documento compartido."""
+    async def run() -> Any:
+        try:
+            result = await operation()
+        except BaseException:
+            await asyncio.to_thread(_finish, shared_file, key, digest, None, None)
+            raise
+        await asyncio.to_thread(_finish, shared_file, key, digest, result, ttl)
+        return result
+
+    return run
+
+
+idempotency = IdempotencyCache()
@@ -0,0 +1,148 @@
+# sam-gameapi/core/model_router.py
+import os
+import threading
+import time
+from collections import deque
+
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))                  # llamadas recordadas por modelo
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "20"))         # antes de fiarse del p95
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.25"))
+ROUTER_LATENCY_SLO = float(os.getenv("ROUTER_LATENCY_SLO", "12.0"))     # segundos (p95 aceptable)
+ROUTER_SAMPLE_TTL = float(os.getenv("ROUTER_SAMPLE_TTL", "300"))        # segundos que cuenta cada llamada
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") != "0"
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "6.0"))    # sin datos suficientes
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+
+
+def _parse_costs(raw: str) -> dict[str, float]:
+    """`modelo:coste,modelo:coste` → dict (coste relativo por token)."""
+    costs = {}
+    for item in raw.split(","):
+        name, _, value = item.partition(":")
+        if name.strip() and value.strip():
+            costs[name.strip()] = float(value)
+    return costs
+
+
+MODEL_COSTS = _parse_costs(os.getenv("MODEL_COSTS", "gpt-4o-mini:0.15,gpt-5:1.25"))
+
+
+class ModelStats:
+    """
+    Latencias y resultados de las últimas llamadas a un modelo.
+    Cada muestra caduca a los `ttl` segundos: un modelo descartado apenas recibe tráfico
+    (y nada si la cobertura está desactivada), así que sin caducidad no volvería a estar sano nunca.
+    """
+
+    def __init__(self, window: int = ROUTER_WINDOW, ttl: float = ROUTER_SAMPLE_TTL):
+        self.ttl = ttl
+        self._latencies: deque = deque(maxlen=window)   # (instante, segundos)
+        self._outcomes: deque = deque(maxlen=window)    # (instante, ok)
+        self.hedges_won = 0
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        if ok:
+            self._latencies.append((now, latency))
+
+    def _expire(self) -> None:
+        if self.ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl
+        for samples in (self._outcomes, self._latencies):
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+
+    @property
+    def latencies(self) -> list[float]:
+        self._expire()
+        return [latency for _, latency in self._latencies]
+
+    @property
+    def outcomes(self) -> list[bool]:
+        self._expire()
+        return [ok for _, ok in self._outcomes]
+
+    def percentile(self, q: float) -> float | None:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        outcomes = self.outcomes
+        if not outcomes:
+            return 0.0
+        return 1 - sum(outcomes) / len(outcomes)
+
+    def snapshot(self) -> dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "samples": len(self.outcomes),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ModelRouter:
+    """
+    Elige modelo según latencia, errores y coste, y decide cuándo lanzar una petición de cobertura.
+
+    Política: se usa el modelo más barato salvo que la acción pida calidad (diálogo),
+    y se descarta cualquier modelo con demasiados errores o con un p95 por encima del SLO
+    cuando la alternativa está sana. El otro modelo queda como respaldo/cobertura.
+    """
+
+    def __init__(self, models: list[str], costs: dict[str, float] | None = None):
+        self.costs = costs or MODEL_COSTS
+        self.models = sorted(dict.fromkeys(models), key=lambda m: self.costs.get(m, 1.0))
+        self._stats = {m: ModelStats() for m in self.models}
+        self._lock = threading.Lock()
+
+    def stats_for(self, model: str) -> ModelStats:
+        with self._lock:
+            if model not in self._stats:
+                self._stats[model] = ModelStats()
+            return self._stats[model]
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        stats = self.stats_for(model)
+        with self._lock:
+            stats.record(latency, ok)
+
+    def record_hedge_win(self, model: str) -> None:
+        stats = self.stats_for(model)
+        with self._lock:
+            stats.hedges_won += 1
+
+    def healthy(self, model: str) -> bool:
+        stats = self.stats_for(model)
+        with self._lock:
+            if len(stats.outcomes) < ROUTER_MIN_SAMPLES:
+                return True
+            p95 = stats.percentile(0.95)
+            return stats.error_rate <= ROUTER_MAX_ERROR_RATE and (p95 is None or p95 <= ROUTER_LATENCY_SLO)
+
+    def route(self, prefer_quality: bool = False) -> list[str]:
+        """Modelos en orden de preferencia: el primero se usa, el resto son respaldo."""
+        ordered = list(reversed(self.models)) if prefer_quality else list(self.models)
+        healthy = [m for m in ordered if self.healthy(m)]
+        return healthy + [m for m in ordered if m not in healthy]
+
+    def hedge_delay(self, model: str) -> float | None:
+        """Segundos a esperar antes de lanzar la cobertura (None = no cubrir)."""
+        if not HEDGE_ENABLED:
+            return None
+        stats = self.stats_for(model)
+        with self._lock:
+            if len(stats.latencies) < ROUTER_MIN_SAMPLES:
+                return HEDGE_DEFAULT_DELAY
+            return max(stats.percentile(0.95), HEDGE_MIN_DELAY)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {m: s.snapshot() for m, s in self._stats.items()}
@@ -0,0 +1,77 @@
+# sam-gameapi/core/narration_cache.py
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+NARRATION_CACHE_SIZE = int(os.getenv("NARRATION_CACHE_SIZE", "256"))   # claves (evento, escena)
+NARRATION_VARIANTS = int(os.getenv("NARRATION_VARIANTS", "3"))         # variantes por clave
+NARRATION_TTL = float(os.getenv("NARRATION_TTL", "21600"))             # segundos
+
+
+class NarrationCache:
+    """
+    Caché LRU/TTL de narraciones de eventos, indexada por (evento, escena).
+    Cada clave guarda varias variantes para que el mismo evento no suene siempre igual.
+    """
+
+    def __init__(self, max_keys: int = NARRATION_CACHE_SIZE, variants: int = NARRATION_VARIANTS,
+                 ttl: float = NARRATION_TTL, rng: random.Random | None = None):
+        self.max_keys = max_keys
+        self.variants = variants
+        self.ttl = ttl
+        self._rng = rng or random.Random()
+        self._entries: OrderedDict[tuple[str, str], list[tuple[str, float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: tuple[str, str]) -> list[tuple[str, float]]:
+        """Variantes no caducadas de una clave (poda las caducadas)."""
+        cutoff = time.monotonic() - self.ttl
+        variants = [v for v in self._entries.get(key, []) if v[1] >= cutoff]
+        if variants:
+            self._entries[key] = variants
+        else:
+            self._entries.pop(key, None)
+        return variants
+
+    def get(self, event_title: str, scene: str) -> str | None:
+        """Devuelve una variante al azar o None si no hay ninguna vigente."""
+        key = (event_title, scene)
+        with self._lock:
+            variants = self._fresh(key)
+            if not variants:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._rng.choice(variants)[0]
+
+    def put(self, event_title: str, scene: str, narration: str) -> None:
+        key = (event_title, scene)
+        with self._lock:
+            variants = self._fresh(key)
+            variants.append((narration, time.monotonic()))
+            self._entries[key] = variants[-self.variants:]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def missing(self, event_title: str, scene: str) -> int:
+        """Cuántas variantes faltan para tener la clave completa."""
+        with self._lock:
+            return max(self.variants - len(self._fresh((event_title, scene))), 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "keys": len(self._entries),
+                "variants": sum(len(v) for v in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+narration_cache = NarrationCache()
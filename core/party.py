@@ -0,0 +1,54 @@
+# sam-gameapi/core/party.py
+from core.session_manager import Session
+from utils import storage
+
+# Miembros del grupo de una sesión. Con el backend SQLite son filas indexadas
+# por (party, jugador); con JSON, la lista `players` del documento party.json.
+
+
+def members(session: Session) -> list[str]:
+    """Jugadores del grupo, en orden de llegada."""
+    backend = storage.get_backend()
+    if backend.rows:
+        return backend.party_members(session.party_file)
+    return storage.read_json(session.party_file).get("players", [])
+
+
+def join(session: Session, player: str) -> list[str] | None:
+    """Añade al jugador y devuelve el grupo; None si ya estaba."""
+    backend = storage.get_backend()
+    if backend.rows:
+        return backend.party_add(session.party_file, player)
+
+    def add(data: dict) -> list[str] | None:
+        players = data.setdefault("players", [])
+        if player in players:
+            return None
+        players.append(player)
+        return list(players)
+
+    return storage.update_json(session.party_file, add)
+
+
+def leave(session: Session, player: str) -> list[str] | None:
+    """Quita al jugador y devuelve el grupo; None si no estaba."""
+    backend = storage.get_backend()
+    if backend.rows:
+        return backend.party_remove(session.party_file, player)
+
+    def remove(data: dict) -> list[str] | None:
+        players = data.setdefault("players", [])
+        if player not in players:
+            return None
+        players.remove(player)
+        return list(players)
+
+    return storage.update_json(session.party_file, remove)
+
+
+def reset(session: Session) -> None:
+    backend = storage.get_backend()
+    if backend.rows:
+        backend.party_clear(session.party_file)
+    else:
+        storage.write_json(session.party_file, {"players": []})
@@ -0,0 +1,209 @@
+# sam-gameapi/core/resilience.py
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "25"))            # segundos por petición
+REQUEST_DEADLINE_MAX = float(os.getenv("REQUEST_DEADLINE_MAX", "120"))   # tope para X-Request-Timeout
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))           # intentos por modelo
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.25"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "2.0"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))      # reintentos por petición
+RETRY_BUDGET_MIN = float(os.getenv("RETRY_BUDGET_MIN", "10"))           # reserva inicial y tope
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))               # fallos seguidos para abrir
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))            # segundos abierto
+
+
+# ================================================================
+# ⏱️ PLAZOS POR PETICIÓN
+# ================================================================
+class DeadlineExceeded(TimeoutError):
+    """Se agotó el plazo de la petición antes de obtener respuesta."""
+
+
+_deadline: ContextVar[float | None] = ContextVar("sam_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float | None):
+    """
+    Fija un plazo (en segundos desde ahora) para todo lo que se ejecute dentro del bloque,
+    incluidas las tareas creadas en él. Un plazo anidado nunca amplía el exterior.
+    """
+    current = _deadline.get()
+    deadline = None if seconds is None else time.monotonic() + seconds
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def without_deadline(awaitable):
+    """Ejecuta un trabajo en segundo plano sin heredar el plazo de la petición que lo lanzó."""
+    token = _deadline.set(None)
+    try:
+        return await awaitable
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Segundos que quedan del plazo actual (None = sin plazo)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def parse_timeout(value: str | None) -> float:
+    """Plazo pedido por el cliente (cabecera en segundos), acotado a REQUEST_DEADLINE_MAX."""
+    try:
+        seconds = float(value) if value else REQUEST_DEADLINE
+    except ValueError:
+        seconds = REQUEST_DEADLINE
+    return min(seconds, REQUEST_DEADLINE_MAX) if seconds > 0 else REQUEST_DEADLINE
+
+# ================================================================
+# 🔁 REINTENTOS
+# ================================================================
+def backoff_delay(attempt: int, rng: random.Random | None = None) -> float:
+    """Espera con jitter completo: uniforme entre 0 y base·2^intento (acotado)."""
+    cap = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt))
+    return (rng or random).uniform(0, cap)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Errores transitorios: de red, timeouts, 408/409/429 y 5xx."""
+    status = getattr(error, "status_code", None)
+    return status is None or status in (408, 409, 429) or status >= 500
+
+
+class RetryBudget:
+    """
+    Presupuesto de reintentos compartido: cada petición aporta `ratio` fichas y cada
+    reintento gasta una. Durante una caída los reintentos se agotan enseguida en vez
+    de multiplicar la carga sobre un proveedor que ya no responde.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, minimum: float = RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.cap = minimum
+        self._tokens = minimum
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self.denied += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "retries": self.retries, "denied": self.denied}
+
+# ================================================================
+# 🔌 CIRCUIT BREAKER
+# ================================================================
+class CircuitOpenError(RuntimeError):
+    """El circuito del modelo está abierto; no se le envían peticiones."""
+
+
+class CircuitBreaker:
+    """
+    Breaker por modelo: tras `failures` fallos seguidos se abre durante `cooldown` segundos
+    y las peticiones lo saltan sin esperar. Pasado ese tiempo deja pasar una sola
+    petición de prueba (semiabierto): si sale bien se cierra, si falla vuelve a abrirse.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Si una petición podría pasar ahora (sin reservar la prueba)."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            return not self._probing and time.monotonic() - self.opened_at >= self.cooldown
+
+    def allow(self) -> bool:
+        """Reserva el paso de una petición; en semiabierto solo pasa una a la vez."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self._probing or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """Libera la prueba semiabierta si la petición se abandonó sin resultado."""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == "open":
+                retry_in = max(self.cooldown - (time.monotonic() - self.opened_at), 0.0)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "retry_in": round(retry_in, 1),
+            }
+
+
+class BreakerRegistry:
+    """Un breaker por modelo, creado bajo demanda."""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker()
+            return self._breakers[model]
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {model: breaker.snapshot() for model, breaker in breakers.items()}
@@ -0,0 +1,81 @@
+# sam-gameapi/core/round_batcher.py
+import asyncio
+import os
+from typing import Awaitable, Callable
+
+ROUND_WINDOW = float(os.getenv("ROUND_WINDOW", "8.0"))   # segundos máximos de espera por ronda
+
+RoundDispatch = Callable[[list[dict]], Awaitable[dict[str, dict]]]
+
+
+class RoundBatcher:
+    """
+    Agrupa las acciones de un grupo en rondas.
+    Una ronda se cierra cuando actuaron todos los jugadores esperados o al vencer
+    la ventana de tiempo; entonces se despacha entera y cada jugador recibe su resultado.
+    """
+
+    def __init__(self, dispatch: RoundDispatch, window: float = ROUND_WINDOW):
+        self._dispatch = dispatch
+        self.window = window
+        self._actions: dict[str, dict] = {}
+        self._future: asyncio.Future | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.rounds = 0
+
+    async def submit(self, player: str, action: str, mode: str = "action",
+                     expected: set[str] | None = None) -> dict:
+        """Añade la acción a la ronda abierta y espera el resultado de ese jugador."""
+        if player in self._actions:
+            # El jugador ya actuó en esta ronda: se cierra y su acción abre la siguiente.
+            self._close()
+
+        if not self._actions:
+            loop = asyncio.get_running_loop()
+            self._future = loop.create_future()
+            self._timer = loop.call_later(self.window, self._close)
+
+        self._actions[player] = {"player": player, "action": action, "mode": mode}
+        future = self._future
+
+        if expected and expected <= set(self._actions):
+            self._close()
+
+        results = await asyncio.shield(future)
+        return results[player]
+
+    def pending_players(self) -> list[str]:
+        return list(self._actions)
+
+    def _close(self) -> None:
+        """Cierra la ronda abierta y la despacha en segundo plano."""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        actions, future = list(self._actions.values()), self._future
+        self._actions, self._future = {}, None
+        if not actions or future is None:
+            return
+
+        self.rounds += 1
+        task = asyncio.create_task(self._run(actions, future))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Si la tarea se cancela antes de arrancar, _run no llega a ejecutarse
+        task.add_done_callback(lambda _: future.done() or future.cancel())
+
+    async def _run(self, actions: list[dict], future: asyncio.Future) -> None:
+        try:
+            results = await self._dispatch(actions)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        else:
+            if not future.done():
+                future.set_result(results)
+        finally:
+            # CancelledError y demás BaseException: que nadie de la ronda se quede esperando
+            if not future.done():
+                future.cancel()
@@ -0,0 +1,181 @@
+# sam-gameapi/core/session_manager.py
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+from utils import storage
+from utils.history_log import open_history_log
+
+DEFAULT_SESSION = "default"
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))     # segundos sin actividad
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "512"))    # sesiones en memoria
+
+PENDING_EVENTS_MAX = 20
+
+_SESSION_ID_RE = re.compile(r"^-?[A-Za-z0-9_]{1,64}$")
+
+
+class InvalidSessionError(ValueError):
+    """El identificador de sesión no es válido."""
+
+
+class Session:
+    """
+    Estado de una mesa de juego (p. ej. un chat de Telegram).
+    La sesión por defecto usa los archivos de siempre en data/;
+    el resto vive en data/sessions/<id>/.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        base = "" if session_id == DEFAULT_SESSION else f"sessions/{session_id}/"
+        self.state_file = f"{base}game_state.json"
+        self.party_file = f"{base}party.json"
+        self.pending_file = f"{base}pending_events.json"
+        self.idempotency_file = f"{base}idempotency.json"
+        self.history = open_history_log(f"{base}history")
+        self.last_access = time.monotonic()
+        # Serializa la fase de commit (historial/estado) sin cubrir la espera al LLM.
+        self.lock = asyncio.Lock()
+        self.in_use = 0
+        self.summarizing = False
+        # Eventos narrados en diferido que aún no se entregaron al cliente
+        # (en storage con varios workers: el siguiente turno puede llegar a otro proceso)
+        self.pending_events: deque = deque(maxlen=PENDING_EVENTS_MAX)
+        # Ronda abierta del modo por rondas (se crea al primer uso)
+        self.round_batcher = None
+
+    def add_pending_event(self, event: dict) -> None:
+        if not storage.SHARED:
+            self.pending_events.append(event)
+            return
+
+        def add(data: dict) -> None:
+            data["events"] = (data.get("events", []) + [event])[-PENDING_EVENTS_MAX:]
+
+        storage.update_json(self.pending_file, add)
+
+    def take_pending_events(self) -> list[dict]:
+        if not storage.SHARED:
+            events = list(self.pending_events)
+            self.pending_events.clear()
+            return events
+        if not storage.read_json(self.pending_file).get("events"):
+            return []
+        return storage.update_json(self.pending_file, lambda data: data.pop("events", []))
+
+    def touch(self) -> None:
+        self.last_access = time.monotonic()
+
+    def commit_documents(self) -> list[str]:
+        """
+        Documentos que escribe la fase de commit (estado, eventos pendientes, índice del
+        historial): se bloquean juntos para que nada dentro del commit espere a otro worker.
+        """
+        return [self.state_file, self.pending_file, *self.history.documents()]
+
+    def documents(self) -> list[str]:
+        """Documentos de storage que pertenecen a esta sesión."""
+        return [self.state_file, self.party_file, self.pending_file, self.idempotency_file,
+                *self.history.documents()]
+
+
+class SessionManager:
+    """
+    Registro de sesiones activas con expulsión de las inactivas.
+    Al expulsar una sesión se vuelcan sus documentos y se liberan de la caché.
+    """
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_active: int = SESSION_MAX_ACTIVE):
+        self.idle_ttl = idle_ttl
+        self.max_active = max_active
+        self._sessions: dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id: str | None = None) -> Session:
+        """Devuelve la sesión, cargándola si no estaba en memoria."""
+        session_id = session_id or DEFAULT_SESSION
+        if not _SESSION_ID_RE.match(session_id):
+            raise InvalidSessionError(f"Identificador de sesión no válido: {session_id!r}")
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+                overflow = len(self._sessions) - self.max_active
+            else:
+                overflow = 0
+            session.touch()
+
+        if overflow > 0:
+            self._evict_lru(overflow)
+        return session
+
+    @contextmanager
+    def use(self, session_id: str | None = None) -> Iterator[Session]:
+        """Fija la sesión mientras dura una petición para que no se expulse a mitad."""
+        session = self.get(session_id)
+        self.pin(session)
+        try:
+            yield session
+        finally:
+            self.unpin(session)
+
+    def pin(self, session: Session) -> None:
+        """
+        Impide expulsar la sesión hasta el `unpin` correspondiente (p. ej. mientras una tarea
+        en segundo plano la usa): si se expulsara, la siguiente petición crearía otra
+        Session para los mismos archivos, con su propio lock e índice de historial.
+        """
+        with self._lock:
+            session.in_use += 1
+
+    def unpin(self, session: Session) -> None:
+        with self._lock:
+            session.in_use -= 1
+            session.touch()
+
+    def active(self) -> list[Session]:
+        """Sesiones cargadas en memoria."""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def evict_idle(self) -> int:
+        """Expulsa las sesiones sin actividad durante más de `idle_ttl` segundos."""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [s for s in self._sessions.values()
+                    if s.last_access < cutoff and s.session_id != DEFAULT_SESSION]
+        return self._evict(idle)
+
+    def _evict_lru(self, count: int) -> int:
+        with self._lock:
+            candidates = sorted(
+                (s for s in self._sessions.values() if s.session_id != DEFAULT_SESSION and not s.in_use),
+                key=lambda s: s.last_access,
+            )
+        return self._evict(candidates[:count])
+
+    def _evict(self, sessions: list[Session]) -> int:
+        count = 0
+        for session in sessions:
+            with self._lock:
+                if self._sessions.get(session.session_id) is not session or session.in_use:
+                    continue
+                del self._sessions[session.session_id]
+            storage.evict(session.documents())
+            count += 1
+        self.evicted += count
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": len(self._sessions), "evicted": self.evicted, "max_active": self.max_active}
+
+
+sessions = SessionManager()
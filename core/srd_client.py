@@ -0,0 +1,270 @@
+# sam-gameapi/core/srd_client.py
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List
+from urllib.parse import quote
+
+# Cliente del SRDService (hechizos, monstruos y encuentros del SRD 5.2.1).
+# Orden de consulta: copia local en disco (SRD_MIRROR_PATH) → caché LRU/TTL →
+# petición ya en vuelo para el mismo índice → SRDService. Las peticiones al
+# servicio comparten un pool de conexiones y los lotes de get_many van en una
+# sola petición si el servicio la admite (SRD_BATCH_PATH).
+#
+# Contrato HTTP esperado del SRDService:
+#   GET  /{kind}                → lista de índices (`[...]` o `{"results": [...]}`)
+#   GET  /{kind}/{index}        → documento (404 si no existe)
+#   POST /{kind}/batch          → {"indexes": [...]} → lista de documentos con "index"
+SRD_SERVICE_URL = os.getenv("SRD_SERVICE_URL", "http://127.0.0.1:8000")
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+SRD_MAX_CONNECTIONS = int(os.getenv("SRD_MAX_CONNECTIONS", "10"))
+SRD_CACHE_SIZE = int(os.getenv("SRD_CACHE_SIZE", "2048"))           # documentos en memoria
+SRD_CACHE_TTL = float(os.getenv("SRD_CACHE_TTL", "86400"))          # segundos; el SRD casi no cambia
+SRD_NEGATIVE_TTL = float(os.getenv("SRD_NEGATIVE_TTL", "300"))      # segundos para índices inexistentes
+SRD_MIRROR_PATH = os.getenv("SRD_MIRROR_PATH") or None              # carpeta con <kind>.json
+SRD_BATCH_PATH = os.getenv("SRD_BATCH_PATH", "")                    # p. ej. /{kind}/batch; vacío = GETs en paralelo
+
+KINDS = ("spells", "monsters", "encounters")
+INDEX_RE = re.compile(r"^[a-z0-9-]{1,100}$")   # índices del SRD: `acid-arrow`, `goblin`
+
+
+class SRDUnavailableError(RuntimeError):
+    """El SRDService no respondió y no hay copia local ni en caché del documento."""
+
+
+class InvalidSRDIndexError(ValueError):
+    """El índice pedido no tiene el formato de los índices del SRD."""
+
+
+def valid_index(index: str) -> bool:
+    return bool(INDEX_RE.match(index))
+
+
+def _by_index(data: Any) -> Dict[str, Dict[str, Any]]:
+    """Normaliza `{índice: doc}`, `[doc, ...]` o `{"results": [doc, ...]}` a `{índice: doc}`."""
+    if isinstance(data, dict) and "results" in data:
+        data = data["results"]
+    if isinstance(data, dict):
+        return {str(index): doc for index, doc in data.items() if isinstance(doc, dict)}
+    return {str(doc["index"]): doc for doc in data or [] if isinstance(doc, dict) and "index" in doc}
+
+
+class SRDClient:
+    """
+    Cliente asíncrono con caché para el SRDService.
+    Todas las consultas se hacen desde el event loop, así que caché y peticiones en
+    vuelo no necesitan locks. Si el servicio falla se sirve la última copia conocida,
+    aunque haya caducado.
+    """
+
+    def __init__(self, base_url: str = SRD_SERVICE_URL, mirror_path: str | None = SRD_MIRROR_PATH,
+                 max_size: int = SRD_CACHE_SIZE, ttl: float = SRD_CACHE_TTL,
+                 negative_ttl: float = SRD_NEGATIVE_TTL, batch_path: str = SRD_BATCH_PATH):
+        self.base_url = base_url.rstrip("/")
+        self.mirror_path = mirror_path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_path = batch_path
+        self._http = None
+        self._mirror: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._cache: OrderedDict[tuple[str, str], tuple[Dict[str, Any] | None, float]] = OrderedDict()
+        self._inflight: Dict[tuple[str, str], asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.mirror_hits = 0
+        self.fetched = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.errors = 0
+        self.stale_served = 0
+
+    # ============================================================
+    # 🔌 POOL HTTP
+    # ============================================================
+    def _client(self):
+        """Pool de conexiones compartido (httpx se importa en el primer uso)."""
+        if self._http is None:
+            import httpx
+
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(max_connections=SRD_MAX_CONNECTIONS,
+                                    max_keepalive_connections=SRD_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(HTTP_TIMEOUT, connect=min(HTTP_TIMEOUT, 10.0)),
+            )
+        return self._http
+
+    async def prewarm(self) -> int | None:
+        """Despierta el servicio (Render lo duerme si está inactivo) y deja una conexión en el pool."""
+        try:
+            response = await self._client().get("/")
+        except Exception:
+            return None
+        return response.status_code
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ============================================================
+    # 💽 COPIA LOCAL
+    # ============================================================
+    def load_mirror(self, path: str | None = None) -> int:
+        """Carga `<kind>.json` de la carpeta de la copia local. Devuelve cuántos documentos hay."""
+        path = path or self.mirror_path
+        if not path:
+            return 0
+        for kind in KINDS:
+            file_path = os.path.join(path, f"{kind}.json")
+            if os.path.exists(file_path):
+                with open(file_path, "r", encoding="utf-8") as f:
+                    self._mirror[kind] = _by_index(json.load(f))
+        return sum(len(docs) for docs in self._mirror.values())
+
+    # ============================================================
+    # 🔎 CONSULTAS
+    # ============================================================
+    async def get(self, kind: str, index: str) -> Dict[str, Any] | None:
+        """Documento del SRD, o None si el servicio dice que no existe."""
+        return (await self.get_many(kind, [index]))[index]
+
+    async def get_many(self, kind: str, indexes: Iterable[str]) -> Dict[str, Dict[str, Any] | None]:
+        """
+        Varios documentos de un tipo. Lo que no está en la copia local ni en caché se pide
+        en un solo lote; los índices que otra consulta ya está pidiendo se esperan, no se repiten.
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Tipo de SRD desconocido: {kind!r}")
+        indexes = list(indexes)
+        # Los índices llegan de la query del cliente: nada que no sea un índice llega a la URL ni a la caché
+        invalid = [index for index in indexes if not valid_index(index)]
+        if invalid:
+            raise InvalidSRDIndexError(f"Índice de SRD no válido: {invalid[0]!r}")
+
+        results: Dict[str, Dict[str, Any] | None] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        to_fetch: List[str] = []
+        loop = asyncio.get_running_loop()
+        for index in dict.fromkeys(indexes):
+            found, doc = self._lookup(kind, index)
+            if found:
+                results[index] = doc
+                continue
+            future = self._inflight.get((kind, index))
+            if future is None:
+                future = self._inflight[(kind, index)] = loop.create_future()
+                to_fetch.append(index)
+            else:
+                self.coalesced += 1
+            waiting[index] = future
+
+        if to_fetch:
+            # Tarea propia: si este llamador se cancela, quienes esperan los mismos índices siguen servidos
+            task = asyncio.create_task(self._fetch(kind, to_fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        for index, future in waiting.items():
+            results[index] = await asyncio.shield(future)
+        return results
+
+    async def list_indexes(self, kind: str) -> List[str]:
+        """Índices disponibles de un tipo, según el servicio."""
+        response = await self._client().get(f"/{kind}")
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict):
+            data = data.get("results", [])
+        return [str(item["index"]) if isinstance(item, dict) else str(item) for item in data]
+
+    def _lookup(self, kind: str, index: str) -> tuple[bool, Dict[str, Any] | None]:
+        doc = self._mirror.get(kind, {}).get(index)
+        if doc is not None:
+            self.mirror_hits += 1
+            return True, doc
+        entry = self._cache.get((kind, index))
+        if entry is not None and entry[1] > time.monotonic():
+            self._cache.move_to_end((kind, index))
+            self.hits += 1
+            return True, entry[0]
+        return False, None
+
+    def _store(self, kind: str, index: str, doc: Dict[str, Any] | None) -> None:
+        ttl = self.ttl if doc is not None else self.negative_ttl
+        self._cache[(kind, index)] = (doc, time.monotonic() + ttl)
+        self._cache.move_to_end((kind, index))
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    # ============================================================
+    # 📡 PETICIONES AL SERVICIO
+    # ============================================================
+    async def _fetch(self, kind: str, indexes: List[str]) -> None:
+        try:
+            fetched = await self._fetch_remote(kind, indexes)
+        except asyncio.CancelledError as e:
+            self._settle(kind, {index: e for index in indexes})
+            raise
+        except Exception as e:
+            fetched = {index: e for index in indexes}
+        self._settle(kind, fetched)
+
+    def _settle(self, kind: str, fetched: Dict[str, Any]) -> None:
+        """Resuelve las consultas en vuelo; si el servicio falló, con la copia caducada si la hay."""
+        for index, outcome in fetched.items():
+            future = self._inflight.pop((kind, index))
+            if not isinstance(outcome, BaseException):
+                self.fetched += 1
+                self._store(kind, index, outcome)
+                future.set_result(outcome)
+                continue
+            self.errors += 1
+            stale = self._cache.get((kind, index))
+            if stale is not None:
+                self.stale_served += 1
+                future.set_result(stale[0])
+            else:
+                future.set_exception(SRDUnavailableError(f"SRDService no disponible: {outcome!r}"))
+                future.exception()   # marcada como leída aunque nadie quede esperando
+
+    async def _fetch_remote(self, kind: str, indexes: List[str]) -> Dict[str, Any]:
+        """{índice: documento | None | excepción}."""
+        client = self._client()
+        if self.batch_path and len(indexes) > 1:
+            self.batches += 1
+            response = await client.post(self.batch_path.format(kind=kind), json={"indexes": indexes})
+            response.raise_for_status()
+            docs = _by_index(response.json())
+            return {index: docs.get(index) for index in indexes}
+
+        async def fetch_one(index: str) -> Dict[str, Any] | None:
+            response = await client.get(f"/{kind}/{quote(index, safe='')}")
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+
+        outcomes = await asyncio.gather(*(fetch_one(index) for index in indexes), return_exceptions=True)
+        return dict(zip(indexes, outcomes))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mirror": {kind: len(docs) for kind, docs in self._mirror.items()},
+            "cached": len(self._cache),
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "mirror_hits": self.mirror_hits,
+            "fetched": self.fetched,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "errors": self.errors,
+            "stale_served": self.stale_served,
+        }
+
+
+srd = SRDClient()
@@ -0,0 +1,86 @@
+# sam-gameapi/core/warmup.py
+import asyncio
+import os
+import time
+from typing import Any, Callable
+
+from core.session_manager import DEFAULT_SESSION, sessions
+from utils import storage
+from utils.tracing import logger
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") != "0"
+WARMUP_SESSIONS = int(os.getenv("WARMUP_SESSIONS", "8"))   # sesiones recientes que se precargan
+
+Stage = tuple[str, Callable[[], Any]]
+
+
+class Warmup:
+    """
+    Fase de arranque en segundo plano. El servicio acepta peticiones desde el principio;
+    cada etapa se mide y /ready responde 503 hasta que todas terminan (bien o con error:
+    un precalentamiento fallido hace más lenta la primera petición, no impide servirla).
+    """
+
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self.finished = False
+        self.duration_ms: float | None = None
+
+    async def run(self, *chains: list[Stage]) -> None:
+        """Las cadenas corren en paralelo; dentro de cada una, las etapas van en orden."""
+        for chain in chains:
+            for name, _ in chain:
+                self.stages[name] = {"status": "pending"}
+        start = time.perf_counter()
+        await asyncio.gather(*(self._run_chain(chain) for chain in chains))
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.finished = True
+        logger.info("warmup", extra={"trace": self.report()})
+
+    async def _run_chain(self, chain: list[Stage]) -> None:
+        for name, fn in chain:
+            await self._run_stage(name, fn)
+
+    async def _run_stage(self, name: str, fn: Callable[[], Any]) -> None:
+        """Las funciones síncronas (E/S de disco, imports) se ejecutan en un hilo."""
+        stage = self.stages[name]
+        stage["status"] = "running"
+        start = time.perf_counter()
+        try:
+            result = await fn() if asyncio.iscoroutinefunction(fn) else await asyncio.to_thread(fn)
+        except Exception as e:
+            stage.update(status="failed", error=str(e))
+        else:
+            stage["status"] = "done"
+            if isinstance(result, (int, float, str)):
+                stage["result"] = result
+        finally:
+            stage["ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def skip(self) -> None:
+        """Sin precalentamiento (WARMUP_ENABLED=0): listo desde el arranque."""
+        self.finished = True
+
+    @property
+    def ready(self) -> bool:
+        return self.finished
+
+    def report(self) -> dict:
+        return {"ready": self.finished, "warmup_ms": self.duration_ms, "stages": dict(self.stages)}
+
+
+def warm_sessions(limit: int = WARMUP_SESSIONS) -> int:
+    """
+    Carga la sesión por defecto y las `limit` jugadas más recientemente: índice y últimas
+    entradas del historial, estado y party quedan en memoria. Devuelve cuántas se cargaron.
+    """
+    recent = storage.recent("sessions/*/game_state.json", limit)
+    session_ids = [DEFAULT_SESSION] + [name.split("/")[1] for name in recent]
+    for session_id in session_ids:
+        session = sessions.get(session_id)
+        storage.read_json(session.state_file)
+        storage.read_json(session.party_file)
+    return len(session_ids)
+
+
+warmup = Warmup()
@@ -1,83 +1,329 @@
 # sam-gameapi/game_service.py
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from utils import storage
-from ai_engine import interpret_action
+from ai_engine import (
+    MEMORY_MAX_TURNS, estimate_tokens, interpret_action, interpret_round, is_error_narration, stream_action,
+    summarize_history,
+)
+from core import party
 from core.event_system import EventSystem
+from core.narration_cache import narration_cache
+from core.resilience import without_deadline
+from core.round_batcher import RoundBatcher
+from core.session_manager import DEFAULT_SESSION, Session, sessions
+from utils.tracing import span
+
+MEMORY_SUMMARY_EVERY = int(os.getenv("MEMORY_SUMMARY_EVERY", "8"))   # turnos entre resúmenes
+NARRATION_PREWARM_BATCH = int(os.getenv("NARRATION_PREWARM_BATCH", "6"))   # narraciones por ciclo
+
+_background_tasks: set[asyncio.Task] = set()
+
+# ================================================================
+# 📂 ESTADO E HISTORIAL
+# ================================================================
+def _load_state(session: Session) -> dict:
+    """
+    Lee el estado de escena/party. El historial vive aparte en un log append-only;
+    si el estado aún trae la lista `history` del formato antiguo, se migra una vez.
+    """
+    game_state = storage.read_json(session.state_file)
+    if "history" in game_state:
+        def migrate(state: dict) -> dict:
+            legacy = state.pop("history", None) or []
+            if legacy and session.history.count() == 0:
+                session.history.extend(legacy)
+            return state
+
+        game_state = storage.update_json(session.state_file, migrate)
+    return game_state
 
 # ================================================================
 # 🎮 INICIO DEL JUEGO
 # ================================================================
-async def start_game(party_levels: list[int]):
+async def start_game(party_levels: list[int], session_id: str = DEFAULT_SESSION):
     """Inicia una nueva partida, reseteando el estado base."""
-    game_state = {
-        "party_levels": party_levels,
-        "scene": "Inicio de la aventura",
-        "description": "Una brisa fría recorre el valle mientras el grupo se prepara para lo desconocido.",
-        "history": []
-    }
-    storage.write_json("game_state.json", game_state)
-    return {"message": "Partida iniciada.", "state": game_state}
+    with sessions.use(session_id) as session:
+        def reset(state: dict) -> dict:
+            # `epoch` identifica la partida: las acciones aún en vuelo de la anterior se descartan.
+            epoch = state.get("epoch", 0) + 1
+            state.clear()
+            state.update({
+                "party_levels": party_levels,
+                "scene": "Inicio de la aventura",
+                "description": "Una brisa fría recorre el valle mientras el grupo se prepara para lo desconocido.",
+                "epoch": epoch,
+            })
+            return dict(state)
+
+        async with _commit(session):
+            game_state = storage.update_json(session.state_file, reset)
+            session.history.reset()
+        return {"message": "Partida iniciada.", "session_id": session.session_id, "state": {**game_state, "history": []}}
 
 # ================================================================
 # ⚔️ ACCIONES DE JUGADOR
 # ================================================================
-async def handle_action(player: str, action: str, mode: str = "action"):
+async def handle_action(player: str, action: str, mode: str = "action", session_id: str = DEFAULT_SESSION):
     """
     Procesa una acción o diálogo de un jugador y devuelve la respuesta narrativa.
     También puede detonar eventos dinámicos aleatorios.
     """
-    # Leer estado actual del juego
-    game_state = storage.read_json("game_state.json")
-    context = {
+    with sessions.use(session_id) as session:
+        # Leer estado actual del juego
+        game_state = _load_state(session)
+        context = _scene_context(game_state)
+
+        # El evento se decide antes de narrar y su narración corre en paralelo
+        event_task = _start_dynamic_event(session, action, context)
+
+        # Interpretar la acción mediante S.A.M. (IA narrativa)
+        try:
+            with span("history_read"):
+                memory = session.history.tail(MEMORY_MAX_TURNS)
+            narration = await interpret_action(player, action, mode, context, memory=memory,
+                                               session_id=session.session_id)
+        except BaseException:
+            if event_task:
+                event_task.cancel()
+            raise
+
+        return await _record_action(session, game_state.get("epoch", 0), player, action, narration, event_task)
+
+
+async def handle_action_stream(player: str, action: str, mode: str = "action",
+                               session_id: str = DEFAULT_SESSION) -> AsyncIterator[dict]:
+    """
+    Variante en streaming de `handle_action`.
+    Emite {"type": "token"} por cada fragmento y un {"type": "done"} final
+    con la misma respuesta que `handle_action`, una vez persistida.
+    """
+    with sessions.use(session_id) as session:
+        game_state = _load_state(session)
+        context = _scene_context(game_state)
+        event_task = _start_dynamic_event(session, action, context)
+
+        parts = []
+        try:
+            with span("history_read"):
+                memory = session.history.tail(MEMORY_MAX_TURNS)
+            async for delta in stream_action(player, action, mode, context, memory=memory,
+                                             session_id=session.session_id):
+                parts.append(delta)
+                yield {"type": "token", "text": delta}
+        except BaseException:
+            if event_task:
+                event_task.cancel()
+            raise
+
+        narration = "".join(parts).strip()
+        response_data = await _record_action(session, game_state.get("epoch", 0), player, action, narration, event_task)
+        yield {"type": "done", **response_data}
+
+
+@asynccontextmanager
+async def _commit(session: Session) -> AsyncIterator[None]:
+    """
+    Fase de commit de una sesión: su lock (entre tareas de este worker) y, con varios
+    workers, el bloqueo entre procesos sobre todo lo que escribe el commit (estado,
+    eventos pendientes e índice del historial), que se espera sin congelar el loop
+    (storage.exclusive_async). Dentro, los bloqueos de storage ya están tomados y no
+    esperan. El bloque no debe hacer awaits: el bloqueo pertenece al hilo del event loop.
+    """
+    with span("session_lock_wait"):
+        await session.lock.acquire()
+    try:
+        async with storage.exclusive_async(session.commit_documents()):
+            yield
+    finally:
+        session.lock.release()
+
+
+def _current_epoch(session: Session) -> int:
+    return storage.read_json(session.state_file).get("epoch", 0)
+
+
+def _scene_context(game_state: dict) -> dict:
+    """Extrae la escena actual (resumen, tags y niveles del grupo incluidos) para el narrador y los eventos."""
+    return {
         "scene": game_state.get("scene", "Ubicación desconocida"),
-        "description": game_state.get("description", "Sin detalles.")
+        "description": game_state.get("description", "Sin detalles."),
+        "summary": game_state.get("summary", ""),
+        "tags": game_state.get("tags", []),
+        "party_levels": game_state.get("party_levels", []),
     }
 
-    # Interpretar la acción mediante S.A.M. (IA narrativa)
-    narration = await interpret_action(player, action, mode, context)
 
-    # Guardar en historial
-    history = game_state.get("history", [])
-    history.append({"player": player, "action": action, "response": narration})
-    game_state["history"] = history
-    storage.write_json("game_state.json", game_state)
+def _history_entry(player: str, action: str, response: str) -> dict:
+    """Entrada de historial con su conteo de tokens cacheado para el empaquetado de memoria."""
+    return {
+        "player": player,
+        "action": action,
+        "response": response,
+        "tokens": estimate_tokens(f"{player}{action}{response}"),
+    }
 
-    # Determinar si se debe generar un evento aleatorio
-    event_triggered = _should_trigger_event(action, len(history))
 
-    event_result = None
-    if event_triggered:
-        event_result = await _generate_dynamic_event(context)
+async def _record_action(session: Session, epoch: int, player: str, action: str, narration: str,
+                         event_task: asyncio.Task | None = None) -> dict:
+    """
+    Guarda la narración en el historial y adjunta el evento dinámico si ya está listo.
+    El commit se hace bajo el lock de la sesión, tras la espera al LLM: las acciones
+    concurrentes (de este o de otro worker) se encolan aquí y se añaden al historial sin pisarse.
+    """
+    async with _commit(session):
+        if _current_epoch(session) != epoch:
+            # La partida se reinició mientras se narraba: no mezclar con la nueva.
+            if event_task:
+                event_task.cancel()
+            return {"player": player, "result": narration, "discarded": True}
 
-    response_data = {"player": player, "result": narration}
+        # Guardar en historial
+        with span("history_append"):
+            action_count = session.history.append(_history_entry(player, action, narration))
+        _maybe_refresh_summary(session, epoch, action_count)
 
-    if event_result:
-        response_data["event"] = event_result
+        response_data = {"player": player, "result": narration}
+        _attach_event(session, epoch, event_task, response_data)
 
     return response_data
 
+
+def _attach_event(session: Session, epoch: int, event_task: asyncio.Task | None, response_data: dict) -> None:
+    """
+    Adjunta el evento dinámico y los eventos diferidos pendientes a la respuesta
+    (llamar con el lock de la sesión tomado, justo después de guardar el turno).
+    El evento nunca retrasa la respuesta: si su narración no terminó, se entrega después.
+    """
+    if event_task and event_task.done():
+        if not event_task.cancelled() and event_task.exception() is None:
+            event_result = event_task.result()
+            _append_event(session, event_result)
+            response_data["event"] = event_result
+    elif event_task:
+        _spawn(_deliver_deferred_event(session, epoch, event_task), session)
+        response_data["event_pending"] = True
+
+    pending = session.take_pending_events()
+    if pending:
+        response_data["pending_events"] = pending
+
+# ================================================================
+# 👥 RONDAS DE GRUPO
+# ================================================================
+class NotInPartyError(ValueError):
+    """El jugador no forma parte del grupo de la sesión."""
+
+
+async def handle_round_action(player: str, action: str, mode: str = "action", session_id: str = DEFAULT_SESSION):
+    """
+    Registra la acción en la ronda abierta de la sesión y espera su resolución.
+    La ronda se narra en una sola llamada cuando actuó todo el grupo o vence ROUND_WINDOW.
+    """
+    with sessions.use(session_id) as session:
+        players = party.members(session)
+        if players and player not in players:
+            raise NotInPartyError(f"{player} no está en el grupo.")
+
+        if session.round_batcher is None:
+            session.round_batcher = RoundBatcher(lambda actions: _resolve_round(session, actions))
+        return await session.round_batcher.submit(player, action, mode, set(players))
+
+
+async def _resolve_round(session: Session, actions: list[dict]) -> dict[str, dict]:
+    """Narra la ronda completa y guarda todas sus entradas en el historial de una vez."""
+    game_state = _load_state(session)
+    context = _scene_context(game_state)
+    epoch = game_state.get("epoch", 0)
+    event_task = _start_dynamic_event(session, " ".join(a["action"] for a in actions), context)
+
+    try:
+        round_result = await interpret_round(actions, context, memory=session.history.tail(MEMORY_MAX_TURNS),
+                                             session_id=session.session_id)
+    except BaseException:
+        if event_task:
+            event_task.cancel()
+        raise
+
+    players = round_result["players"]
+    round_info = {"players": [a["player"] for a in actions], "narration": round_result["narration"]}
+
+    async with _commit(session):
+        if _current_epoch(session) != epoch:
+            if event_task:
+                event_task.cancel()
+            return {a["player"]: {"player": a["player"], "result": players[a["player"]], "round": round_info,
+                                  "discarded": True} for a in actions}
+
+        action_count = session.history.extend(
+            [_history_entry(a["player"], a["action"], players[a["player"]]) for a in actions]
+        )
+        _maybe_refresh_summary(session, epoch, action_count)
+
+        shared: dict = {}
+        _attach_event(session, epoch, event_task, shared)
+
+    return {
+        a["player"]: {"player": a["player"], "result": players[a["player"]], "round": round_info, **shared}
+        for a in actions
+    }
+
+# ================================================================
+# 📚 RESUMEN DE CAMPAÑA EN SEGUNDO PLANO
+# ================================================================
+def _maybe_refresh_summary(session: Session, epoch: int, action_count: int) -> None:
+    """Lanza la actualización del resumen cada MEMORY_SUMMARY_EVERY turnos sin bloquear la respuesta."""
+    summary_upto = storage.read_json(session.state_file).get("summary_upto", 0)
+    if action_count - summary_upto < MEMORY_SUMMARY_EVERY or session.summarizing:
+        return
+    session.summarizing = True
+    _spawn(_refresh_summary(session, epoch, summary_upto, action_count), session)
+
+
+async def _refresh_summary(session: Session, epoch: int, start: int, end: int) -> None:
+    """Integra las entradas [start, end) en el resumen de campaña guardado en el estado."""
+    try:
+        previous = storage.read_json(session.state_file).get("summary", "")
+        entries = await asyncio.to_thread(session.history.read_range, start, end)
+        summary = await summarize_history(previous, entries, session.session_id)
+        if summary is None:
+            # Sin resumen nuevo, summary_upto no avanza: el siguiente turno lo reintenta
+            return
+
+        def apply(state: dict) -> None:
+            if state.get("epoch", 0) == epoch and state.get("summary_upto", 0) == start:
+                state["summary"] = summary
+                state["summary_upto"] = end
+
+        async with _commit(session):
+            storage.update_json(session.state_file, apply)
+    finally:
+        session.summarizing = False
+
 # ================================================================
 # 🎲 EVENTOS DINÁMICOS
 # ================================================================
-async def _generate_dynamic_event(context: dict) -> dict:
+def _start_dynamic_event(session: Session, action: str, context: dict) -> asyncio.Task | None:
+    """
+    Decide antes de narrar si la acción detona un evento. Si es así, elige el evento
+    y lanza su narración como tarea para que corra en paralelo con la del jugador.
+    """
+    if not _should_trigger_event(action, session.history.count() + 1):
+        return None
+    return _spawn(_generate_dynamic_event(session, context))
+
+
+async def _generate_dynamic_event(session: Session, context: dict) -> dict:
     """
     Genera un evento aleatorio y lo pasa por la IA para narrarlo.
     """
     event_system = EventSystem()
-    event = event_system.generate_event(context)
-
-    # Pasar el evento al narrador para interpretación
-    event_narration = await interpret_action("S.A.M.", event["description"], "action", context)
-
-    # Guardar el evento en el estado global
-    game_state = storage.read_json("game_state.json")
-    history = game_state.get("history", [])
-    history.append({
-        "player": "S.A.M.",
-        "action": f"[Evento] {event['title']}",
-        "response": event_narration
-    })
-    game_state["history"] = history
-    storage.write_json("game_state.json", game_state)
+    event = event_system.generate_event(context, session_id=session.session_id)
+
+    # Pasar el evento al narrador (o tomar una variante ya generada)
+    event_narration = await _narrate_event(event, context, session.session_id)
 
     return {
         "event_title": event["title"],
@@ -86,6 +332,93 @@ async def _generate_dynamic_event(context: dict) -> dict:
         "event_narration": event_narration
     }
 
+
+def _append_event(session: Session, event_result: dict) -> None:
+    """Guarda el evento en el historial (llamar con el lock de la sesión tomado)."""
+    session.history.append(_history_entry(
+        "S.A.M.", f"[Evento] {event_result['event_title']}", event_result["event_narration"]
+    ))
+
+
+async def _deliver_deferred_event(session: Session, epoch: int, event_task: asyncio.Task) -> None:
+    """
+    Espera la narración de un evento que no estuvo lista a tiempo, la guarda en el historial
+    y la deja pendiente para la siguiente respuesta (o para GET /game/events/pending).
+    """
+    try:
+        event_result = await event_task
+    except Exception:
+        return
+    async with _commit(session):
+        if _current_epoch(session) != epoch:
+            return
+        _append_event(session, event_result)
+        session.add_pending_event(event_result)
+
+
+def take_pending_events(session_id: str = DEFAULT_SESSION) -> list[dict]:
+    """Entrega (y vacía) los eventos narrados en diferido de una sesión."""
+    with sessions.use(session_id) as session:
+        return session.take_pending_events()
+
+
+def _spawn(coro, session: Session | None = None) -> asyncio.Task:
+    """
+    Lanza una tarea en segundo plano conservando una referencia hasta que termine.
+    La tarea no hereda el plazo de la petición: puede acabar después de responder.
+    Con `session`, la sesión queda fijada (no se expulsa) hasta que la tarea acabe.
+    """
+    task = asyncio.create_task(without_deadline(coro))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    if session is not None:
+        sessions.pin(session)
+        task.add_done_callback(lambda _: sessions.unpin(session))
+    return task
+
+
+async def _narrate_event(event: dict, context: dict, session_id: str | None = None) -> str:
+    """Narración de un evento: desde la caché si hay variante vigente; si no, en vivo."""
+    cached = narration_cache.get(event["title"], context.get("scene", ""))
+    if cached:
+        return cached
+    return await _generate_event_narration(event, context, session_id)
+
+
+async def _generate_event_narration(event: dict, context: dict, session_id: str | None = None) -> str:
+    """
+    Narra un evento solo con la escena (sin memoria ni resumen de la sesión),
+    de modo que la variante se pueda reutilizar en cualquier mesa con esa escena.
+    """
+    scene_context = {"scene": context.get("scene", ""), "description": context.get("description", "")}
+    with span("event_narration"):
+        narration = await interpret_action("S.A.M.", event["description"], "action", scene_context, session_id=session_id)
+    if not is_error_narration(narration):
+        narration_cache.put(event["title"], scene_context["scene"], narration)
+    return narration
+
+
+async def prewarm_event_narrations(max_generations: int = NARRATION_PREWARM_BATCH) -> int:
+    """
+    Completa variantes de narración para las escenas de las sesiones activas.
+    Genera como mucho `max_generations` por llamada para acotar el gasto de tokens.
+    """
+    contexts = {}
+    for session in sessions.active():
+        context = _scene_context(storage.read_json(session.state_file))
+        contexts.setdefault(context["scene"], context)
+
+    events = EventSystem().all_events()
+    generated = 0
+    for context in contexts.values():
+        for event in events:
+            for _ in range(narration_cache.missing(event["title"], context["scene"])):
+                if generated >= max_generations:
+                    return generated
+                await _generate_event_narration(event, context)
+                generated += 1
+    return generated
+
 # ================================================================
 # 🧩 LÓGICA DE ACTIVACIÓN DE EVENTOS
 # ================================================================
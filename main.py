@@ -1,30 +1,172 @@
 # sam-gameapi/main.py
-from fastapi import FastAPI, HTTPException
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List
-from game_service import start_game, handle_action
-from utils import storage
+import ai_engine
+from game_service import (
+    NotInPartyError, start_game, handle_action, handle_action_stream, handle_round_action,
+    prewarm_event_narrations, take_pending_events,
+)
+from core import party
+from core.encounter_engine import get_encounter_index
+from core.event_system import EventSystem
+from core.idempotency import IdempotencyKeyReused, action_key, idempotency
+from core.narration_cache import narration_cache
+from core.resilience import deadline_scope, parse_timeout
+from core.session_manager import DEFAULT_SESSION, InvalidSessionError, sessions
+from core.srd_client import KINDS as SRD_KINDS, InvalidSRDIndexError, SRDUnavailableError, srd
+from core.warmup import WARMUP_ENABLED, warm_sessions, warmup
+from utils import storage, tracing
+from utils.event_log import flush_event_log, get_event_log
+from utils.usage_tracker import tracker as usage_tracker
+
+# Tiempo de importación de la app (dependencias incluidas); ver tools/import_profile.py
+IMPORT_MS = round((time.perf_counter() - _IMPORT_START) * 1000, 1)
 
-app = FastAPI(title="S.A.M. Game API", version="1.2")
+SESSION_SWEEP_INTERVAL = 60
+NARRATION_PREWARM_INTERVAL = float(os.getenv("NARRATION_PREWARM_INTERVAL", "300"))   # 0 = desactivado
+
+# ======================================================
+# 🔄 Ciclo de vida
+# ======================================================
+async def _sweep_sessions():
+    """Libera periódicamente las sesiones inactivas."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        await asyncio.to_thread(sessions.evict_idle)
+
+async def _prewarm_narrations():
+    """Mantiene variantes de narración de eventos listas para las escenas activas."""
+    while True:
+        await asyncio.sleep(NARRATION_PREWARM_INTERVAL)
+        with suppress(Exception):
+            await prewarm_event_narrations()
+
+async def _warm_up():
+    """Precalienta en segundo plano lo que pagaría la primera narración tras un arranque en frío."""
+    await warmup.run(
+        [("llm_client", ai_engine.get_client), ("llm_connections", ai_engine.prewarm_connections)],
+        [("encounter_tables", lambda: len(get_encounter_index().events)), ("srd_mirror", srd.load_mirror)],
+        [("storage", storage.get_backend), ("event_log", get_event_log), ("sessions", warm_sessions)],
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    storage.start_flusher()
+    tasks = [asyncio.create_task(_sweep_sessions())]
+    if WARMUP_ENABLED:
+        tasks.append(asyncio.create_task(_warm_up()))
+        # Fuera de /ready: el SRDService puede tardar en despertar y la copia local no lo necesita
+        tasks.append(asyncio.create_task(srd.prewarm()))
+    else:
+        warmup.skip()
+    if NARRATION_PREWARM_INTERVAL > 0:
+        tasks.append(asyncio.create_task(_prewarm_narrations()))
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await ai_engine.aclose()
+    await srd.aclose()
+    await asyncio.to_thread(flush_event_log)
+    storage.stop_flusher()
+
+tracing.configure_logging()
+app = FastAPI(title="S.A.M. Game API", version="1.2", lifespan=lifespan)
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """Plazo de la petición: cabecera X-Request-Timeout (segundos) o REQUEST_DEADLINE."""
+    with deadline_scope(parse_timeout(request.headers.get("x-request-timeout"))):
+        return await call_next(request)
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """Tiempos por etapa: cabecera Server-Timing, histogramas en /metrics y log de trazas."""
+    with tracing.request_trace(request.method, request.url.path) as trace:
+        response = await call_next(request)
+        if trace is not None:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            response.headers["Server-Timing"] = trace.server_timing()
+            trace.finish(route, response.status_code)
+        return response
+
+@app.exception_handler(InvalidSessionError)
+async def invalid_session_handler(request: Request, exc: InvalidSessionError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(IdempotencyKeyReused)
+async def idempotency_key_reused_handler(request: Request, exc: IdempotencyKeyReused):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+@app.exception_handler(NotInPartyError)
+async def not_in_party_handler(request: Request, exc: NotInPartyError):
+    return JSONResponse(status_code=403, content={"detail": str(exc)})
 
 # ======================================================
 # 🩺 Endpoint de salud
 # ======================================================
 @app.get("/health")
 def health_check():
-    return {"message": "API online", "status": "ready"}
+    return {
+        "message": "API online",
+        "status": "ready",
+        "llm": ai_engine.limiter.stats(),
+        "models": ai_engine.router.stats(),
+        "breakers": ai_engine.breakers.stats(),
+        "retry_budget": ai_engine.retry_budget.stats(),
+        "sessions": sessions.stats(),
+        "narration_cache": narration_cache.stats(),
+        "idempotency": idempotency.stats(),
+        "srd": srd.stats(),
+    }
+
+@app.get("/ready")
+def readiness():
+    """Listo para servir sin arranque en frío: 503 mientras dura el precalentamiento"""
+    report = {**warmup.report(), "import_ms": IMPORT_MS}
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=report)
+
+@app.get("/usage")
+def usage():
+    """Consumo de tokens por mes, modelo y sesión"""
+    return usage_tracker.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métricas en formato Prometheus"""
+    return usage_tracker.render_prometheus() + tracing.render_prometheus()
+
+@app.get("/storage/stats")
+def storage_stats():
+    """Métricas de la caché de documentos y de los volcados a disco"""
+    return storage.get_stats()
 
 # ======================================================
 # 🎮 Modelos
 # ======================================================
-class StartRequest(BaseModel):
+class SessionRequest(BaseModel):
+    session_id: str = DEFAULT_SESSION
+
+class StartRequest(SessionRequest):
     party_levels: List[int] | None = None
 
-class ActionRequest(BaseModel):
+class ActionRequest(SessionRequest):
     player: str
     action: str
 
-class PlayerAction(BaseModel):
+class PlayerAction(SessionRequest):
     player: str
 
 # ======================================================
@@ -33,67 +175,149 @@ class PlayerAction(BaseModel):
 @app.post("/game/start")
 async def api_start(payload: StartRequest):
     """Inicia una nueva partida"""
-    return await start_game(payload.party_levels or [1])
+    return await start_game(payload.party_levels or [1], payload.session_id)
 
 @app.post("/game/action")
-async def api_action(payload: ActionRequest):
-    """Procesa acciones de los jugadores"""
-    return await handle_action(payload.player, payload.action)
+async def api_action(payload: ActionRequest, response: Response, idempotency_key: str | None = Header(None)):
+    """
+    Procesa acciones de los jugadores.
+    Los duplicados (misma Idempotency-Key o, sin ella, la misma acción enviada mientras la primera
+    sigue en curso) comparten la narración en curso o reciben la ya guardada; X-Idempotency
+    indica cuál fue el caso.
+    """
+    key, digest, ttl = action_key(payload.session_id, payload.player, payload.action, idempotency_key)
+    try:
+        result, source = await idempotency.run(
+            key, digest, ttl,
+            lambda: handle_action(payload.player, payload.action, session_id=payload.session_id),
+            shared_file=sessions.get(payload.session_id).idempotency_file,
+        )
+    except ai_engine.LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    response.headers["X-Idempotency"] = source
+    return result
+
+@app.post("/game/round/action")
+async def api_round_action(payload: ActionRequest):
+    """
+    Acción en modo por rondas: espera a que actúe el grupo (o venza la ventana)
+    y narra la ronda entera en una sola llamada.
+    """
+    try:
+        return await handle_round_action(payload.player, payload.action, session_id=payload.session_id)
+    except ai_engine.LLMOverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+
+@app.post("/game/action/stream")
+async def api_action_stream(payload: ActionRequest, format: str = "sse"):
+    """
+    Procesa una acción y emite la narración token a token.
+    `format=sse` (por defecto) usa server-sent events; `format=ndjson` emite líneas JSON.
+    """
+    async def sse():
+        try:
+            async for item in handle_action_stream(payload.player, payload.action, session_id=payload.session_id):
+                yield f"event: {item['type']}\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+        except ai_engine.LLMOverloadedError as e:
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+
+    async def ndjson():
+        try:
+            async for item in handle_action_stream(payload.player, payload.action, session_id=payload.session_id):
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except ai_engine.LLMOverloadedError as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    if format == "ndjson":
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/game/events/pending")
+def pending_events(session_id: str = DEFAULT_SESSION):
+    """Eventos dinámicos cuya narración terminó después de responder al jugador"""
+    return {"events": take_pending_events(session_id)}
+
+@app.get("/events")
+def list_events(type: str | None = None, since: str | None = None, until: str | None = None,
+                session_id: str | None = None, limit: int = 50):
+    """Eventos recientes filtrados por tipo, sesión y rango de tiempo (ISO 8601)"""
+    limit = max(1, min(limit, 500))
+    return {"events": EventSystem().recent_events(type, since, until, session_id, limit)}
 
 # ======================================================
-# 🧙‍♂️ ENDPOINTS DE PARTY
+# 📖 SRD
 # ======================================================
-PARTY_FILE = "party.json"
+@app.get("/srd/{kind}")
+async def srd_lookup_many(kind: str, index: List[str] = Query(...)):
+    """Varios documentos del SRD en una consulta (`?index=goblin&index=orc`)"""
+    if kind not in SRD_KINDS:
+        raise HTTPException(status_code=404, detail=f"Tipo de SRD desconocido: {kind}")
+    try:
+        return {"results": await srd.get_many(kind, index)}
+    except InvalidSRDIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SRDUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+@app.get("/srd/{kind}/{index}")
+async def srd_lookup(kind: str, index: str):
+    """Hechizo, monstruo o encuentro del SRD (copia local, caché o SRDService)"""
+    if kind not in SRD_KINDS:
+        raise HTTPException(status_code=404, detail=f"Tipo de SRD desconocido: {kind}")
+    try:
+        doc = await srd.get(kind, index)
+    except InvalidSRDIndexError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SRDUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    if doc is None:
+        raise HTTPException(status_code=404, detail=f"No existe en el SRD: {kind}/{index}")
+    return doc
 
+# ======================================================
+# 🧙‍♂️ ENDPOINTS DE PARTY
+# ======================================================
 @app.get("/party")
-def get_party():
+def get_party(session_id: str = DEFAULT_SESSION):
     """Obtiene el estado actual del grupo"""
-    data = storage.read_json(PARTY_FILE)
-    return {"party": data.get("players", [])}
+    return {"party": party.members(sessions.get(session_id))}
 
 @app.post("/party/join")
 def join_party(payload: PlayerAction):
     """Agrega un jugador al grupo"""
-    data = storage.read_json(PARTY_FILE)
-    players = data.get("players", [])
-
-    if payload.player in players:
+    players = party.join(sessions.get(payload.session_id), payload.player)
+    if players is None:
         raise HTTPException(status_code=400, detail="Jugador ya está en el grupo.")
-
-    players.append(payload.player)
-    storage.write_json(PARTY_FILE, {"players": players})
     return {"message": f"{payload.player} se unió al grupo.", "party": players}
 
+def _remove_player(payload: PlayerAction) -> list:
+    """Quita un jugador del grupo de forma atómica (404 si no está)."""
+    players = party.leave(sessions.get(payload.session_id), payload.player)
+    if players is None:
+        raise HTTPException(status_code=404, detail="Jugador no está en el grupo.")
+    return players
+
 @app.post("/party/leave")
 def leave_party(payload: PlayerAction):
     """Un jugador deja el grupo"""
-    data = storage.read_json(PARTY_FILE)
-    players = data.get("players", [])
-
-    if payload.player not in players:
-        raise HTTPException(status_code=404, detail="Jugador no está en el grupo.")
-
-    players.remove(payload.player)
-    storage.write_json(PARTY_FILE, {"players": players})
+    players = _remove_player(payload)
     return {"message": f"{payload.player} dejó el grupo.", "party": players}
 
 @app.post("/party/kick")
 def kick_player(payload: PlayerAction):
     """Expulsa a un jugador del grupo"""
-    data = storage.read_json(PARTY_FILE)
-    players = data.get("players", [])
-
-    if payload.player not in players:
-        raise HTTPException(status_code=404, detail="Jugador no está en el grupo.")
-
-    players.remove(payload.player)
-    storage.write_json(PARTY_FILE, {"players": players})
+    players = _remove_player(payload)
     return {"message": f"{payload.player} fue expulsado del grupo.", "party": players}
 
 @app.post("/party/reset")
-def reset_party():
+def reset_party(payload: SessionRequest | None = None):
     """Limpia completamente el grupo"""
-    storage.write_json(PARTY_FILE, {"players": []})
+    session_id = payload.session_id if payload else DEFAULT_SESSION
+    party.reset(sessions.get(session_id))
     return {"message": "Grupo limpiado.", "party": []}
 
 # ======================================================
@@ -0,0 +1,54 @@
+# sam-gameapi/tests/conftest.py
+import pytest
+
+from utils import storage
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """storage apuntando a una carpeta temporal, con la caché vacía."""
+    monkeypatch.setattr(storage, "BASE_PATH", str(tmp_path))
+    monkeypatch.setattr(storage, "_backend", None)
+    _clear_cache()
+    yield tmp_path
+    # Lo pendiente no debe volcarse en data/ al salir
+    _clear_cache()
+
+
+@pytest.fixture
+def sqlite_dir(data_dir, monkeypatch):
+    """Como data_dir, pero con STORAGE_BACKEND=sqlite (data_dir/sam.db)."""
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "sqlite")
+    yield data_dir
+    _clear_cache()
+    if storage._backend is not None:
+        storage._backend.close()
+        storage._backend = None
+
+
+def _clear_cache() -> None:
+    with storage._lock:
+        storage._cache.clear()
+        storage._dirty.clear()
+        storage._versions.clear()
+
+
+class FakeClock:
+    """Sustituto de time.monotonic que solo avanza cuando el test lo pide."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj manual para probar caducidades sin esperar (solo en tests síncronos)."""
+    fake = FakeClock()
+    monkeypatch.setattr("time.monotonic", fake)
+    return fake
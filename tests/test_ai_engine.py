@@ -0,0 +1,143 @@
+# sam-gameapi/tests/test_ai_engine.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import ai_engine
+from core import model_router
+from core.model_router import ModelRouter
+from core.resilience import BreakerRegistry, RetryBudget
+
+MESSAGES = [{"role": "user", "content": "Abro la puerta"}]
+
+
+class FakeCompletions:
+    """Sustituto de _create_completion: cada modelo tarda lo configurado (o falla)."""
+
+    def __init__(self, delays: dict[str, float], errors: dict[str, Exception] | None = None):
+        self.delays = delays
+        self.errors = errors or {}
+        self.calls: list[str] = []
+
+    async def __call__(self, model, messages, **params):
+        self.calls.append(model)
+        await asyncio.sleep(self.delays[model])
+        if model in self.errors:
+            raise self.errors[model]
+        message = SimpleNamespace(content=f"narración de {model}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """ai_engine con router, breakers y presupuesto propios del test."""
+    monkeypatch.setattr(ai_engine, "router", ModelRouter(["lento", "rapido"], costs={"lento": 0.1, "rapido": 1.0}))
+    monkeypatch.setattr(ai_engine, "breakers", BreakerRegistry())
+    monkeypatch.setattr(ai_engine, "retry_budget", RetryBudget())
+    monkeypatch.setattr(model_router, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(model_router, "HEDGE_DEFAULT_DELAY", 0.02)
+    monkeypatch.setattr(model_router, "HEDGE_MIN_DELAY", 0.01)
+    monkeypatch.setattr(model_router, "ROUTER_MIN_SAMPLES", 3)
+    monkeypatch.setattr(model_router, "ROUTER_LATENCY_SLO", 0.05)
+    return ai_engine
+
+
+def complete(engine):
+    return engine._complete_with_fallback(engine.router.route(), MESSAGES)
+
+
+def test_hedge_wins_and_slow_primary_is_demoted(engine, monkeypatch):
+    fake = FakeCompletions({"lento": 0.5, "rapido": 0.01})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+
+    async def scenario():
+        first = await complete(engine)
+        routes = []
+        for _ in range(15):
+            routes.append(engine.router.route()[0])
+            await complete(engine)
+        return first, routes
+
+    first, routes = asyncio.run(scenario())
+    assert first == "narración de rapido"
+    assert engine.router.stats()["rapido"]["hedges_won"] >= 1
+    # Las cancelaciones del primario cuentan como muestras lentas hasta superar el SLO
+    assert engine.router.stats()["lento"]["samples"] >= 3
+    assert routes[0] == "lento" and routes[-1] == "rapido"
+    assert not engine.router.healthy("lento")
+
+
+def test_fast_primary_is_not_hedged(engine, monkeypatch):
+    fake = FakeCompletions({"lento": 0.001, "rapido": 0.001})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+
+    result = asyncio.run(complete(engine))
+    assert result == "narración de lento"
+    assert fake.calls == ["lento"]
+
+
+def test_failing_primary_falls_back(engine, monkeypatch):
+    fake = FakeCompletions({"lento": 0.001, "rapido": 0.001}, errors={"lento": ValueError("roto")})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+    monkeypatch.setattr(ai_engine, "RETRY_MAX_ATTEMPTS", 1)
+
+    assert asyncio.run(complete(engine)) == "narración de rapido"
+    assert engine.router.stats()["lento"]["error_rate"] == 1.0
+
+
+# ----------------------------------------------------------------
+# Circuit breaker por modelo
+# ----------------------------------------------------------------
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def call(engine, model="lento"):
+    async def run():
+        try:
+            return await engine._call_model(model, MESSAGES)
+        except Exception as e:
+            return e
+    return asyncio.run(run())
+
+
+def test_client_errors_do_not_open_the_circuit(engine, monkeypatch):
+    fake = FakeCompletions({"lento": 0}, errors={"lento": HTTPError(400)})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+    breaker = engine.breakers.get("lento")
+
+    for _ in range(breaker.failures + 2):
+        assert isinstance(call(engine), HTTPError)
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
+    # Sin reintentos: un 400 no va a salir bien a la segunda
+    assert len(fake.calls) == breaker.failures + 2
+
+
+def test_transient_errors_open_the_circuit(engine, monkeypatch):
+    fake = FakeCompletions({"lento": 0}, errors={"lento": HTTPError(503)})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+    monkeypatch.setattr(ai_engine, "RETRY_MAX_ATTEMPTS", 1)
+    breaker = engine.breakers.get("lento")
+
+    for _ in range(breaker.failures):
+        call(engine)
+    assert breaker.state == "open"
+    assert isinstance(call(engine), ai_engine.CircuitOpenError)
+
+
+def test_client_error_releases_the_half_open_probe(engine, monkeypatch, clock):
+    fake = FakeCompletions({"lento": 0}, errors={"lento": HTTPError(401)})
+    monkeypatch.setattr(engine, "_create_completion", fake)
+    breaker = engine.breakers.get("lento")
+    for _ in range(breaker.failures):
+        breaker.record_failure()
+    clock.advance(breaker.cooldown)
+
+    assert isinstance(call(engine), HTTPError)
+    assert breaker.state == "half_open"
+    # La prueba quedó libre: la siguiente petición puede volver a probar
+    assert breaker.allow()
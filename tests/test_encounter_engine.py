@@ -0,0 +1,122 @@
+# sam-gameapi/tests/test_encounter_engine.py
+import json
+import random
+from collections import Counter
+
+import pytest
+
+from core.encounter_engine import AliasTable, EncounterIndex
+from core.encounter_tables import load_encounter_tables
+
+
+def event(title, type="combat", weight=1, tags=(), min_level=1, max_level=20):
+    return {"type": type, "title": title, "description": title, "weight": weight,
+            "tags": list(tags), "min_level": min_level, "max_level": max_level}
+
+
+def test_alias_table_follows_the_weights():
+    table = AliasTable(["a", "b", "c"], [1, 2, 7])
+    rng = random.Random(42)
+    counts = Counter(table.sample(rng) for _ in range(20000))
+    for item, expected in {"a": 0.1, "b": 0.2, "c": 0.7}.items():
+        assert counts[item] / 20000 == pytest.approx(expected, abs=0.02)
+
+
+def test_alias_table_with_a_single_item():
+    table = AliasTable(["único"], [3])
+    assert table.sample(random.Random(0)) == "único"
+
+
+def test_alias_table_rejects_empty_input():
+    with pytest.raises(ValueError):
+        AliasTable([], [])
+
+
+def test_scene_tags_filter_events():
+    index = EncounterIndex({
+        "types": {"combat": 1},
+        "scene_keywords": {"bosque": ["árboles"]},
+        "events": [event("Lobos", tags=["bosque"]), event("Piratas", tags=["mar"])],
+    })
+    rng = random.Random(7)
+    context = {"scene": "Un claro entre ARBOLES", "party_levels": [3]}
+    assert index.scene_tags(context) == {"bosque"}
+    assert {index.sample(rng, context)["title"] for _ in range(200)} == {"Lobos"}
+
+
+def test_generic_events_mix_with_tagged_ones():
+    index = EncounterIndex({
+        "types": {"combat": 1},
+        "events": [event("Bandidos"), event("Lobos", tags=["bosque"]), event("Piratas", tags=["mar"])],
+    })
+    rng = random.Random(7)
+    titles = {index.sample(rng, tags=frozenset({"bosque"}), level=1)["title"] for _ in range(200)}
+    assert titles == {"Bandidos", "Lobos"}
+    titles = {index.sample(rng, tags=frozenset({"bosque", "mar"}), level=1)["title"] for _ in range(300)}
+    assert titles == {"Bandidos", "Lobos", "Piratas"}
+
+
+def test_party_level_limits_events():
+    index = EncounterIndex({
+        "types": {"combat": 1},
+        "events": [event("Ratas", max_level=4), event("Dragón", min_level=15)],
+    })
+    rng = random.Random(3)
+    assert {index.sample(rng, {"party_levels": [2, 3]})["title"] for _ in range(100)} == {"Ratas"}
+    assert {index.sample(rng, {"party_levels": [16]})["title"] for _ in range(100)} == {"Dragón"}
+
+
+def test_type_weights_drive_the_event_type():
+    index = EncounterIndex({
+        "types": {"combat": 1, "social": 3, "weather": 0},
+        "events": [event("Lobos"), event("Mercader", type="social"), event("Niebla", type="weather")],
+    })
+    rng = random.Random(11)
+    counts = Counter(index.sample(rng, level=1)["type"] for _ in range(8000))
+    assert "weather" not in counts
+    assert counts["social"] / 8000 == pytest.approx(0.75, abs=0.03)
+
+
+def test_load_tables_validates_events(tmp_path):
+    path = tmp_path / "malas.json"
+    path.write_text(json.dumps({"events": [{"type": "combat", "title": "Sin descripción"}]}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_encounter_tables(str(path))
+
+
+def test_bundled_tables_compile():
+    index = EncounterIndex(load_encounter_tables())
+    rng = random.Random(0)
+    assert all(index.sample(rng)["title"] for _ in range(50))
+
+
+def test_level_filter_survives_tag_relaxation():
+    index = EncounterIndex({
+        "types": {"combat": 1},
+        "events": [event("Lobos", tags=["bosque"], max_level=4), event("Dragón", min_level=15)],
+    })
+    rng = random.Random(5)
+    # Ningún evento de nivel 2 es del mar: se relajan los tags, no el nivel
+    titles = {index.sample(rng, tags=frozenset({"mar"}), level=2)["title"] for _ in range(200)}
+    assert titles == {"Lobos"}
+
+
+def test_type_without_events_at_the_level_is_resampled():
+    index = EncounterIndex({
+        "types": {"combat": 10, "social": 1},
+        "events": [event("Dragón", min_level=15), event("Mercader", type="social")],
+    })
+    rng = random.Random(5)
+    assert {index.sample(rng, level=1)["title"] for _ in range(200)} == {"Mercader"}
+    titles = Counter(index.sample(rng, level=16)["title"] for _ in range(2000))
+    assert titles["Dragón"] > titles["Mercader"]
+
+
+def test_type_wide_table_is_the_logged_last_resort(caplog):
+    index = EncounterIndex({
+        "types": {"combat": 1},
+        "events": [event("Dragón", min_level=15)],
+    })
+    with caplog.at_level("WARNING", logger="sam.trace"):
+        assert index.sample(random.Random(0), level=1)["title"] == "Dragón"
+    assert "encounter_level_fallback" in caplog.text
@@ -0,0 +1,63 @@
+# sam-gameapi/tests/test_event_log.py
+import pytest
+
+from utils.event_log import EventLog
+
+
+def event(i, kind="exploration", session_id=None):
+    e = {"timestamp": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}", "type": kind, "title": f"evento {i}"}
+    if session_id:
+        e["session_id"] = session_id
+    return e
+
+
+@pytest.fixture
+def log(data_dir):
+    return EventLog("events", ring_size=10, max_bytes=400, keep=0, compress=True)
+
+
+def test_recent_events_from_ring(log):
+    for i in range(5):
+        log.append(event(i))
+    assert [e["title"] for e in log.query(limit=2)] == ["evento 4", "evento 3"]
+
+
+def test_filters_by_type_and_session(log):
+    log.append(event(0, "combat", "s1"))
+    log.append(event(1, "social", "s1"))
+    log.append(event(2, "combat", "s2"))
+    assert [e["title"] for e in log.query(event_type="combat")] == ["evento 2", "evento 0"]
+    assert [e["title"] for e in log.query(session_id="s1")] == ["evento 1", "evento 0"]
+
+
+def test_rotates_compresses_and_prunes_segments(data_dir):
+    log = EventLog("events", ring_size=10, max_bytes=400, keep=2, compress=True)
+    for i in range(40):
+        log.append(event(i))
+    log.flush()
+    rotated = sorted(p.name for p in (data_dir / "events").glob("events-*"))
+    assert len(rotated) == 2
+    assert all(name.endswith(".jsonl.gz") for name in rotated)
+    assert (data_dir / "events" / "current.jsonl").exists()
+
+
+def test_queries_beyond_the_ring_read_segments(log):
+    for i in range(30):
+        log.append(event(i))
+    results = log.query(limit=15)
+    assert [e["title"] for e in results] == [f"evento {i}" for i in range(29, 14, -1)]
+
+
+def test_time_range_query(log):
+    for i in range(30):
+        log.append(event(i))
+    results = log.query(since="2026-01-01T00:00:12", until="2026-01-01T00:00:14", limit=50)
+    assert [e["title"] for e in results] == ["evento 14", "evento 13", "evento 12"]
+
+
+def test_reopen_restores_active_segment(log):
+    for i in range(3):
+        log.append(event(i))
+    log.flush()
+    reopened = EventLog("events", ring_size=10, max_bytes=400, keep=0)
+    assert [e["title"] for e in reopened.query(limit=3)] == ["evento 2", "evento 1", "evento 0"]
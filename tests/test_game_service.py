@@ -0,0 +1,138 @@
+# sam-gameapi/tests/test_game_service.py
+import asyncio
+
+import pytest
+
+import game_service
+from core.session_manager import sessions
+from utils import storage
+
+SESSION = "mesa_test"
+
+
+@pytest.fixture
+def game(data_dir, monkeypatch):
+    """game_service sin LLM ni eventos aleatorios, con un registro de sesiones vacío."""
+    monkeypatch.setattr(sessions, "_sessions", {})
+    monkeypatch.setattr(game_service, "_should_trigger_event", lambda action, count: False)
+    return game_service
+
+
+class ScriptedNarrator:
+    """Sustituto de interpret_action: cada acción espera a que el test la libere."""
+
+    def __init__(self):
+        self.gates: dict[str, asyncio.Event] = {}
+        self.started: dict[str, asyncio.Event] = {}
+
+    def gate(self, action):
+        self.gates.setdefault(action, asyncio.Event())
+        self.started.setdefault(action, asyncio.Event())
+        return self.gates[action]
+
+    async def __call__(self, player, action, mode, context, memory=None, session_id=None):
+        self.gate(action)
+        self.started[action].set()
+        await self.gates[action].wait()
+        return f"{player}: {action} (escena {context['scene']})"
+
+
+def state():
+    return storage.read_json(sessions.get(SESSION).state_file)
+
+
+def test_concurrent_actions_are_serialized(game, monkeypatch):
+    narrator = ScriptedNarrator()
+    monkeypatch.setattr(game, "interpret_action", narrator)
+
+    async def scenario():
+        await game.start_game([2], SESSION)
+        tasks = [asyncio.create_task(game.handle_action(p, f"acción de {p}", session_id=SESSION))
+                 for p in ("ana", "bruno", "carla")]
+        await asyncio.sleep(0)
+        for action in ("acción de carla", "acción de ana", "acción de bruno"):
+            narrator.gate(action).set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert not any(r.get("discarded") for r in results)
+    history = sessions.get(SESSION).history
+    assert history.count() == 3
+    assert sorted(e["player"] for e in history.tail(3)) == ["ana", "bruno", "carla"]
+
+
+def test_reset_discards_actions_from_the_previous_epoch(game, monkeypatch):
+    narrator = ScriptedNarrator()
+    monkeypatch.setattr(game, "interpret_action", narrator)
+
+    async def scenario():
+        await game.start_game([2], SESSION)
+        old = asyncio.create_task(game.handle_action("ana", "abro el cofre", session_id=SESSION))
+        kept = asyncio.create_task(game.handle_action("bruno", "vigilo", session_id=SESSION))
+        narrator.gate("vigilo").set()
+        kept_result = await kept
+        narrator.gate("abro el cofre")
+        await narrator.started["abro el cofre"].wait()
+
+        # Nueva partida mientras la acción de ana sigue narrándose
+        await game.start_game([5], SESSION)
+        narrator.gate("abro el cofre").set()
+        return kept_result, await old
+
+    kept_result, old_result = asyncio.run(scenario())
+    assert "discarded" not in kept_result
+    assert old_result["discarded"] is True
+    final = state()
+    assert final["epoch"] == 2
+    assert final["party_levels"] == [5]
+    assert sessions.get(SESSION).history.count() == 0
+
+
+def test_action_after_reset_uses_the_new_game(game, monkeypatch):
+    narrator = ScriptedNarrator()
+    monkeypatch.setattr(game, "interpret_action", narrator)
+
+    async def scenario():
+        await game.start_game([2], SESSION)
+        await game.start_game([3], SESSION)
+        narrator.gate("miro alrededor").set()
+        return await game.handle_action("ana", "miro alrededor", session_id=SESSION)
+
+    result = asyncio.run(scenario())
+    assert "discarded" not in result
+    assert sessions.get(SESSION).history.tail(1)[0]["action"] == "miro alrededor"
+    assert state()["epoch"] == 2
+
+
+def test_failed_summary_keeps_entries_pending(game, monkeypatch):
+    narrator = ScriptedNarrator()
+    monkeypatch.setattr(game, "interpret_action", narrator)
+    monkeypatch.setattr(game, "MEMORY_SUMMARY_EVERY", 2)
+    calls = []
+
+    async def summarize(previous, entries, session_id=None):
+        calls.append([e["action"] for e in entries])
+        return None if len(calls) == 1 else f"resumen de {len(entries)} turnos"
+
+    monkeypatch.setattr(game, "summarize_history", summarize)
+
+    async def act(action):
+        narrator.gate(action).set()
+        await game.handle_action("ana", action, session_id=SESSION)
+        await asyncio.gather(*game._background_tasks)
+
+    async def scenario():
+        await game.start_game([1], SESSION)
+        await act("uno")
+        await act("dos")
+        after_failure = dict(state())
+        await act("tres")
+        return after_failure
+
+    after_failure = asyncio.run(scenario())
+    assert after_failure.get("summary_upto", 0) == 0
+    assert "summary" not in after_failure
+    # El siguiente turno reintenta con todas las entradas aún sin resumir
+    assert calls == [["uno", "dos"], ["uno", "dos", "tres"]]
+    assert state()["summary_upto"] == 3
+    assert state()["summary"] == "resumen de 3 turnos"
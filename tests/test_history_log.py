@@ -0,0 +1,80 @@
+# sam-gameapi/tests/test_history_log.py
+import pytest
+
+from utils import storage
+from utils.history_log import HistoryLog
+
+
+def entries(n, start=0):
+    return [{"player": "ana", "action": f"acción {i}", "response": f"respuesta {i}"} for i in range(start, start + n)]
+
+
+@pytest.fixture
+def log(data_dir):
+    return HistoryLog("history", segment_size=4, tail_cache=3)
+
+
+def test_append_returns_running_total(log):
+    assert log.append(entries(1)[0]) == 1
+    assert log.extend(entries(2, 1)) == 3
+    assert log.count() == 3
+
+
+def test_rotates_into_fixed_size_segments(log, data_dir):
+    log.extend(entries(10))
+    names = sorted(p.name for p in (data_dir / "history").glob("seg-*.jsonl"))
+    assert names == ["seg-000001.jsonl", "seg-000002.jsonl", "seg-000003.jsonl"]
+    lines = (data_dir / "history" / "seg-000003.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+
+
+def test_tail_from_memory_and_from_segments(log):
+    log.extend(entries(10))
+    assert [e["action"] for e in log.tail(2)] == ["acción 8", "acción 9"]
+    # Más de lo que cabe en la caché de 3: se lee de los segmentos
+    assert [e["action"] for e in log.tail(6)] == [f"acción {i}" for i in range(4, 10)]
+    assert len(log.tail(50)) == 10
+    assert log.tail(0) == []
+
+
+def test_read_range_spans_segments(log):
+    log.extend(entries(10))
+    assert [e["action"] for e in log.read_range(3, 7)] == [f"acción {i}" for i in range(3, 7)]
+    assert log.read_range(8) == entries(2, 8)
+    assert log.read_range(12, 20) == []
+
+
+def test_iterates_whole_history_in_order(log):
+    log.extend(entries(9))
+    assert list(log) == entries(9)
+
+
+def test_reopen_recovers_index_and_tail(log):
+    log.extend(entries(6))
+    storage.flush()
+    reopened = HistoryLog("history", segment_size=4, tail_cache=3)
+    assert reopened.count() == 6
+    assert reopened.tail(2) == entries(2, 4)
+    assert reopened.append(entries(1, 6)[0]) == 7
+
+
+def test_reopen_reconciles_index_behind_segments(log, data_dir):
+    # El índice se vuelca en diferido: tras un corte puede ir por detrás de los segmentos
+    log.extend(entries(2))
+    storage.flush()
+    log.extend(entries(5, 2))
+    storage._cache.clear()
+    storage._dirty.clear()
+
+    reopened = HistoryLog("history", segment_size=4, tail_cache=3)
+    assert reopened.count() == 7
+    assert list(reopened) == entries(7)
+
+
+def test_reset_clears_segments(log, data_dir):
+    log.extend(entries(6))
+    log.reset()
+    assert log.count() == 0
+    assert log.tail(3) == []
+    assert not list((data_dir / "history").glob("seg-*.jsonl"))
+    assert log.append(entries(1)[0]) == 1
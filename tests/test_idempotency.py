@@ -0,0 +1,164 @@
+# sam-gameapi/tests/test_idempotency.py
+import asyncio
+
+import pytest
+
+from core import idempotency as idem
+from core.idempotency import IdempotencyCache, IdempotencyKeyReused, action_key
+from utils import storage
+
+
+class Counter:
+    """Operación de prueba: cuenta ejecuciones y tarda `delay` segundos."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("falló")
+        return {"narration": f"resultado {self.calls}"}
+
+
+def test_action_key_normalizes_and_scopes_explicit_keys(monkeypatch):
+    monkeypatch.setattr(idem, "IDEMPOTENCY_TTL", 300)
+    monkeypatch.setattr(idem, "IDEMPOTENCY_DERIVED_TTL", 0)
+    key, digest, ttl = action_key("s1", "ana", "  Abro   la PUERTA ")
+    assert (key, ttl) == (digest, 0)
+    assert action_key("s1", "ana", "abro la puerta")[1] == digest
+    assert action_key("s2", "ana", "abro la puerta")[1] != digest
+    assert action_key("s1", "ana", "abro la puerta", "k-1") == ("s1:k-1", digest, 300)
+
+
+def test_concurrent_duplicates_share_one_execution():
+    op = Counter(delay=0.02)
+
+    async def scenario():
+        cache = IdempotencyCache()
+        results = await asyncio.gather(*(cache.run("k", "d", 60, op) for _ in range(3)))
+        return results, cache.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert op.calls == 1
+    assert sorted(origin for _, origin in results) == ["coalesced", "coalesced", "executed"]
+    assert {r["narration"] for r, _ in results} == {"resultado 1"}
+    assert (stats["executed"], stats["coalesced"]) == (1, 2)
+
+
+def test_later_retry_is_replayed_until_it_expires():
+    op = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache()
+        first = await cache.run("k", "d", 0.05, op)
+        replay = await cache.run("k", "d", 0.05, op)
+        replay[0]["narration"] = "modificado"   # el llamador no debe poder tocar lo guardado
+        again = await cache.run("k", "d", 0.05, op)
+        await asyncio.sleep(0.06)
+        expired = await cache.run("k", "d", 0.05, op)
+        return first, replay, again, expired
+
+    first, replay, again, expired = asyncio.run(scenario())
+    assert first[1] == "executed"
+    assert replay[1] == "replayed"
+    assert again == ({"narration": "resultado 1"}, "replayed")
+    assert expired == ({"narration": "resultado 2"}, "executed")
+
+
+def test_zero_ttl_only_coalesces():
+    op = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache()
+        await cache.run("k", "d", 0, op)
+        return await cache.run("k", "d", 0, op)
+
+    assert asyncio.run(scenario())[1] == "executed"
+    assert op.calls == 2
+
+
+def test_errors_are_not_cached():
+    failing = Counter(fail=True)
+    ok = Counter()
+
+    async def scenario():
+        cache = IdempotencyCache()
+        with pytest.raises(RuntimeError):
+            await cache.run("k", "d", 60, failing)
+        return await cache.run("k", "d", 60, ok)
+
+    assert asyncio.run(scenario())[1] == "executed"
+
+
+def test_key_reused_with_another_action_raises():
+    async def scenario():
+        cache = IdempotencyCache()
+        await cache.run("k", "d1", 60, Counter())
+        await cache.run("k", "d2", 60, Counter())
+
+    with pytest.raises(IdempotencyKeyReused):
+        asyncio.run(scenario())
+
+
+def test_lru_bound():
+    async def scenario():
+        cache = IdempotencyCache(max_keys=2)
+        for key in ("a", "b", "c"):
+            await cache.run(key, key, 60, Counter())
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert list(cache._results) == ["b", "c"]
+
+
+# ----------------------------------------------------------------
+# Varios workers: dos cachés comparten el documento de storage
+# ----------------------------------------------------------------
+@pytest.fixture
+def shared(data_dir, monkeypatch):
+    monkeypatch.setattr(storage, "SHARED", True)
+    monkeypatch.setattr(idem, "IDEMPOTENCY_POLL", 0.005)
+    return "sessions/s1/idempotency.json"
+
+
+def test_shared_key_is_replayed_by_another_worker(shared):
+    op = Counter()
+
+    async def scenario():
+        first = await IdempotencyCache().run("k", "d", 60, op, shared_file=shared)
+        second = await IdempotencyCache().run("k", "d", 60, op, shared_file=shared)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert op.calls == 1
+    assert first[1] == "executed"
+    assert second == (first[0], "replayed")
+
+
+def test_shared_retry_waits_for_the_running_worker(shared):
+    op = Counter(delay=0.05)
+
+    async def scenario():
+        worker_a, worker_b = IdempotencyCache(), IdempotencyCache()
+        first = asyncio.create_task(worker_a.run("k", "d", 60, op, shared_file=shared))
+        await asyncio.sleep(0.01)
+        second = await worker_b.run("k", "d", 60, op, shared_file=shared)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert op.calls == 1
+    assert second == (first[0], "coalesced")
+
+
+def test_shared_key_is_released_after_an_error(shared):
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await IdempotencyCache().run("k", "d", 60, Counter(fail=True), shared_file=shared)
+        return await IdempotencyCache().run("k", "d", 60, Counter(), shared_file=shared)
+
+    assert asyncio.run(scenario())[1] == "executed"
+    assert storage.read_json(shared)["k"]["status"] == "done"
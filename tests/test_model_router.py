@@ -0,0 +1,58 @@
+# sam-gameapi/tests/test_model_router.py
+import pytest
+
+from core import model_router
+from core.model_router import ModelRouter, ModelStats
+
+
+@pytest.fixture
+def router(clock, monkeypatch):
+    monkeypatch.setattr(model_router, "ROUTER_MIN_SAMPLES", 5)
+    monkeypatch.setattr(model_router, "HEDGE_ENABLED", True)
+    return ModelRouter(["caro", "barato"], costs={"barato": 0.1, "caro": 1.0})
+
+
+def test_cheapest_first_unless_quality_is_requested(router):
+    assert router.route() == ["barato", "caro"]
+    assert router.route(prefer_quality=True) == ["caro", "barato"]
+
+
+def test_failing_model_is_demoted(router):
+    for _ in range(5):
+        router.record("barato", 1.0, ok=False)
+    assert not router.healthy("barato")
+    assert router.route() == ["caro", "barato"]
+
+
+def test_slow_model_is_demoted(router):
+    for _ in range(5):
+        router.record("barato", model_router.ROUTER_LATENCY_SLO + 5, ok=True)
+    assert router.route() == ["caro", "barato"]
+
+
+def test_demoted_model_recovers_once_samples_expire(router, clock):
+    for _ in range(5):
+        router.record("barato", 1.0, ok=False)
+    clock.advance(model_router.ROUTER_SAMPLE_TTL - 1)
+    assert router.route() == ["caro", "barato"]
+    clock.advance(2)
+    assert router.healthy("barato")
+    assert router.route() == ["barato", "caro"]
+
+
+def test_stats_window_and_percentiles(clock):
+    stats = ModelStats(window=4, ttl=60)
+    for latency in (1, 2, 3, 4, 5):
+        stats.record(latency, ok=True)
+    stats.record(0, ok=False)
+    assert stats.latencies == [2, 3, 4, 5]
+    assert stats.outcomes == [True, True, True, False]
+    assert stats.percentile(0.5) == 4
+    assert stats.error_rate == pytest.approx(0.25)
+
+
+def test_hedge_delay_uses_p95_after_enough_samples(router):
+    assert router.hedge_delay("barato") == model_router.HEDGE_DEFAULT_DELAY
+    for latency in (2, 2, 2, 2, 3):
+        router.record("barato", latency, ok=True)
+    assert router.hedge_delay("barato") == 3
@@ -0,0 +1,58 @@
+# sam-gameapi/tests/test_narration_cache.py
+import random
+
+from core.narration_cache import NarrationCache
+
+
+def make_cache(**kwargs):
+    return NarrationCache(**{"max_keys": 3, "variants": 2, "ttl": 60, "rng": random.Random(1), **kwargs})
+
+
+def test_miss_then_hit(clock):
+    cache = make_cache()
+    assert cache.get("Emboscada", "bosque") is None
+    cache.put("Emboscada", "bosque", "Flechas entre los árboles.")
+    assert cache.get("Emboscada", "bosque") == "Flechas entre los árboles."
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_keeps_only_the_newest_variants(clock):
+    cache = make_cache()
+    for i in range(4):
+        cache.put("Emboscada", "bosque", f"v{i}")
+    seen = {cache.get("Emboscada", "bosque") for _ in range(50)}
+    assert seen == {"v2", "v3"}
+    assert cache.missing("Emboscada", "bosque") == 0
+
+
+def test_variants_expire_after_ttl(clock):
+    cache = make_cache()
+    cache.put("Emboscada", "bosque", "vieja")
+    clock.advance(40)
+    cache.put("Emboscada", "bosque", "nueva")
+    clock.advance(30)
+    # La primera ya caducó; la segunda sigue vigente
+    assert cache.get("Emboscada", "bosque") == "nueva"
+    assert cache.missing("Emboscada", "bosque") == 1
+    clock.advance(31)
+    assert cache.get("Emboscada", "bosque") is None
+    assert cache.stats()["keys"] == 0
+
+
+def test_evicts_least_recently_used_key(clock):
+    cache = make_cache()
+    for scene in ("bosque", "cueva", "ciudad"):
+        cache.put("Emboscada", scene, scene)
+    cache.get("Emboscada", "bosque")          # bosque pasa a ser la más reciente
+    cache.put("Emboscada", "pantano", "pantano")
+    assert cache.get("Emboscada", "cueva") is None
+    assert cache.get("Emboscada", "bosque") == "bosque"
+    assert cache.stats()["keys"] == 3
+
+
+def test_missing_counts_variants_left(clock):
+    cache = make_cache(variants=3)
+    assert cache.missing("Tormenta", "mar") == 3
+    cache.put("Tormenta", "mar", "Olas.")
+    assert cache.missing("Tormenta", "mar") == 2
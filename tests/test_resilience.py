@@ -0,0 +1,144 @@
+# sam-gameapi/tests/test_resilience.py
+import asyncio
+import random
+
+import pytest
+
+from core import resilience
+from core.resilience import CircuitBreaker, RetryBudget, deadline_scope, remaining
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+# ----------------------------------------------------------------
+# Circuit breaker
+# ----------------------------------------------------------------
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert not breaker.available()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=10)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=10)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    assert breaker.snapshot()["retry_in"] == 10
+    clock.advance(10)
+    assert breaker.allow()
+
+
+def test_released_probe_frees_the_slot(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=10)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+# ----------------------------------------------------------------
+# Presupuesto de reintentos
+# ----------------------------------------------------------------
+def test_budget_spends_and_denies():
+    budget = RetryBudget(ratio=0.5, minimum=2)
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert not budget.try_spend()
+    budget.deposit()
+    assert budget.try_spend()
+    assert budget.stats() == {"tokens": 0, "retries": 3, "denied": 2}
+
+
+def test_budget_is_capped():
+    budget = RetryBudget(ratio=1, minimum=2)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.stats()["tokens"] == 2
+
+
+def test_backoff_delay_is_bounded(monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_BASE_DELAY", 0.25)
+    monkeypatch.setattr(resilience, "RETRY_MAX_DELAY", 1.0)
+    rng = random.Random(5)
+    assert all(0 <= resilience.backoff_delay(0, rng) <= 0.25 for _ in range(100))
+    assert all(0 <= resilience.backoff_delay(10, rng) <= 1.0 for _ in range(100))
+
+
+@pytest.mark.parametrize("status, retryable", [(None, True), (429, True), (503, True), (400, False), (401, False)])
+def test_is_retryable(status, retryable):
+    error = RuntimeError("sin red") if status is None else HTTPError(status)
+    assert resilience.is_retryable(error) is retryable
+
+
+# ----------------------------------------------------------------
+# Plazos
+# ----------------------------------------------------------------
+def test_nested_deadline_never_extends_the_outer_one(clock):
+    assert remaining() is None
+    with deadline_scope(5):
+        with deadline_scope(30):
+            assert remaining() == 5
+        with deadline_scope(2):
+            assert remaining() == 2
+    assert remaining() is None
+
+
+def test_background_work_drops_the_deadline():
+    async def job():
+        return remaining()
+
+    async def scenario():
+        with deadline_scope(5):
+            inside = await job()
+            outside = await resilience.without_deadline(job())
+        return inside, outside
+
+    inside, outside = asyncio.run(scenario())
+    assert inside is not None and outside is None
+
+
+def test_parse_timeout(monkeypatch):
+    monkeypatch.setattr(resilience, "REQUEST_DEADLINE", 25)
+    monkeypatch.setattr(resilience, "REQUEST_DEADLINE_MAX", 120)
+    assert resilience.parse_timeout(None) == 25
+    assert resilience.parse_timeout("10") == 10
+    assert resilience.parse_timeout("999") == 120
+    assert resilience.parse_timeout("abc") == 25
+    assert resilience.parse_timeout("-1") == 25
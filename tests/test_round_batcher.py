@@ -0,0 +1,94 @@
+# sam-gameapi/tests/test_round_batcher.py
+import asyncio
+
+import pytest
+
+from core.round_batcher import RoundBatcher
+
+
+def echo_dispatch(calls):
+    async def dispatch(actions):
+        calls.append([a["player"] for a in actions])
+        return {a["player"]: {"narration": a["action"]} for a in actions}
+    return dispatch
+
+
+def test_closes_when_every_expected_player_acted():
+    calls = []
+
+    async def scenario():
+        batcher = RoundBatcher(echo_dispatch(calls), window=30)
+        party = {"ana", "bruno"}
+        return await asyncio.gather(
+            batcher.submit("ana", "ataco", expected=party),
+            batcher.submit("bruno", "me escondo", expected=party),
+        )
+
+    results = asyncio.run(scenario())
+    assert [r["narration"] for r in results] == ["ataco", "me escondo"]
+    assert calls == [["ana", "bruno"]]
+
+
+def test_closes_when_the_window_expires():
+    calls = []
+
+    async def scenario():
+        batcher = RoundBatcher(echo_dispatch(calls), window=0.01)
+        result = await batcher.submit("ana", "espero", expected={"ana", "bruno"})
+        return result, batcher.rounds
+
+    result, rounds = asyncio.run(scenario())
+    assert result == {"narration": "espero"}
+    assert rounds == 1
+    assert calls == [["ana"]]
+
+
+def test_repeated_player_opens_the_next_round():
+    calls = []
+
+    async def scenario():
+        batcher = RoundBatcher(echo_dispatch(calls), window=0.01)
+        return await asyncio.gather(
+            batcher.submit("ana", "primera"),
+            batcher.submit("ana", "segunda"),
+        )
+
+    results = asyncio.run(scenario())
+    assert [r["narration"] for r in results] == ["primera", "segunda"]
+    assert calls == [["ana"], ["ana"]]
+
+
+def test_dispatch_error_reaches_every_player():
+    async def failing(actions):
+        raise RuntimeError("sin modelo")
+
+    async def scenario():
+        batcher = RoundBatcher(failing, window=30)
+        party = {"ana", "bruno"}
+        return await asyncio.gather(
+            batcher.submit("ana", "ataco", expected=party),
+            batcher.submit("bruno", "huyo", expected=party),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_cancelled_dispatch_does_not_leave_players_waiting(started):
+    async def hanging(actions):
+        await asyncio.sleep(30)
+
+    async def scenario():
+        batcher = RoundBatcher(hanging, window=30)
+        waiter = asyncio.create_task(batcher.submit("ana", "ataco", expected={"ana"}))
+        await asyncio.sleep(0)
+        if started:
+            await asyncio.sleep(0.01)
+        for task in list(batcher._tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,141 @@
+# sam-gameapi/tests/test_shared_storage.py
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import game_service
+from core.session_manager import sessions
+from utils import storage
+from utils.storage_backend import LockBusyError
+
+HOLD = 0.3   # segundos que otro "worker" retiene el bloqueo
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def shared(request, data_dir, monkeypatch):
+    """storage en modo compartido (varios workers) sobre cada backend."""
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", request.param)
+    monkeypatch.setattr(storage, "SHARED", True)
+    monkeypatch.setattr(storage, "WRITE_BEHIND", False)
+    storage.get_backend()   # crear el esquema antes de medir nada
+    yield request.param
+    if storage._backend is not None:
+        storage._backend.close()
+        storage._backend = None
+
+
+def hold_lock(filenames, ready: threading.Event, seconds: float = HOLD) -> threading.Thread:
+    """Otro hilo (con su propio descriptor/conexión) toma el bloqueo como lo haría otro worker."""
+    def run():
+        with storage.get_backend().locked(filenames):
+            ready.set()
+            time.sleep(seconds)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(2)
+    return thread
+
+
+def test_non_blocking_lock_raises_when_busy(shared):
+    backend = storage.get_backend()
+    ready = threading.Event()
+    holder = hold_lock(["game_state.json"], ready)
+    with pytest.raises(LockBusyError):
+        with backend.locked(["game_state.json"], blocking=False):
+            pass
+    holder.join()
+    with backend.locked(["game_state.json"], blocking=False):
+        pass
+
+
+def test_exclusive_async_polls_without_blocking_the_loop(shared):
+    ready = threading.Event()
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        holder = hold_lock(["game_state.json"], ready)
+        started = time.monotonic()
+        async with storage.exclusive_async(["game_state.json"]):
+            waited = time.monotonic() - started
+        tick_task.cancel()
+        holder.join()
+        return ticks, waited
+
+    waits_before = storage.get_stats()["lock_waits"]
+    ticks, waited = asyncio.run(scenario())
+    assert waited >= HOLD * 0.8
+    assert ticks >= 10
+    assert storage.get_stats()["lock_waits"] > waits_before
+
+
+def test_commit_does_not_block_the_loop_on_history_or_pending_events(shared, monkeypatch):
+    monkeypatch.setattr(sessions, "_sessions", {})
+    monkeypatch.setattr(game_service, "_should_trigger_event", lambda action, count: False)
+
+    async def narrate(player, action, mode, context, memory=None, session_id=None):
+        return f"{player}: {action}"
+
+    monkeypatch.setattr(game_service, "interpret_action", narrate)
+    ready = threading.Event()
+
+    async def scenario():
+        await game_service.start_game([1], "mesa")
+        session = sessions.get("mesa")
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        # Otro worker escribe el historial y los eventos pendientes de la misma sesión
+        holder = hold_lock([session.pending_file, *session.history.documents()], ready)
+        result = await game_service.handle_action("ana", "abro la puerta", session_id="mesa")
+        tick_task.cancel()
+        holder.join()
+        return result, ticks, session.history.count()
+
+    result, ticks, count = asyncio.run(scenario())
+    assert "discarded" not in result
+    assert count == 1
+    assert ticks >= 10
+
+
+def test_other_worker_writes_are_reloaded(shared, data_dir):
+    storage.write_json("game_state.json", {"scene": "Taberna"})
+    assert storage.read_json("game_state.json") == {"scene": "Taberna"}
+
+    # Otro proceso (otro worker) modifica el documento
+    script = (
+        "from utils import storage\n"
+        "storage.update_json('game_state.json', lambda s: s.update(scene='Bosque'))\n"
+        "storage.get_backend().close()\n"
+    )
+    env = {"DATA_PATH": str(data_dir), "STORAGE_BACKEND": shared, "STORAGE_SHARED": "1", "PATH": ""}
+    subprocess.run([sys.executable, "-c", script], env=env, check=True, cwd=str(REPO_ROOT))
+
+    stale_before = storage.get_stats()["stale_reads"]
+    assert storage.read_json("game_state.json") == {"scene": "Bosque"}
+    assert storage.get_stats()["stale_reads"] == stale_before + 1
+    # La versión recargada vuelve a servirse desde caché
+    hits_before = storage.get_stats()["cache_hits"]
+    storage.read_json("game_state.json")
+    assert storage.get_stats()["cache_hits"] == hits_before + 1
@@ -0,0 +1,151 @@
+# sam-gameapi/tests/test_sqlite_backend.py
+from datetime import datetime
+
+import pytest
+
+from core import party
+from core.session_manager import Session
+from tools.migrate_to_sqlite import migrate
+from utils import storage
+from utils.event_log import EventLog, SQLiteEventLog
+from utils.history_log import HistoryLog, SQLiteHistoryLog, open_history_log
+from utils.sqlite_backend import SQLiteBackend
+from utils.storage_backend import JsonFileBackend
+from utils.usage_tracker import UsageTracker
+
+MONTH = datetime.utcnow().strftime("%Y-%m")
+
+
+def reload() -> None:
+    """Vuelca y vacía la caché: la siguiente lectura sale de la base."""
+    storage.flush()
+    with storage._lock:
+        storage._cache.clear()
+        storage._versions.clear()
+
+
+def entries(n, start=0):
+    return [{"player": "ana", "action": f"acción {i}", "response": f"respuesta {i}"} for i in range(start, start + n)]
+
+
+def test_documents_round_trip(sqlite_dir):
+    assert isinstance(storage.get_backend(), SQLiteBackend)
+    storage.write_json("game_state.json", {"scene": "Taberna", "party_levels": [2]})
+    storage.update_json("game_state.json", lambda state: state.update(scene="Bosque"))
+    reload()
+
+    assert storage.read_json("game_state.json") == {"scene": "Bosque", "party_levels": [2]}
+    assert storage.get_backend().version("game_state.json") == 1
+    assert (sqlite_dir / "sam.db").exists()
+    assert not (sqlite_dir / "game_state.json").exists()
+
+
+def test_versions_grow_with_each_save(sqlite_dir):
+    backend = storage.get_backend()
+    for scene in ("a", "b", "c"):
+        backend.save_many({"doc.json": {"scene": scene}})
+    assert backend.load_versioned("doc.json") == ({"scene": "c"}, 3)
+    assert backend.load("otro.json") is None
+
+
+def test_history_round_trip(sqlite_dir):
+    log = open_history_log("sessions/s1/history")
+    assert isinstance(log, SQLiteHistoryLog)
+    assert log.append(entries(1)[0]) == 1
+    assert log.extend(entries(5, 1)) == 6
+    assert [e["action"] for e in log.tail(2)] == ["acción 4", "acción 5"]
+    assert [e["action"] for e in log.read_range(1, 3)] == ["acción 1", "acción 2"]
+    assert len(list(log)) == 6
+    # Otro log de la misma base no se mezcla
+    assert open_history_log("sessions/s2/history").count() == 0
+    log.reset()
+    assert log.count() == 0
+    assert log.tail(5) == []
+
+
+def test_party_round_trip(sqlite_dir):
+    session = Session("s1")
+    assert party.join(session, "ana") == ["ana"]
+    assert party.join(session, "bruno") == ["ana", "bruno"]
+    assert party.join(session, "ana") is None
+    assert party.leave(session, "ana") == ["bruno"]
+    assert party.leave(session, "ana") is None
+    party.reset(session)
+    assert party.members(session) == []
+
+
+def test_usage_round_trip(sqlite_dir):
+    tracker = UsageTracker()
+    tracker.record("gpt-4o-mini", 100, 20, session_id="s1")
+    tracker.flush()
+    tracker.record("gpt-4o-mini", 10, 2, session_id="s1")
+    tracker.flush()
+
+    month = tracker.snapshot()[MONTH]
+    assert (month["total_tokens"], month["calls"]) == (132, 2)
+    assert month["models"]["gpt-4o-mini"]["prompt_tokens"] == 110
+    assert month["sessions"]["s1"]["tokens"] == 132
+
+
+def test_events_round_trip(sqlite_dir):
+    log = SQLiteEventLog(storage.get_backend())
+    for i in range(6):
+        log.append({"timestamp": f"2026-01-01T00:00:0{i}", "type": "action" if i % 2 else "start",
+                    "session_id": "s1"})
+    assert [e["timestamp"][-1] for e in log.query(limit=3)] == ["5", "4", "3"]
+    assert [e["timestamp"][-1] for e in log.query(event_type="start")] == ["4", "2", "0"]
+    assert len(log.query(since="2026-01-01T00:00:02", until="2026-01-01T00:00:03")) == 2
+
+
+# ----------------------------------------------------------------
+# tools/migrate_to_sqlite.py
+# ----------------------------------------------------------------
+def test_migration_round_trip(data_dir, monkeypatch):
+    # Datos en formato JSON, como los deja el backend por defecto
+    assert isinstance(storage.get_backend(), JsonFileBackend)
+    storage.write_json("game_state.json", {"scene": "Taberna"})
+    storage.write_json("sessions/s1/game_state.json", {"scene": "Cueva", "epoch": 3})
+    session = Session("s1")
+    party.join(session, "ana")
+    party.join(session, "bruno")
+    HistoryLog("sessions/s1/history", segment_size=4).extend(entries(10))
+    tracker = UsageTracker()
+    tracker.record("gpt-5", 30, 5, session_id="s1")
+    tracker.flush()
+    events = EventLog("events", ring_size=10)
+    for i in range(3):
+        events.append({"timestamp": f"2026-01-01T00:00:0{i}", "type": "action", "session_id": "s1"})
+    events.flush()
+    storage.flush()
+
+    counts = migrate(str(data_dir), str(data_dir / "sam.db"))
+    assert counts["documents"] == 2
+    assert counts["party_members"] == 2
+    assert counts["history"] == 10
+    assert counts["events"] == 3
+
+    # Mismos datos leídos a través del backend SQLite
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(storage, "_backend", None)
+    with storage._lock:
+        storage._cache.clear()
+    try:
+        assert storage.read_json("sessions/s1/game_state.json") == {"scene": "Cueva", "epoch": 3}
+        assert party.members(Session("s1")) == ["ana", "bruno"]
+        history = open_history_log("sessions/s1/history")
+        assert history.count() == 10
+        assert history.tail(1)[0]["action"] == "acción 9"
+        assert UsageTracker().snapshot()[MONTH]["sessions"]["s1"]["tokens"] == 35
+        assert len(SQLiteEventLog(storage.get_backend()).query()) == 3
+    finally:
+        storage.get_backend().close()
+
+
+def test_migration_refuses_to_overwrite(data_dir):
+    storage.write_json("game_state.json", {"scene": "Taberna"})
+    storage.flush()
+    db = str(data_dir / "sam.db")
+    migrate(str(data_dir), db)
+    with pytest.raises(SystemExit, match="--replace"):
+        migrate(str(data_dir), db)
+    assert migrate(str(data_dir), db, replace=True)["documents"] == 1
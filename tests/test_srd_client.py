@@ -0,0 +1,151 @@
+# sam-gameapi/tests/test_srd_client.py
+import asyncio
+import json
+
+import pytest
+
+from core.srd_client import InvalidSRDIndexError, SRDClient, SRDUnavailableError
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeHTTP:
+    """Sustituto de httpx.AsyncClient: sirve `docs` y anota cada petición."""
+
+    def __init__(self, docs, delay=0.01):
+        self.docs = docs
+        self.delay = delay
+        self.down = False
+        self.requests = []
+
+    async def get(self, path):
+        self.requests.append(("GET", path))
+        await asyncio.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("sin conexión")
+        kind, _, index = path.strip("/").partition("/")
+        doc = self.docs.get(kind, {}).get(index)
+        return FakeResponse(200, doc) if doc else FakeResponse(404)
+
+    async def post(self, path, json):
+        self.requests.append(("POST", path, tuple(json["indexes"])))
+        await asyncio.sleep(self.delay)
+        if self.down:
+            raise ConnectionError("sin conexión")
+        kind = path.strip("/").split("/")[0]
+        return FakeResponse(200, [self.docs[kind][i] for i in json["indexes"] if i in self.docs.get(kind, {})])
+
+    async def aclose(self):
+        pass
+
+
+DOCS = {"spells": {
+    "fireball": {"index": "fireball", "name": "Fireball"},
+    "shield": {"index": "shield", "name": "Shield"},
+}}
+
+
+def make_client(**kwargs):
+    client = SRDClient(base_url="http://srd.test", mirror_path=None, **kwargs)
+    client._http = FakeHTTP(DOCS)
+    return client
+
+
+def test_concurrent_requests_are_coalesced():
+    async def scenario():
+        client = make_client()
+        docs = await asyncio.gather(*(client.get("spells", "fireball") for _ in range(5)))
+        return client, docs
+
+    client, docs = asyncio.run(scenario())
+    assert all(doc["name"] == "Fireball" for doc in docs)
+    assert client._http.requests == [("GET", "/spells/fireball")]
+    assert client.stats()["coalesced"] == 4
+
+
+def test_cache_and_negative_cache():
+    async def scenario():
+        client = make_client()
+        await client.get("spells", "fireball")
+        assert await client.get("spells", "wish") is None
+        await client.get("spells", "fireball")
+        assert await client.get("spells", "wish") is None
+        return client
+
+    client = asyncio.run(scenario())
+    assert len(client._http.requests) == 2
+    assert client.stats()["hits"] == 2
+
+
+def test_expired_entry_is_fetched_again():
+    async def scenario():
+        client = make_client(ttl=0.01)
+        await client.get("spells", "fireball")
+        await asyncio.sleep(0.02)
+        await client.get("spells", "fireball")
+        return client
+
+    assert len(asyncio.run(scenario())._http.requests) == 2
+
+
+def test_stale_copy_is_served_when_the_service_fails():
+    async def scenario():
+        client = make_client(ttl=0.01)
+        await client.get("spells", "fireball")
+        await asyncio.sleep(0.02)
+        client._http.down = True
+        doc = await client.get("spells", "fireball")
+        with pytest.raises(SRDUnavailableError):
+            await client.get("spells", "shield")
+        return client, doc
+
+    client, doc = asyncio.run(scenario())
+    assert doc["name"] == "Fireball"
+    assert client.stats()["stale_served"] == 1
+
+
+def test_batch_path_sends_one_request():
+    async def scenario():
+        client = make_client(batch_path="/{kind}/batch")
+        docs = await client.get_many("spells", ["fireball", "shield", "wish", "fireball"])
+        return client, docs
+
+    client, docs = asyncio.run(scenario())
+    assert client._http.requests == [("POST", "/spells/batch", ("fireball", "shield", "wish"))]
+    assert docs["shield"]["name"] == "Shield"
+    assert docs["wish"] is None
+
+
+@pytest.mark.parametrize("index", ["../monsters", "fire ball", "FIREBALL", "", "a" * 101, "x%2F"])
+def test_invalid_indexes_never_reach_the_service(index):
+    async def scenario():
+        client = make_client()
+        with pytest.raises(InvalidSRDIndexError):
+            await client.get("spells", index)
+        return client
+
+    assert asyncio.run(scenario())._http.requests == []
+
+
+def test_mirror_is_served_without_requests(tmp_path):
+    (tmp_path / "spells.json").write_text(json.dumps([{"index": "shield", "name": "Escudo"}]), encoding="utf-8")
+
+    async def scenario():
+        client = make_client()
+        assert client.load_mirror(str(tmp_path)) == 1
+        return client, await client.get("spells", "shield")
+
+    client, doc = asyncio.run(scenario())
+    assert doc["name"] == "Escudo"
+    assert client._http.requests == []
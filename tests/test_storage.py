@@ -0,0 +1,75 @@
+# sam-gameapi/tests/test_storage.py
+import json
+
+import pytest
+
+from utils import storage
+
+
+@pytest.fixture
+def write_behind(monkeypatch):
+    monkeypatch.setattr(storage, "WRITE_BEHIND", True)
+    monkeypatch.setattr(storage, "SHARED", False)
+
+
+def test_read_missing_document_is_empty(data_dir):
+    assert storage.read_json("nada.json") == {}
+
+
+def test_write_then_read_is_served_from_cache(data_dir, write_behind):
+    storage.write_json("doc.json", {"a": 1})
+    assert storage.read_json("doc.json") == {"a": 1}
+    assert not (data_dir / "doc.json").exists()   # aún pendiente de volcado
+
+
+def test_flush_persists_pending_documents(data_dir, write_behind):
+    storage.write_json("sub/doc.json", {"a": [1, 2]})
+    assert storage.flush() == 1
+    assert json.loads((data_dir / "sub" / "doc.json").read_text(encoding="utf-8")) == {"a": [1, 2]}
+    assert storage.flush() == 0
+
+
+def test_write_stores_a_copy_of_the_callers_dict(data_dir, write_behind):
+    data = {"players": ["ana"]}
+    storage.write_json("party.json", data)
+    data["players"].append("bruno")
+
+    assert storage.read_json("party.json") == {"players": ["ana"]}
+    storage.flush()
+    assert json.loads((data_dir / "party.json").read_text(encoding="utf-8")) == {"players": ["ana"]}
+
+
+def test_read_returns_independent_copies(data_dir, write_behind):
+    storage.write_json("doc.json", {"items": []})
+    storage.read_json("doc.json")["items"].append("x")
+    assert storage.read_json("doc.json") == {"items": []}
+
+
+def test_update_json_returns_the_mutation_result(data_dir, write_behind):
+    storage.write_json("counter.json", {"n": 1})
+
+    def bump(data):
+        data["n"] += 1
+        return data["n"]
+
+    assert storage.update_json("counter.json", bump) == 2
+    assert storage.read_json("counter.json") == {"n": 2}
+
+
+def test_update_json_writes_nothing_if_mutation_fails(data_dir, write_behind):
+    storage.write_json("doc.json", {"n": 1})
+
+    def fail(data):
+        data["n"] = 99
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        storage.update_json("doc.json", fail)
+    assert storage.read_json("doc.json") == {"n": 1}
+
+
+def test_write_through_without_write_behind(data_dir, monkeypatch):
+    monkeypatch.setattr(storage, "WRITE_BEHIND", False)
+    monkeypatch.setattr(storage, "SHARED", False)
+    storage.write_json("doc.json", {"a": 1})
+    assert json.loads((data_dir / "doc.json").read_text(encoding="utf-8")) == {"a": 1}
@@ -0,0 +1,68 @@
+# sam-gameapi/tests/test_usage_tracker.py
+from datetime import datetime
+
+import pytest
+
+from utils import storage
+from utils.usage_tracker import UsageTracker, normalize
+
+MONTH = datetime.utcnow().strftime("%Y-%m")
+
+
+@pytest.fixture
+def tracker(data_dir):
+    return UsageTracker("usage_test.json")
+
+
+def test_record_flush_snapshot_totals(tracker):
+    tracker.record("gpt-4o-mini", 100, 20, session_id="mesa1")
+    tracker.record("gpt-4o-mini", 50, 10, session_id="mesa2")
+    assert tracker.flush() is True
+    tracker.record("gpt-5", 30, 5)
+
+    month = tracker.snapshot()[MONTH]
+    assert (month["total_tokens"], month["prompt_tokens"], month["completion_tokens"], month["calls"]) == (215, 180, 35, 3)
+    assert month["models"]["gpt-4o-mini"] == {"tokens": 180, "prompt_tokens": 150, "completion_tokens": 30, "calls": 2}
+    assert month["models"]["gpt-5"]["tokens"] == 35
+    assert month["sessions"]["mesa1"]["tokens"] == 120
+    # Lo persistido no incluye lo que sigue pendiente
+    assert storage.read_json("usage_test.json")[MONTH]["total_tokens"] == 180
+
+
+def test_flush_without_pending_does_nothing(tracker):
+    assert tracker.flush() is False
+    assert storage.read_json("usage_test.json") == {}
+
+
+def test_snapshot_does_not_write(tracker):
+    tracker.record("gpt-4o-mini", 10, 5)
+    assert tracker.snapshot()[MONTH]["total_tokens"] == 15
+    assert storage.read_json("usage_test.json") == {}
+
+
+def test_failed_flush_keeps_its_deltas(tracker, monkeypatch):
+    tracker.record("gpt-4o-mini", 100, 20)
+
+    def broken(filename, mutate):
+        tracker.record("gpt-4o-mini", 1, 1)   # llega otra completion durante el volcado
+        raise OSError("disco lleno")
+
+    with monkeypatch.context() as m:
+        m.setattr(storage, "update_json", broken)
+        with pytest.raises(OSError):
+            tracker.flush()
+
+    assert tracker.snapshot()[MONTH]["total_tokens"] == 122
+    assert tracker.flush() is True
+    persisted = storage.read_json("usage_test.json")[MONTH]
+    assert (persisted["total_tokens"], persisted["calls"]) == (122, 2)
+
+
+def test_normalize_legacy_formats():
+    data = normalize({
+        "2025-01": {"total": 40, "models": {"gpt-4o-mini": 40}},
+        "2025-02": {"total_tokens": 9, "models": {"gpt-5": {"tokens": 9, "calls": 1}}},
+    })
+    assert data["2025-01"]["total_tokens"] == 40
+    assert data["2025-01"]["models"]["gpt-4o-mini"]["tokens"] == 40
+    assert data["2025-02"]["models"]["gpt-5"] == {"tokens": 9, "prompt_tokens": 0, "completion_tokens": 0, "calls": 1}
@@ -0,0 +1,79 @@
+# sam-gameapi/tools/import_profile.py
+"""
+Perfil del tiempo de importación de la app (lo que paga cada arranque en frío antes
+de aceptar la primera petición). Ejecuta `python -X importtime -c "import main"` en
+un proceso limpio y resume la salida:
+
+  - total: suma del tiempo propio de todos los módulos importados
+  - los módulos con más tiempo acumulado (incluye sus dependencias)
+  - los módulos con más tiempo propio
+
+Uso:  python -m tools.import_profile [--module main] [--top 15] [--json perfil.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def profile(module: str) -> list[dict]:
+    """Una fila por módulo: nombre, profundidad de anidamiento y tiempos propio/acumulado en ms."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.strip().splitlines()[-5:])
+        raise SystemExit(f"No se pudo importar {module}:\n{tail}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def summarize(rows: list[dict], top: int) -> dict:
+    return {
+        "total_ms": round(sum(r["self_ms"] for r in rows), 1),
+        "modules": len(rows),
+        "top_cumulative": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+        "top_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top],
+    }
+
+
+def _print_table(title: str, rows: list[dict], key: str) -> None:
+    print(f"\n{title}")
+    for r in rows:
+        print(f"  {r[key]:>9.1f} ms  {r['module']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="módulo a importar")
+    parser.add_argument("--top", type=int, default=15, help="módulos por tabla")
+    parser.add_argument("--json", default=None, help="guardar el resumen en este archivo")
+    args = parser.parse_args()
+
+    report = summarize(profile(args.module), args.top)
+    print(f"import {args.module}: {report['total_ms']} ms en {report['modules']} módulos")
+    _print_table("Más tiempo acumulado:", report["top_cumulative"], "cumulative_ms")
+    _print_table("Más tiempo propio:", report["top_self"], "self_ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
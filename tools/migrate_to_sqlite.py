@@ -0,0 +1,154 @@
+# sam-gameapi/tools/migrate_to_sqlite.py
+"""
+Importa los datos JSON existentes (data/) a la base SQLite del backend `sqlite`.
+
+  - party.json              → tabla party_members
+  - */history/seg-*.jsonl   → tabla history (el index.json no se copia)
+  - usage.json              → tabla usage
+  - events/*.jsonl[.gz] y el antiguo event_log.json → tabla events
+  - el resto de *.json      → tabla documents
+
+Todo se importa en una sola transacción. Si la base ya tiene datos se aborta,
+salvo con --replace (vacía las tablas antes de importar).
+
+Uso:  python -m tools.migrate_to_sqlite [--data data] [--db data/sam.db] [--replace]
+Después: STORAGE_BACKEND=sqlite (y SQLITE_PATH si no es data/sam.db).
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+from utils import storage
+from utils.sqlite_backend import SQLiteBackend
+from utils.usage_tracker import _to_rows, normalize
+
+TABLES = ("documents", "party_members", "history", "usage", "events")
+
+
+def _load_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return None
+
+
+def _usage_rows(data: dict) -> list[tuple]:
+    """usage.json (cualquier formato histórico) → filas de la tabla usage."""
+    months = {month: month_data for month, month_data in normalize(data).items() if isinstance(month_data, dict)}
+    return _to_rows(months)
+
+
+def scan(data_dir: str) -> dict:
+    """Clasifica los archivos de data/ según la tabla a la que van."""
+    found = {"documents": {}, "parties": {}, "history": {}, "usage": None, "events": []}
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        rel_root = os.path.relpath(root, data_dir)
+        rel_root = "" if rel_root == "." else rel_root.replace(os.sep, "/") + "/"
+
+        segments = sorted(f for f in files if f.startswith("seg-") and f.endswith(".jsonl"))
+        if segments:
+            found["history"][rel_root.rstrip("/")] = [os.path.join(root, f) for f in segments]
+
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            rel = rel_root + name
+            if name.startswith("events-") or (rel_root == "events/" and name.endswith(".jsonl")):
+                found["events"].append(path)
+            elif not name.endswith(".json") or name == "index.json":
+                continue
+            elif rel == "usage.json":
+                found["usage"] = _load_json(path) or {}
+            elif rel == "event_log.json":
+                found["events"].append(path)
+            elif name == "party.json":
+                found["parties"][rel] = (_load_json(path) or {}).get("players", [])
+            else:
+                data = _load_json(path)
+                if isinstance(data, dict):
+                    found["documents"][rel] = data
+    return found
+
+
+def _read_jsonl(path: str) -> list[dict]:
+    opener = gzip.open if path.endswith(".gz") else open
+    entries = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def _read_events(path: str) -> list[dict]:
+    if path.endswith(".json"):
+        return (_load_json(path) or {}).get("events", [])
+    return _read_jsonl(path)
+
+
+def migrate(data_dir: str, db_path: str, replace: bool = False) -> dict:
+    backend = SQLiteBackend(db_path)
+    found = scan(data_dir)
+    counts = {table: 0 for table in TABLES}
+    try:
+        with backend.transaction() as conn:
+            existing = sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in TABLES)
+            if existing and not replace:
+                raise SystemExit(f"{db_path} ya contiene datos; usa --replace para sobrescribirlos.")
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+
+            backend.save_many(found["documents"])
+            counts["documents"] = len(found["documents"])
+
+            for party, players in found["parties"].items():
+                for player in players:
+                    if backend.party_add(party, player) is not None:
+                        counts["party_members"] += 1
+
+            for log, paths in found["history"].items():
+                entries = [e for path in paths for e in _read_jsonl(path)]
+                if entries:
+                    backend.history_extend(log, entries)
+                    counts["history"] += len(entries)
+
+            if found["usage"]:
+                rows = _usage_rows(found["usage"])
+                backend.add_usage(rows)
+                counts["usage"] = len(rows)
+
+            events = [e for path in found["events"] for e in _read_events(path)]
+            events.sort(key=lambda e: e.get("timestamp", ""))
+            backend.add_events(events)
+            counts["events"] = len(events)
+    finally:
+        backend.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=storage.BASE_PATH, help="carpeta de datos JSON")
+    parser.add_argument("--db", default=None, help="base SQLite de destino (por defecto <data>/sam.db)")
+    parser.add_argument("--replace", action="store_true", help="vaciar la base antes de importar")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data):
+        sys.exit(f"No existe la carpeta de datos: {args.data}")
+    db_path = args.db or os.path.join(args.data, storage.SQLITE_PATH)
+    counts = migrate(args.data, db_path, args.replace)
+    print(f"Migrado a {db_path}:")
+    for table, count in counts.items():
+        print(f"  {table:<14} {count}")
+
+
+if __name__ == "__main__":
+    main()
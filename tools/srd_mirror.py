@@ -0,0 +1,63 @@
+# sam-gameapi/tools/srd_mirror.py
+"""
+Descarga del SRDService una copia local de hechizos, monstruos y encuentros para
+SRD_MIRROR_PATH. Con la copia cargada al arrancar, las consultas durante la narración
+no esperan al servicio remoto (que en Render se duerme si está inactivo).
+
+Genera <salida>/<kind>.json con el formato {índice: documento}.
+
+Uso:  python -m tools.srd_mirror [--url URL] [--out data/srd] [--kind spells ...] [--batch-path /{kind}/batch]
+Después: SRD_MIRROR_PATH=data/srd
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+
+from core.srd_client import KINDS, SRD_BATCH_PATH, SRD_SERVICE_URL, SRDClient, valid_index
+
+CHUNK = 50   # índices por lote
+
+
+async def download(url: str, out: str, kinds: list[str], batch_path: str) -> dict[str, int]:
+    client = SRDClient(base_url=url, mirror_path=None, batch_path=batch_path)
+    counts = {}
+    try:
+        for kind in kinds:
+            indexes = [index for index in await client.list_indexes(kind) if valid_index(index)]
+            docs = {}
+            for start in range(0, len(indexes), CHUNK):
+                docs.update(await client.get_many(kind, indexes[start:start + CHUNK]))
+            docs = {index: doc for index, doc in docs.items() if doc is not None}
+            _write_atomic(os.path.join(out, f"{kind}.json"), docs)
+            counts[kind] = len(docs)
+    finally:
+        await client.aclose()
+    return counts
+
+
+def _write_atomic(path: str, data: dict) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=SRD_SERVICE_URL, help="URL base del SRDService")
+    parser.add_argument("--out", default=os.path.join("data", "srd"), help="carpeta de la copia local")
+    parser.add_argument("--kind", action="append", choices=KINDS, help="tipos a descargar (por defecto, todos)")
+    parser.add_argument("--batch-path", default=SRD_BATCH_PATH, help="ruta de lotes del servicio, si la tiene")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    counts = asyncio.run(download(args.url, args.out, args.kind or list(KINDS), args.batch_path))
+    print(f"Copia local en {args.out}:")
+    for kind, count in counts.items():
+        print(f"  {kind:<11} {count}")
+
+
+if __name__ == "__main__":
+    main()
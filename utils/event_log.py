@@ -0,0 +1,362 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List
+
+from utils import storage
+
+# Log de eventos acotado: ring buffer en memoria con los más recientes y
+# segmentos JSONL en disco que rotan por tamaño o antigüedad.
+# La escritura, la compresión al rotar y la poda van en un hilo propio
+# (como el volcado diferido de storage) para no bloquear el event loop.
+# Con varios workers (storage.SHARED) las escrituras y rotaciones se serializan
+# con storage.exclusive y las consultas leen de disco: el ring de cada proceso
+# solo ve sus propios eventos.
+EVENT_LOG_DIR = "events"
+EVENT_LOG_RING = int(os.getenv("EVENT_LOG_RING", "500"))
+EVENT_LOG_MAX_BYTES = int(os.getenv("EVENT_LOG_MAX_BYTES", str(1024 * 1024)))
+EVENT_LOG_MAX_AGE = float(os.getenv("EVENT_LOG_MAX_AGE", "86400"))       # segundos
+EVENT_LOG_KEEP = int(os.getenv("EVENT_LOG_KEEP", "30"))                  # segmentos rotados
+EVENT_LOG_COMPRESS = os.getenv("EVENT_LOG_COMPRESS", "1") != "0"
+
+ACTIVE_FILE = "current.jsonl"
+LEGACY_FILE = "event_log.json"
+
+
+class _Writer:
+    """Hilo que escribe los eventos encolados, en lotes, fuera del hilo que los genera."""
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], None], name: str):
+        self._write = write
+        self._name = name
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self.errors = 0
+
+    def put(self, event: Dict[str, Any]) -> None:
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+        self._queue.put(event)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                self.errors += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Espera a que todo lo encolado esté escrito."""
+        self._queue.join()
+
+
+class EventLog:
+    """
+    Registro append-only de eventos generados.
+    Los segmentos rotados se nombran con su primer y último timestamp
+    (`events-<desde>--<hasta>.jsonl[.gz]`) para poder saltarlos en las consultas por rango.
+    """
+
+    def __init__(self, directory: str = EVENT_LOG_DIR, ring_size: int = EVENT_LOG_RING,
+                 max_bytes: int = EVENT_LOG_MAX_BYTES, max_age: float = EVENT_LOG_MAX_AGE,
+                 keep: int = EVENT_LOG_KEEP, compress: bool = EVENT_LOG_COMPRESS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep = keep
+        self.compress = compress
+        self._lock = threading.Lock()
+        self._ring: deque = deque(maxlen=ring_size)
+        self._active_name = f"{directory}/{ACTIVE_FILE}"
+        self._active_path = storage.get_path(self._active_name)
+        self._active_first: str | None = None
+        self._active_last: str | None = None
+        self._active_opened = time.time()
+        self._writer = _Writer(self._write, "event-log-writer")
+        self._load_active()
+        self._migrate_legacy()
+
+    # ============================================================
+    # 📂 ARRANQUE
+    # ============================================================
+    def _load_active(self) -> None:
+        """Recupera el segmento activo tras un reinicio y llena el ring buffer."""
+        if not os.path.exists(self._active_path):
+            return
+        self._active_opened = os.path.getmtime(self._active_path)
+        for event in self._read_file(self._active_path):
+            if self._active_first is None:
+                self._active_first = event.get("timestamp")
+            self._active_last = event.get("timestamp")
+            self._ring.append(event)
+
+    def _migrate_legacy(self) -> None:
+        """Importa una vez el antiguo event_log.json (lista completa) al log rotado."""
+        def store(events: List[Dict[str, Any]]) -> None:
+            # En el propio hilo (es el arranque): el archivo viejo solo se renombra ya escrito
+            self._ring.extend(events)
+            self._write(events)
+
+        _migrate_legacy(store)
+
+    # ============================================================
+    # ✍️ ESCRITURA Y ROTACIÓN
+    # ============================================================
+    def append(self, event: Dict[str, Any]) -> None:
+        """Entra ya en el ring buffer; el disco lo escribe el hilo del log."""
+        with self._lock:
+            self._ring.append(event)
+        self._writer.put(event)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def _write(self, events: List[Dict[str, Any]]) -> None:
+        with storage.exclusive([self._active_name]):
+            if storage.SHARED:
+                self._refresh_active()
+            for event in events:
+                line = json.dumps(event, ensure_ascii=False) + "\n"
+                if self._should_rotate(len(line)):
+                    self._rotate()
+                with open(self._active_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                if self._active_first is None:
+                    self._active_first = event.get("timestamp")
+                    self._active_opened = time.time()
+                self._active_last = event.get("timestamp")
+
+    def _refresh_active(self) -> None:
+        """Otro worker pudo rotar el segmento activo o empezar uno nuevo: releer su primer evento."""
+        first = next(self._read_file(self._active_path), None)
+        first_timestamp = first.get("timestamp") if first else None
+        if first_timestamp != self._active_first:
+            self._active_first = first_timestamp
+            self._active_opened = _epoch(first_timestamp) if first_timestamp else time.time()
+
+    def _should_rotate(self, incoming: int) -> bool:
+        if not os.path.exists(self._active_path):
+            return False
+        size = os.path.getsize(self._active_path)
+        if size and size + incoming > self.max_bytes:
+            return True
+        return size > 0 and time.time() - self._active_opened > self.max_age
+
+    def _rotate(self) -> None:
+        """Cierra el segmento activo, lo comprime si procede y poda los más viejos."""
+        if storage.SHARED:
+            last_event = None
+            for last_event in self._read_file(self._active_path):
+                pass
+            last = last_event.get("timestamp") if last_event else None
+        else:
+            last = self._active_last
+        first = _stamp(self._active_first or last)
+        name = f"events-{first}--{_stamp(last)}.jsonl"
+        target = storage.get_path(f"{self.directory}/{name}")
+
+        if self.compress:
+            # Se comprime en un temporal oculto: otro worker puede estar leyendo los segmentos
+            tmp_path = os.path.join(os.path.dirname(target), f".{name}.gz.tmp")
+            with open(self._active_path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                dst.writelines(src)
+            os.replace(tmp_path, target + ".gz")
+            os.remove(self._active_path)
+        else:
+            os.replace(self._active_path, target)
+
+        self._active_first = None
+        self._active_last = None
+        self._active_opened = time.time()
+
+        if self.keep:
+            for old in self._segments()[:-self.keep]:
+                os.remove(old)
+
+    def _segments(self) -> List[str]:
+        """Segmentos rotados, del más antiguo al más reciente."""
+        folder = os.path.dirname(self._active_path)
+        names = sorted(n for n in os.listdir(folder) if n.startswith("events-"))
+        return [os.path.join(folder, n) for n in names]
+
+    # ============================================================
+    # 🔎 CONSULTAS
+    # ============================================================
+    def query(self, event_type: str | None = None, since: str | None = None, until: str | None = None,
+              session_id: str | None = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Devuelve los eventos más recientes que cumplen los filtros (del más nuevo al más viejo).
+        Se sirve desde el ring buffer si basta; si no, recorre los segmentos desde el final
+        saltando los que quedan fuera del rango de tiempo.
+        """
+        def matches(event: Dict[str, Any]) -> bool:
+            ts = event.get("timestamp", "")
+            return ((event_type is None or event.get("type") == event_type)
+                    and (session_id is None or event.get("session_id") == session_id)
+                    and (since is None or ts >= since)
+                    and (until is None or ts <= until))
+
+        if not storage.SHARED:
+            with self._lock:
+                ring = list(self._ring)
+                ring_complete = len(ring) < (self._ring.maxlen or 0) and not self._segments()
+
+            results = [e for e in reversed(ring) if matches(e)][:limit]
+            oldest = ring[0].get("timestamp", "") if ring else None
+            if len(results) >= limit or ring_complete or (since is not None and oldest and oldest <= since):
+                return results
+
+        self.flush()
+        results = []
+        for path in [self._active_path] + list(reversed(self._segments())):
+            if not self._overlaps(path, since, until):
+                continue
+            for event in reversed(list(self._read_file(path))):
+                if matches(event):
+                    results.append(event)
+                    if len(results) >= limit:
+                        return results
+            if since is not None and self._starts_before(path, since):
+                break
+        return results
+
+    @staticmethod
+    def _bounds(path: str) -> tuple[str, str] | None:
+        name = os.path.basename(path)
+        if not name.startswith("events-"):
+            return None
+        stem = name[len("events-"):].split(".jsonl")[0]
+        first, _, last = stem.partition("--")
+        return _unstamp(first), _unstamp(last)
+
+    def _overlaps(self, path: str, since: str | None, until: str | None) -> bool:
+        bounds = self._bounds(path)
+        if bounds is None:
+            return os.path.exists(path)
+        first, last = bounds
+        return (since is None or last >= since) and (until is None or first <= until)
+
+    def _starts_before(self, path: str, since: str) -> bool:
+        bounds = self._bounds(path)
+        return bounds is not None and bounds[0] <= since
+
+    @staticmethod
+    def _read_file(path: str) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def _stamp(timestamp: str | None) -> str:
+    """ISO 8601 → nombre de archivo seguro (sin ':')."""
+    timestamp = timestamp or datetime.utcnow().isoformat()
+    return timestamp.replace(":", "")
+
+
+def _epoch(timestamp: str) -> float:
+    """Timestamp ISO en UTC (sin zona, como los de utcnow) → segundos desde epoch."""
+    try:
+        return datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def _migrate_legacy(store: Callable[[List[Dict[str, Any]]], Any]) -> None:
+    """
+    Pasa los eventos del antiguo event_log.json a `store` y lo renombra a .migrated.
+    Bajo storage.exclusive para que, con varios workers, solo uno lo importe.
+    """
+    with storage.exclusive([LEGACY_FILE]):
+        legacy_path = storage.get_path(LEGACY_FILE)
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                events = json.load(f).get("events", [])
+        except (OSError, json.JSONDecodeError):
+            events = []
+        if events:
+            store(events)
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+
+def _unstamp(stamp: str) -> str:
+    """Inverso de `_stamp` para comparar con timestamps ISO (HHMMSS → HH:MM:SS)."""
+    date, _, time_part = stamp.partition("T")
+    if len(time_part) < 6:
+        return stamp
+    return f"{date}T{time_part[0:2]}:{time_part[2:4]}:{time_part[4:]}"
+
+
+class SQLiteEventLog:
+    """Log de eventos sobre la tabla indexada `events` del backend SQLite."""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._writer = _Writer(backend.add_events, "event-log-writer")
+        self._migrate_legacy()
+
+    def _migrate_legacy(self) -> None:
+        _migrate_legacy(self._backend.add_events)
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Los eventos encolados se insertan en lote, una transacción por lote."""
+        self._writer.put(event)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def query(self, event_type: str | None = None, since: str | None = None, until: str | None = None,
+              session_id: str | None = None, limit: int = 50) -> List[Dict[str, Any]]:
+        self.flush()
+        return self._backend.query_events(event_type, since, until, session_id, limit)
+
+
+_event_log: "EventLog | SQLiteEventLog | None" = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log() -> "EventLog | SQLiteEventLog":
+    """Instancia compartida del log de eventos (se crea en el primer uso)."""
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            backend = storage.get_backend()
+            _event_log = SQLiteEventLog(backend) if backend.rows else EventLog()
+        return _event_log
+
+
+def flush_event_log() -> None:
+    """Espera a que los eventos encolados lleguen a disco (al apagar)."""
+    if _event_log is not None:
+        _event_log.flush()
+
+
+atexit.register(flush_event_log)
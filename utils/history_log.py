@@ -0,0 +1,259 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterator, List
+
+from utils import storage
+
+# Historial de campaña como log append-only en segmentos JSONL.
+# Cada acción añade una línea al segmento activo; un índice pequeño
+# (index.json) guarda cuántas entradas tiene cada segmento.
+# Con varios workers (storage.SHARED) el índice es la referencia común: cada
+# operación adopta el que haya escrito otro proceso y las escrituras se
+# serializan con storage.exclusive sobre el índice.
+SEGMENT_SIZE = int(os.getenv("HISTORY_SEGMENT_SIZE", "500"))
+TAIL_CACHE = int(os.getenv("HISTORY_TAIL_CACHE", "50"))
+
+INDEX_FILE = "index.json"
+
+
+class HistoryLog:
+    """
+    Historial append-only de una partida.
+    Añadir una entrada cuesta O(1) y leer las últimas N solo toca los últimos segmentos.
+    """
+
+    def __init__(self, directory: str = "history", segment_size: int = SEGMENT_SIZE, tail_cache: int = TAIL_CACHE):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=tail_cache)
+        with storage.exclusive([self.index_file]):
+            self._index = self._load_index()
+
+    # ============================================================
+    # 📇 ÍNDICE
+    # ============================================================
+    @property
+    def index_file(self) -> str:
+        return f"{self.directory}/{INDEX_FILE}"
+
+    def documents(self) -> List[str]:
+        """Documentos de storage que usa el historial (para expulsarlos de la caché)."""
+        return [self.index_file]
+
+    def _segment_name(self, number: int) -> str:
+        return f"{self.directory}/seg-{number:06d}.jsonl"
+
+    def _load_index(self) -> Dict[str, Any]:
+        """
+        Carga el índice y lo reconcilia con los segmentos en disco
+        (el índice se vuelca en diferido y puede ir por detrás tras un corte).
+        """
+        index = storage.read_json(self.index_file) or {"segments": [], "total": 0}
+        segments = index.get("segments", [])
+
+        number = segments[-1]["number"] if segments else 1
+        if segments:
+            segments.pop()
+        while os.path.exists(storage.get_path(self._segment_name(number))):
+            start = segments[-1]["start"] + segments[-1]["count"] if segments else 0
+            segments.append({"number": number, "start": start, "count": self._count_lines(number)})
+            number += 1
+
+        index["segments"] = segments
+        index["total"] = segments[-1]["start"] + segments[-1]["count"] if segments else 0
+        index.setdefault("generation", 0)
+        storage.write_json(self.index_file, self._snapshot(index))
+
+        for entry in self._read_tail(index, self._recent.maxlen or 0):
+            self._recent.append(entry)
+        return index
+
+    @staticmethod
+    def _snapshot(index: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia del índice para storage (el original se sigue mutando)."""
+        return {"segments": [dict(s) for s in index["segments"]], "total": index["total"],
+                "generation": index.get("generation", 0)}
+
+    def _sync(self) -> None:
+        """
+        Modo compartido: si otro worker cambió el índice, lo adopta y recarga la caché
+        de las últimas entradas. `generation` cambia en cada reset para distinguir un
+        historial nuevo que casualmente tenga el mismo tamaño. Llamar con self._lock.
+        """
+        if not storage.SHARED:
+            return
+        stored = storage.read_json(self.index_file)
+        if stored and stored != self._snapshot(self._index):
+            self._index = self._snapshot(stored)
+            self._recent.clear()
+            self._recent.extend(self._read_tail(self._index, self._recent.maxlen or 0))
+
+    def _count_lines(self, number: int) -> int:
+        with open(storage.get_path(self._segment_name(number)), "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+
+    def _read_segment(self, number: int) -> List[Dict[str, Any]]:
+        path = storage.get_path(self._segment_name(number))
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return entries
+
+    def _read_tail(self, index: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        """Lee las últimas `n` entradas recorriendo los segmentos desde el final."""
+        if n <= 0:
+            return []
+        collected: List[Dict[str, Any]] = []
+        for segment in reversed(index.get("segments", [])):
+            collected = self._read_segment(segment["number"]) + collected
+            if len(collected) >= n:
+                break
+        return collected[-n:]
+
+    # ============================================================
+    # ✍️ ESCRITURA
+    # ============================================================
+    def append(self, entry: Dict[str, Any]) -> int:
+        """Añade una entrada y devuelve el total de entradas del historial."""
+        return self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> int:
+        """Añade varias entradas de una vez y devuelve el total resultante."""
+        with self._lock, storage.exclusive([self.index_file]):
+            self._sync()
+            segments = self._index["segments"]
+            pending = list(entries)
+            while pending:
+                if not segments or segments[-1]["count"] >= self.segment_size:
+                    number = segments[-1]["number"] + 1 if segments else 1
+                    segments.append({"number": number, "start": self._index["total"], "count": 0})
+                segment = segments[-1]
+                room = self.segment_size - segment["count"]
+                batch, pending = pending[:room], pending[room:]
+
+                with open(storage.get_path(self._segment_name(segment["number"])), "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch))
+
+                segment["count"] += len(batch)
+                self._index["total"] += len(batch)
+                self._recent.extend(batch)
+
+            storage.write_json(self.index_file, self._snapshot(self._index))
+            return self._index["total"]
+
+    def reset(self) -> None:
+        """Borra el historial completo (nueva partida)."""
+        with self._lock, storage.exclusive([self.index_file]):
+            self._sync()
+            for segment in self._index.get("segments", []):
+                path = storage.get_path(self._segment_name(segment["number"]))
+                if os.path.exists(path):
+                    os.remove(path)
+            self._index = {"segments": [], "total": 0, "generation": self._index.get("generation", 0) + 1}
+            self._recent.clear()
+            storage.write_json(self.index_file, self._snapshot(self._index))
+
+    # ============================================================
+    # 📖 LECTURA
+    # ============================================================
+    def count(self) -> int:
+        if storage.SHARED:
+            with self._lock:
+                self._sync()
+        return self._index["total"]
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        """Devuelve las últimas `n` entradas, desde memoria si caben en la caché."""
+        if n <= 0:
+            return []
+        with self._lock:
+            self._sync()
+            if n <= len(self._recent) or len(self._recent) == self._index["total"]:
+                return list(self._recent)[-n:]
+            index = {"segments": [dict(s) for s in self._index["segments"]]}
+        return self._read_tail(index, n)
+
+    def read_range(self, start: int, end: int | None = None) -> List[Dict[str, Any]]:
+        """Entradas con posición en [start, end), leyendo solo los segmentos que las contienen."""
+        with self._lock:
+            self._sync()
+            total = self._index["total"]
+            segments = [dict(s) for s in self._index["segments"]]
+        end = total if end is None else min(end, total)
+        if start >= end:
+            return []
+        if end - start <= len(self._recent) and end == total:
+            return list(self._recent)[len(self._recent) - (end - start):]
+
+        entries: List[Dict[str, Any]] = []
+        for segment in segments:
+            seg_start, seg_end = segment["start"], segment["start"] + segment["count"]
+            if seg_end <= start or seg_start >= end:
+                continue
+            rows = self._read_segment(segment["number"])
+            entries.extend(rows[max(start - seg_start, 0):end - seg_start])
+        return entries
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Recorre el historial completo, segmento a segmento."""
+        with self._lock:
+            self._sync()
+        for segment in list(self._index.get("segments", [])):
+            yield from self._read_segment(segment["number"])
+
+
+class SQLiteHistoryLog:
+    """
+    Mismo historial sobre la tabla `history` del backend SQLite.
+    `tail` y `read_range` son consultas por la clave primaria (log, position).
+    """
+
+    def __init__(self, directory: str, backend):
+        self.directory = directory
+        self._backend = backend
+
+    def documents(self) -> List[str]:
+        return []
+
+    def append(self, entry: Dict[str, Any]) -> int:
+        return self.extend([entry])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> int:
+        return self._backend.history_extend(self.directory, list(entries))
+
+    def reset(self) -> None:
+        self._backend.history_reset(self.directory)
+
+    def count(self) -> int:
+        return self._backend.history_count(self.directory)
+
+    def tail(self, n: int) -> List[Dict[str, Any]]:
+        if n <= 0:
+            return []
+        return self._backend.history_tail(self.directory, n)
+
+    def read_range(self, start: int, end: int | None = None) -> List[Dict[str, Any]]:
+        return self._backend.history_range(self.directory, start, end)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._backend.history_range(self.directory, 0))
+
+
+def open_history_log(directory: str) -> "HistoryLog | SQLiteHistoryLog":
+    """Historial de una partida sobre el backend de storage configurado."""
+    backend = storage.get_backend()
+    if backend.rows:
+        return SQLiteHistoryLog(directory, backend)
+    return HistoryLog(directory)
@@ -0,0 +1,299 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from utils.storage_backend import LockBusyError, StorageBackend
+
+# Backend SQLite en modo WAL: los documentos se guardan como filas y, además,
+# party, historial, uso y eventos viven en tablas indexadas para no reescribir
+# documentos enteros en cada cambio. Una conexión por hilo; las escrituras
+# van siempre dentro de una transacción (BEGIN IMMEDIATE).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS party_members (
+    party TEXT NOT NULL,
+    player TEXT NOT NULL,
+    joined_at REAL NOT NULL,
+    PRIMARY KEY (party, player)
+);
+CREATE INDEX IF NOT EXISTS party_members_order ON party_members (party, joined_at);
+CREATE TABLE IF NOT EXISTS history (
+    log TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (log, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS usage (
+    month TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, kind, name)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    type TEXT,
+    session_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (timestamp);
+CREATE INDEX IF NOT EXISTS events_type_time ON events (type, timestamp);
+CREATE INDEX IF NOT EXISTS events_session_time ON events (session_id, timestamp);
+"""
+
+UsageRow = Tuple[str, str, str, int, int, int, int]   # month, kind, name, prompt, completion, tokens, calls
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    rows = True
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    # ============================================================
+    # 🔌 CONEXIONES Y TRANSACCIONES
+    # ============================================================
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self, blocking: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Transacción de escritura; todo lo hecho dentro se confirma o se descarta junto.
+        Las transacciones anidadas en el mismo hilo se integran en la exterior.
+        Con `blocking=False` no espera a otro escritor: lanza LockBusyError.
+        """
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        if blocking:
+            conn.execute("BEGIN IMMEDIATE")
+        else:
+            conn.execute("PRAGMA busy_timeout = 0")
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                raise LockBusyError(self.path) from None
+            finally:
+                conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    @contextmanager
+    def locked(self, filenames: List[str], blocking: bool = True) -> Iterator[None]:
+        # BEGIN IMMEDIATE toma el bloqueo de escritura de toda la base, también entre procesos
+        with self.transaction(blocking):
+            yield
+
+    def _migrate(self) -> None:
+        """Añade las columnas que no existían en bases creadas por versiones anteriores."""
+        with self.transaction() as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+            if "version" not in columns:
+                conn.execute("ALTER TABLE documents ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        return self._connection().execute(sql, tuple(params)).fetchall()
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {
+            table: self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+            for table in ("documents", "party_members", "history", "usage", "events")
+        }
+        return {"backend": self.name, "path": self.path, "rows": counts}
+
+    # ============================================================
+    # 📄 DOCUMENTOS
+    # ============================================================
+    def load(self, filename: str) -> Dict[str, Any] | None:
+        rows = self._query("SELECT data FROM documents WHERE name = ?", (filename,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def version(self, filename: str) -> int | None:
+        rows = self._query("SELECT version FROM documents WHERE name = ?", (filename,))
+        return rows[0][0] if rows else None
+
+    def load_versioned(self, filename: str) -> Tuple[Dict[str, Any] | None, int | None]:
+        rows = self._query("SELECT data, version FROM documents WHERE name = ?", (filename,))
+        return (json.loads(rows[0][0]), rows[0][1]) if rows else (None, None)
+
+    def recent(self, pattern: str, limit: int) -> List[str]:
+        rows = self._query(
+            "SELECT name FROM documents WHERE name GLOB ? ORDER BY updated_at DESC LIMIT ?", (pattern, limit),
+        )
+        return [r[0] for r in rows]
+
+    def save_many(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO documents (name, data, updated_at, version) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+                "version = documents.version + 1",
+                [(name, json.dumps(data, ensure_ascii=False), now) for name, data in documents.items()],
+            )
+
+    # ============================================================
+    # 🧙 PARTY
+    # ============================================================
+    def party_members(self, party: str) -> List[str]:
+        rows = self._query("SELECT player FROM party_members WHERE party = ? ORDER BY joined_at", (party,))
+        return [r[0] for r in rows]
+
+    def party_add(self, party: str, player: str) -> List[str] | None:
+        """Añade al jugador y devuelve el grupo; None si ya estaba."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO party_members (party, player, joined_at) VALUES (?, ?, ?)",
+                (party, player, time.time()),
+            )
+            return self.party_members(party) if cursor.rowcount else None
+
+    def party_remove(self, party: str, player: str) -> List[str] | None:
+        """Quita al jugador y devuelve el grupo; None si no estaba."""
+        with self.transaction() as conn:
+            cursor = conn.execute("DELETE FROM party_members WHERE party = ? AND player = ?", (party, player))
+            return self.party_members(party) if cursor.rowcount else None
+
+    def party_clear(self, party: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM party_members WHERE party = ?", (party,))
+
+    # ============================================================
+    # 📜 HISTORIAL
+    # ============================================================
+    def history_count(self, log: str) -> int:
+        return self._query("SELECT COALESCE(MAX(position) + 1, 0) FROM history WHERE log = ?", (log,))[0][0]
+
+    def history_extend(self, log: str, entries: List[Dict[str, Any]]) -> int:
+        """Añade entradas al final del historial y devuelve el total resultante."""
+        with self.transaction() as conn:
+            start = conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM history WHERE log = ?", (log,),
+            ).fetchone()[0]
+            conn.executemany(
+                "INSERT INTO history (log, position, entry) VALUES (?, ?, ?)",
+                [(log, start + i, json.dumps(e, ensure_ascii=False)) for i, e in enumerate(entries)],
+            )
+            return start + len(entries)
+
+    def history_tail(self, log: str, n: int) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "SELECT entry FROM history WHERE log = ? ORDER BY position DESC LIMIT ?", (log, n),
+        )
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def history_range(self, log: str, start: int, end: int | None = None) -> List[Dict[str, Any]]:
+        if end is None:
+            rows = self._query(
+                "SELECT entry FROM history WHERE log = ? AND position >= ? ORDER BY position", (log, start),
+            )
+        else:
+            rows = self._query(
+                "SELECT entry FROM history WHERE log = ? AND position >= ? AND position < ? ORDER BY position",
+                (log, start, end),
+            )
+        return [json.loads(r[0]) for r in rows]
+
+    def history_reset(self, log: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM history WHERE log = ?", (log,))
+
+    # ============================================================
+    # 📊 USO DE TOKENS
+    # ============================================================
+    def add_usage(self, rows: List[UsageRow]) -> None:
+        """Suma los deltas a los contadores (upsert, sin leer el documento completo)."""
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO usage (month, kind, name, prompt_tokens, completion_tokens, tokens, calls) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(month, kind, name) DO UPDATE SET "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "tokens = tokens + excluded.tokens, calls = calls + excluded.calls",
+                rows,
+            )
+
+    def usage_rows(self) -> List[UsageRow]:
+        return [tuple(r) for r in self._query(
+            "SELECT month, kind, name, prompt_tokens, completion_tokens, tokens, calls FROM usage "
+            "ORDER BY month, kind, name",
+        )]
+
+    # ============================================================
+    # 🎲 EVENTOS
+    # ============================================================
+    def add_events(self, events: List[Dict[str, Any]]) -> None:
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO events (timestamp, type, session_id, data) VALUES (?, ?, ?, ?)",
+                [(e.get("timestamp", ""), e.get("type"), e.get("session_id"), json.dumps(e, ensure_ascii=False))
+                 for e in events],
+            )
+
+    def query_events(self, event_type: str | None = None, since: str | None = None, until: str | None = None,
+                     session_id: str | None = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Eventos más recientes que cumplen los filtros (del más nuevo al más viejo)."""
+        clauses, params = [], []
+        for column, op, value in (("type", "=", event_type), ("session_id", "=", session_id),
+                                  ("timestamp", ">=", since), ("timestamp", "<=", until)):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._query(
+            f"SELECT data FROM events {where} ORDER BY timestamp DESC, id DESC LIMIT ?", [*params, limit],
+        )
+        return [json.loads(r[0]) for r in rows]
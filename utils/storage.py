@@ -1,28 +1,317 @@
-import json
+import asyncio
+import atexit
+import copy
 import os
-from typing import Any, Dict
+import threading
+import time
+from contextlib import ExitStack, asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, TypeVar
 
-BASE_PATH = os.path.join(os.path.dirname(__file__), "..", "data")
+from utils.storage_backend import JsonFileBackend, LockBusyError, StorageBackend
+from utils.tracing import span
+
+T = TypeVar("T")
+
+BASE_PATH = os.getenv("DATA_PATH", os.path.join(os.path.dirname(__file__), "..", "data"))
+
+# Caché en memoria con escritura diferida (write-behind).
+# Los documentos se sirven desde memoria y las escrituras se agrupan
+# y vuelcan a disco cada FLUSH_INTERVAL segundos o al apagar el servicio.
+FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "2.0"))
+WRITE_BEHIND = os.getenv("STORAGE_WRITE_BEHIND", "1") != "0"
+# `json` (un archivo por documento) o `sqlite` (WAL, con tablas indexadas)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "sam.db")   # relativo a BASE_PATH
+
+# Modo compartido para varios workers (uvicorn --workers N) sobre los mismos datos:
+# sin escritura diferida, cada lectura valida la copia en caché contra la versión
+# guardada y las lecturas-modificación-escritura se serializan entre procesos
+# (flock en JSON, transacción en SQLite). Por defecto se activa si WEB_CONCURRENCY > 1.
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+SHARED = os.getenv("STORAGE_SHARED", "1" if WORKERS > 1 else "0") != "0"
+if SHARED:
+    WRITE_BEHIND = False
+# Espera entre intentos de `exclusive_async` (segundos, crece hasta el máximo)
+EXCLUSIVE_POLL_MIN = 0.002
+EXCLUSIVE_POLL_MAX = 0.05
+
+_lock = threading.RLock()
+_flush_lock = threading.Lock()
+_cache: Dict[str, Any] = {}
+_versions: Dict[str, Any] = {}
+_dirty: set[str] = set()
+_doc_locks: Dict[str, threading.RLock] = {}
+_flush_hooks: list[Callable[[], Any]] = []
+_stop = threading.Event()
+_flusher: threading.Thread | None = None
+_backend: StorageBackend | None = None
+_stats = {
+    "reads": 0,
+    "cache_hits": 0,
+    "stale_reads": 0,
+    "lock_waits": 0,
+    "disk_reads": 0,
+    "writes": 0,
+    "disk_writes": 0,
+    "flushes": 0,
+    "flush_errors": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "total_flush_ms": 0.0,
+}
 
 def _ensure_data_folder():
     if not os.path.exists(BASE_PATH):
-        os.makedirs(BASE_PATH)
+        os.makedirs(BASE_PATH, exist_ok=True)
 
 def _get_path(filename: str) -> str:
     _ensure_data_folder()
-    return os.path.join(BASE_PATH, filename)
+    path = os.path.join(BASE_PATH, filename)
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    return path
 
-def read_json(filename: str) -> Dict[str, Any]:
-    path = _get_path(filename)
-    if not os.path.exists(path):
+def get_path(filename: str) -> str:
+    """Ruta absoluta de un archivo dentro de data/ (crea subcarpetas si hace falta)."""
+    return _get_path(filename)
+
+def get_backend() -> StorageBackend:
+    """Backend de persistencia configurado en STORAGE_BACKEND (se crea en el primer uso)."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            if STORAGE_BACKEND == "sqlite":
+                from utils.sqlite_backend import SQLiteBackend
+                _backend = SQLiteBackend(_get_path(SQLITE_PATH))
+            elif STORAGE_BACKEND == "json":
+                _backend = JsonFileBackend(_get_path, BASE_PATH)
+            else:
+                raise ValueError(f"STORAGE_BACKEND desconocido: {STORAGE_BACKEND!r}")
+        return _backend
+
+def recent(pattern: str, limit: int) -> list[str]:
+    """Documentos guardados que cumplen el patrón glob, del escrito más recientemente al más viejo."""
+    return get_backend().recent(pattern, limit)
+
+def _load(filename: str) -> Dict[str, Any]:
+    data = get_backend().load(filename)
+    if data is None:
         return {}
-    with open(path, "r", encoding="utf-8") as f:
+    _stats["disk_reads"] += 1
+    return data
+
+def _persist(documents: Dict[str, Dict[str, Any]]) -> None:
+    """Guarda un lote de documentos en el backend (una transacción en SQLite)."""
+    get_backend().save_many(documents)
+    _stats["disk_writes"] += len(documents)
+
+def exclusive(filenames: list[str]) -> ContextManager:
+    """
+    Bloqueo entre procesos sobre esos documentos (modo compartido); sin efecto con un solo worker.
+    Se toma en el hilo actual: el bloque no debe contener awaits.
+    """
+    if not SHARED:
+        return nullcontext()
+    return get_backend().locked(filenames)
+
+@asynccontextmanager
+async def exclusive_async(filenames: list[str]) -> AsyncIterator[None]:
+    """
+    `exclusive` para el event loop: si otro worker tiene el bloqueo no se espera en
+    flock/BEGIN IMMEDIATE (congelaría el loop, /health incluido), sino que se reintenta
+    sin bloquear tras un asyncio.sleep. El bloque tampoco debe contener awaits.
+    """
+    if not SHARED:
+        yield
+        return
+    backend = get_backend()
+    delay = EXCLUSIVE_POLL_MIN
+    while True:
+        stack = ExitStack()
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+            stack.enter_context(backend.locked(filenames, blocking=False))
+        except LockBusyError:
+            _stats["lock_waits"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EXCLUSIVE_POLL_MAX)
+            continue
+        break
+    with stack:
+        yield
+
+def _write_through(documents: Dict[str, Dict[str, Any]]) -> None:
+    """Modo compartido: escribe ya y anota la versión resultante de cada documento."""
+    backend = get_backend()
+    with exclusive(list(documents)):
+        _persist(documents)
+        versions = {name: backend.version(name) for name in documents}
+    with _lock:
+        _cache.update(documents)
+        _versions.update(versions)
+
+def read_json(filename: str) -> Dict[str, Any]:
+    with span("storage_read"):
+        return _read_json(filename)
+
+def _read_json(filename: str) -> Dict[str, Any]:
+    if SHARED:
+        return _read_shared(filename)
+    with _lock:
+        _stats["reads"] += 1
+        if filename in _cache:
+            _stats["cache_hits"] += 1
+            return copy.deepcopy(_cache[filename])
+
+    data = _load(filename)
+    with _lock:
+        # Otro hilo pudo escribir mientras leíamos del disco: su versión manda.
+        data = _cache.setdefault(filename, data)
+        return copy.deepcopy(data)
+
+def _read_shared(filename: str) -> Dict[str, Any]:
+    """La copia en caché solo vale si ningún otro worker cambió el documento desde que se cargó."""
+    backend = get_backend()
+    version = backend.version(filename)
+    with _lock:
+        _stats["reads"] += 1
+        if filename in _cache and _versions.get(filename) == version:
+            _stats["cache_hits"] += 1
+            return copy.deepcopy(_cache[filename])
+        if filename in _cache:
+            _stats["stale_reads"] += 1
+
+    data, version = backend.load_versioned(filename)
+    if data is None:
+        data = {}
+    else:
+        _stats["disk_reads"] += 1
+    with _lock:
+        _cache[filename] = data
+        _versions[filename] = version
+        return copy.deepcopy(data)
 
 def write_json(filename: str, data: Dict[str, Any]) -> None:
-    path = _get_path(filename)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # Copia propia: si el llamador sigue mutando su dict no altera la caché ni el volcado pendiente.
+    data = copy.deepcopy(data)
+    with span("storage_write"), _doc_lock(filename):
+        if SHARED:
+            _stats["writes"] += 1
+            _write_through({filename: data})
+            return
+        with _lock:
+            _stats["writes"] += 1
+            _cache[filename] = data
+            if WRITE_BEHIND:
+                _dirty.add(filename)
+                return
+        _persist({filename: data})
+
+def _doc_lock(filename: str) -> threading.RLock:
+    with _lock:
+        lock = _doc_locks.get(filename)
+        if lock is None:
+            lock = _doc_locks[filename] = threading.RLock()
+        return lock
+
+def update_json(filename: str, mutate: Callable[[Dict[str, Any]], T]) -> T:
+    """
+    Lectura-modificación-escritura atómica de un documento (también entre workers).
+    `mutate` recibe una copia del documento, la modifica en sitio y su valor
+    de retorno se devuelve al llamador. Si lanza una excepción no se escribe nada.
+    """
+    with span("storage_update"), _doc_lock(filename), exclusive([filename]):
+        data = read_json(filename)
+        result = mutate(data)
+        write_json(filename, data)
+        return result
+
+# ================================================================
+# 💾 VOLCADO A DISCO
+# ================================================================
+def register_flush_hook(hook: Callable[[], Any]) -> None:
+    """Registra una función que se llama antes de cada volcado (p. ej. para fusionar contadores)."""
+    _flush_hooks.append(hook)
+
+def flush() -> int:
+    """Vuelca a disco los documentos modificados. Devuelve cuántos se escribieron."""
+    for hook in _flush_hooks:
+        try:
+            hook()
+        except Exception:
+            _stats["flush_errors"] += 1
+
+    with span("storage_flush"), _flush_lock:
+        with _lock:
+            pending = {name: _cache[name] for name in _dirty}
+            _dirty.clear()
+        if not pending:
+            return 0
+
+        start = time.perf_counter()
+        written = 0
+        try:
+            _persist(pending)
+            written = len(pending)
+        except Exception:
+            _stats["flush_errors"] += 1
+            with _lock:
+                _dirty.update(pending)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _stats["flushes"] += 1
+        _stats["last_flush_ms"] = round(elapsed_ms, 3)
+        _stats["max_flush_ms"] = round(max(_stats["max_flush_ms"], elapsed_ms), 3)
+        _stats["total_flush_ms"] = round(_stats["total_flush_ms"] + elapsed_ms, 3)
+        return written
+
+def evict(filenames: list[str]) -> None:
+    """Vuelca y libera de la caché los documentos indicados."""
+    with _flush_lock:
+        with _lock:
+            pending = {name: _cache[name] for name in filenames if name in _dirty}
+            _dirty.difference_update(pending)
+        if pending:
+            _persist(pending)
+        with _lock:
+            for name in filenames:
+                if name not in _dirty:
+                    _cache.pop(name, None)
+                    _versions.pop(name, None)
+
+def _flush_loop():
+    while not _stop.wait(FLUSH_INTERVAL):
+        flush()
+
+def start_flusher() -> None:
+    """Arranca el hilo que vuelca los documentos pendientes (y los hooks, p. ej. el uso) periódicamente."""
+    global _flusher
+    if not (WRITE_BEHIND or _flush_hooks) or (_flusher and _flusher.is_alive()):
+        return
+    _stop.clear()
+    _flusher = threading.Thread(target=_flush_loop, name="storage-flusher", daemon=True)
+    _flusher.start()
+
+def stop_flusher() -> None:
+    """Detiene el hilo de volcado y escribe lo que quede pendiente."""
+    global _flusher
+    _stop.set()
+    if _flusher:
+        _flusher.join(timeout=FLUSH_INTERVAL + 5)
+        _flusher = None
+    flush()
+
+def get_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "backend": STORAGE_BACKEND,
+            "shared": SHARED,
+            "workers": WORKERS,
+            "write_behind": WRITE_BEHIND,
+            "flush_interval": FLUSH_INTERVAL,
+            "cached_documents": len(_cache),
+            "dirty_documents": len(_dirty),
+        }
+
+atexit.register(flush)
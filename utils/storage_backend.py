@@ -0,0 +1,165 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:   # Windows: sin flock; solo es seguro con un proceso
+    fcntl = None
+
+# Backends de persistencia para utils/storage.
+# storage mantiene la caché y la escritura diferida; el backend solo sabe
+# cargar un documento y guardar un lote de documentos.
+
+
+class LockBusyError(RuntimeError):
+    """`locked(..., blocking=False)`: otro proceso tiene el bloqueo."""
+
+
+class StorageBackend:
+    """
+    Interfaz de persistencia de documentos JSON identificados por nombre
+    (p. ej. `sessions/abc/party.json`).
+    `rows` indica si el backend ofrece además tablas indexadas para party,
+    historial, uso y eventos (ver utils/sqlite_backend.py).
+    """
+
+    name = "base"
+    rows = False
+
+    def load(self, filename: str) -> Dict[str, Any] | None:
+        """Documento guardado o None si no existe."""
+        raise NotImplementedError
+
+    def save_many(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        """Guarda un lote de documentos (de forma atómica si el backend lo permite)."""
+        raise NotImplementedError
+
+    def save(self, filename: str, data: Dict[str, Any]) -> None:
+        self.save_many({filename: data})
+
+    def version(self, filename: str) -> Any:
+        """Marca que cambia con cada escritura del documento (None si no existe)."""
+        raise NotImplementedError
+
+    def load_versioned(self, filename: str) -> Tuple[Dict[str, Any] | None, Any]:
+        """
+        Documento y su versión. La versión se toma antes que los datos: si otro proceso
+        escribe entre medias, la caché queda con una versión vieja y se recarga en la
+        siguiente lectura (nunca al revés).
+        """
+        version = self.version(filename)
+        return self.load(filename), version
+
+    def recent(self, pattern: str, limit: int) -> List[str]:
+        """Documentos que cumplen el patrón glob (`sessions/*/game_state.json`), del más reciente al más viejo."""
+        raise NotImplementedError
+
+    def locked(self, filenames: List[str], blocking: bool = True) -> ContextManager:
+        """
+        Exclusión entre procesos sobre esos documentos mientras dura el bloque (reentrante por hilo).
+        Con `blocking=False` no espera: si otro proceso lo tiene lanza LockBusyError.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class JsonFileBackend(StorageBackend):
+    """Un archivo JSON por documento, escrito con temporal + os.replace."""
+
+    name = "json"
+
+    def __init__(self, resolve: Callable[[str], str], root: str):
+        # `resolve` convierte un nombre de documento en ruta (crea las carpetas); `root` es data/
+        self._resolve = resolve
+        self.root = root
+        self._held = threading.local()
+
+    def load(self, filename: str) -> Dict[str, Any] | None:
+        path = self._resolve(filename)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return {}
+
+    def version(self, filename: str) -> Any:
+        # os.replace cambia el inodo en cada escritura; mtime y tamaño cubren ediciones en sitio
+        try:
+            st = os.stat(self._resolve(filename))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def recent(self, pattern: str, limit: int) -> List[str]:
+        stamped = []
+        for path in glob.glob(os.path.join(self.root, pattern)):
+            try:
+                stamped.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        stamped.sort(reverse=True)
+        return [os.path.relpath(path, self.root).replace(os.sep, "/") for _, path in stamped[:limit]]
+
+    @contextmanager
+    def locked(self, filenames: List[str], blocking: bool = True) -> Iterator[None]:
+        """flock sobre `.<nombre>.lock` junto a cada documento, en orden para evitar interbloqueos."""
+        held = getattr(self._held, "names", None)
+        if held is None:
+            held = self._held.names = set()
+        names = sorted(set(filenames) - held)
+        with ExitStack() as stack:
+            try:
+                for name in names:
+                    stack.enter_context(self._flock(name, blocking))
+                    held.add(name)
+                yield
+            finally:
+                held.difference_update(names)
+
+    @contextmanager
+    def _flock(self, filename: str, blocking: bool = True) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        path = self._resolve(filename)
+        lock_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.lock")
+        with open(lock_path, "a") as f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise LockBusyError(filename) from None
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def save_many(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        # Cada archivo se reemplaza de forma atómica, pero no el lote completo.
+        for filename, data in documents.items():
+            self._write_atomic(filename, data)
+
+    def _write_atomic(self, filename: str, data: Dict[str, Any]) -> None:
+        """Escribe en un temporal del mismo directorio y lo renombra sobre el destino."""
+        path = self._resolve(filename)
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Trazas por etapa del camino caliente. Cada `span(nombre)` suma su duración a un
+# histograma (expuesto en /metrics) y a la traza de la petición en curso, que se
+# devuelve como cabecera Server-Timing y se registra como log estructurado.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") != "0"
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "5000"))   # peticiones más lentas se registran en WARNING
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Límites de los buckets en segundos (de E/S local a completions lentas)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger("sam.trace")
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {"level": record.levelname, "logger": record.name, "message": record.getMessage()}
+        payload.update(getattr(record, "trace", {}))
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def configure_logging() -> None:
+    """Logs de traza en JSON, una línea por petición, con el nivel de LOG_LEVEL."""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(_JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    logger.propagate = False
+
+
+class Histograms:
+    """Histogramas acumulados por etiqueta, en el formato de Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._series: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label: str, seconds: float) -> None:
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self, metric: str, label_name: str, help_text: str) -> list[str]:
+        lines = [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        with self._lock:
+            series = {label: (list(s[0]), s[1], s[2]) for label, s in self._series.items()}
+        for label, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label_name}="{label}",le="+Inf"}} {count}')
+            lines.append(f'{metric}_sum{{{label_name}="{label}"}} {total:.6f}')
+            lines.append(f'{metric}_count{{{label_name}="{label}"}} {count}')
+        return lines
+
+
+stage_histograms = Histograms()
+request_histograms = Histograms()
+
+# ================================================================
+# 🧵 TRAZA DE LA PETICIÓN
+# ================================================================
+class Trace:
+    """Duración acumulada por etapa dentro de una petición (las tareas hijas comparten la traza)."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.start = time.perf_counter()
+        self.stages: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [seconds, 1]
+            else:
+                stage[0] += seconds
+                stage[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (milisegundos por etapa más el total)."""
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.2f}" for name, (seconds, _) in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+    def finish(self, route: str, status: int) -> None:
+        """Registra la petición en su histograma y, según LOG_LEVEL, en el log de trazas."""
+        elapsed = self.elapsed()
+        request_histograms.observe(f"{self.method} {route}", elapsed)
+        level = logging.WARNING if elapsed * 1000 >= TRACE_SLOW_MS else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        with self._lock:
+            stages = {name: {"ms": round(s * 1000, 2), "calls": n} for name, (s, n) in self.stages.items()}
+        logger.log(level, "request", extra={"trace": {
+            "method": self.method,
+            "route": route,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "stages": stages,
+        }})
+
+
+_current: ContextVar[Trace | None] = ContextVar("sam_trace", default=None)
+
+
+@contextmanager
+def request_trace(method: str, path: str):
+    """Abre la traza de una petición; devuelve None si el trazado está desactivado."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace(method, path)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+# ================================================================
+# ⏱️ ETAPAS
+# ================================================================
+class _Span:
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name: str, trace: Trace | None):
+        self.name = name
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        elapsed = time.perf_counter() - self.start
+        stage_histograms.observe(self.name, elapsed)
+        if self.trace is not None:
+            self.trace.add(self.name, elapsed)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """Mide un bloque (`with span("llm"): ...`); sin coste apreciable si el trazado está desactivado."""
+    if not TRACING_ENABLED:
+        return _NOOP
+    return _Span(name, _current.get())
+
+
+def render_prometheus() -> str:
+    lines = stage_histograms.render(
+        "sam_stage_duration_seconds", "stage", "Duración de cada etapa del camino caliente.",
+    ) + request_histograms.render(
+        "sam_request_duration_seconds", "route", "Duración total de las peticiones HTTP por ruta.",
+    )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,174 @@
+import copy
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from utils import storage
+
+# Contadores de tokens en memoria. Cada completion solo suma en un dict;
+# los deltas acumulados se fusionan en usage.json (o en la tabla `usage` con SQLite)
+# en cada volcado de storage.
+USAGE_FILE = "usage.json"
+
+
+def _empty_month() -> Dict[str, Any]:
+    return {"total_tokens": 0, "prompt_tokens": 0, "completion_tokens": 0, "calls": 0,
+            "models": {}, "sessions": {}}
+
+
+def _empty_bucket() -> Dict[str, int]:
+    return {"tokens": 0, "prompt_tokens": 0, "completion_tokens": 0, "calls": 0}
+
+
+def normalize(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Unifica los dos formatos históricos de usage.json:
+    `{"total": n, "models": {m: n}}` (antiguo log_usage) y
+    `{"total_tokens": n, "models": {m: {"tokens": n}}}` (archivo de ejemplo).
+    """
+    for month, month_data in list(data.items()):
+        if not isinstance(month_data, dict):
+            continue
+        normalized = _empty_month()
+        normalized["total_tokens"] = month_data.get("total_tokens", month_data.get("total", 0))
+        for key in ("prompt_tokens", "completion_tokens", "calls"):
+            normalized[key] = month_data.get(key, 0)
+        for name, value in month_data.get("models", {}).items():
+            bucket = _empty_bucket()
+            if isinstance(value, dict):
+                bucket.update(value)
+            else:
+                bucket["tokens"] = value
+            normalized["models"][name] = bucket
+        for name, value in month_data.get("sessions", {}).items():
+            bucket = _empty_bucket()
+            bucket.update(value)
+            normalized["sessions"][name] = bucket
+        data[month] = normalized
+    return data
+
+
+def _merge(data: Dict[str, Any], pending: Dict[str, Any]) -> Dict[str, Any]:
+    """Suma los deltas pendientes sobre un documento de uso normalizado."""
+    for month, delta in pending.items():
+        month_data = data.setdefault(month, _empty_month())
+        for key in ("total_tokens", "prompt_tokens", "completion_tokens", "calls"):
+            month_data[key] += delta[key]
+        for group in ("models", "sessions"):
+            for name, bucket_delta in delta[group].items():
+                bucket = month_data[group].setdefault(name, _empty_bucket())
+                for key, value in bucket_delta.items():
+                    bucket[key] += value
+    return data
+
+
+def _to_rows(pending: Dict[str, Any]) -> list[tuple]:
+    """Deltas por mes → filas (mes, tipo, nombre, prompt, completion, tokens, llamadas) para SQLite."""
+    rows = []
+    for month, delta in pending.items():
+        rows.append((month, "total", "", delta["prompt_tokens"], delta["completion_tokens"],
+                     delta["total_tokens"], delta["calls"]))
+        for group in ("models", "sessions"):
+            for name, bucket in delta[group].items():
+                rows.append((month, group, name, bucket["prompt_tokens"], bucket["completion_tokens"],
+                             bucket["tokens"], bucket["calls"]))
+    return rows
+
+
+def _from_rows(rows: list[tuple]) -> Dict[str, Any]:
+    """Filas de la tabla `usage` → formato normalizado de usage.json."""
+    data: Dict[str, Any] = {}
+    for month, kind, name, prompt_tokens, completion_tokens, tokens, calls in rows:
+        month_data = data.setdefault(month, _empty_month())
+        counters = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "calls": calls}
+        if kind == "total":
+            month_data.update(counters, total_tokens=tokens)
+        else:
+            month_data[kind][name] = {"tokens": tokens, **counters}
+    return data
+
+
+class UsageTracker:
+    """
+    Acumula el consumo de tokens por mes, modelo y sesión sin tocar disco.
+    `flush()` fusiona los deltas pendientes en usage.json de una sola vez.
+    """
+
+    def __init__(self, filename: str = USAGE_FILE):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {}
+        self._flush_lock = threading.Lock()   # un volcado a medias no puede verse desde snapshot()
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, session_id: str | None = None) -> None:
+        """Suma una completion a los contadores en memoria (O(1), sin E/S)."""
+        tokens = prompt_tokens + completion_tokens
+        month = datetime.utcnow().strftime("%Y-%m")
+        with self._lock:
+            month_data = self._pending.setdefault(month, _empty_month())
+            buckets = [month_data, month_data["models"].setdefault(model, _empty_bucket())]
+            if session_id:
+                buckets.append(month_data["sessions"].setdefault(session_id, _empty_bucket()))
+            for bucket in buckets:
+                bucket["prompt_tokens"] += prompt_tokens
+                bucket["completion_tokens"] += completion_tokens
+                bucket["calls"] += 1
+            month_data["total_tokens"] += tokens
+            for bucket in buckets[1:]:
+                bucket["tokens"] += tokens
+
+    def flush(self) -> bool:
+        """Fusiona los deltas pendientes en el documento de uso. Devuelve si había algo."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return False
+
+            try:
+                backend = storage.get_backend()
+                if backend.rows:
+                    backend.add_usage(_to_rows(pending))
+                else:
+                    storage.update_json(self.filename, lambda data: _merge(normalize(data), pending))
+            except BaseException:
+                # No se pierden: vuelven a pendientes (con lo registrado mientras tanto) para el siguiente volcado
+                with self._lock:
+                    self._pending = _merge(pending, self._pending)
+                raise
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Uso total (persistido + pendiente) en el formato normalizado. No escribe: los
+        deltas pendientes se suman a una copia y el volcado periódico los persiste.
+        """
+        with self._flush_lock:
+            backend = storage.get_backend()
+            data = _from_rows(backend.usage_rows()) if backend.rows else normalize(storage.read_json(self.filename))
+            with self._lock:
+                return _merge(data, copy.deepcopy(self._pending))
+
+    def render_prometheus(self) -> str:
+        """Contadores en formato de exposición de Prometheus (sin la dimensión de sesión)."""
+        lines = [
+            "# HELP sam_llm_tokens_total Tokens consumidos por modelo y tipo.",
+            "# TYPE sam_llm_tokens_total counter",
+        ]
+        calls = [
+            "# HELP sam_llm_calls_total Completions realizadas por modelo.",
+            "# TYPE sam_llm_calls_total counter",
+        ]
+        for month, month_data in sorted(self.snapshot().items()):
+            for model, bucket in sorted(month_data["models"].items()):
+                for kind in ("prompt", "completion"):
+                    lines.append(
+                        f'sam_llm_tokens_total{{month="{month}",model="{model}",kind="{kind}"}} '
+                        f'{bucket[f"{kind}_tokens"]}'
+                    )
+                calls.append(f'sam_llm_calls_total{{month="{month}",model="{model}"}} {bucket["calls"]}')
+        return "\n".join(lines + calls) + "\n"
+
+
+tracker = UsageTracker()
+storage.register_flush_hook(tracker.flush)